@@ -0,0 +1,69 @@
+# benchmarks/campaign_request_benchmark.py
+#
+# Parse/validate throughput of campaign create/update bodies: the previous
+# json.loads + hand-written checks against the Pydantic request models.
+# Run from the repository root:  python -m benchmarks.campaign_request_benchmark
+
+import json
+import timeit
+from tests.sanitizer_reference import campaign_payload
+from models.campaign_model import CampaignCreateRequest, CampaignUpdateRequest, parse_campaign_request
+
+
+def legacy_has_valid_targeting_data(targeting_data):
+    if not targeting_data or not isinstance(targeting_data, dict):
+        return False
+    country_selections = targeting_data.get("countrySelections")
+    if not country_selections:
+        return False
+    if isinstance(country_selections, dict):
+        return bool(country_selections.get("selectedCountries", []))
+    return any(isinstance(item, dict) and ("selectedCountry" in item or "country" in item) for item in country_selections)
+
+
+def legacy_compare_json_fields(new_data, old_data):
+    return json.dumps(new_data, sort_keys=True) != json.dumps(old_data, sort_keys=True)
+
+
+def legacy_parse(body: bytes, existing: dict):
+    """What update_campaign did before: json.loads, then .get() chains and JSON string compares."""
+    data = json.loads(body)
+    user_id = data.get("user_id", "unknown")
+    brand_id = (data.get("general") or {}).get("brandId")
+    for section in ("appDetails", "campaignDetails", "conversionFlow", "budget", "source"):
+        if section in data and data[section]:
+            legacy_compare_json_fields(data[section], existing.get(section, {}))
+    legacy_has_valid_targeting_data(data.get("targeting"))
+    files = (data.get("creatives") or {}).get("files", [])
+    return user_id, brand_id, len(files)
+
+
+def model_parse(body: bytes, model, existing: dict):
+    payload, data = parse_campaign_request(body, model)
+    for section in ("appDetails", "campaignDetails", "conversionFlow", "budget", "source"):
+        if data.get(section):
+            {**existing.get(section, {}), **data[section]} != existing.get(section, {})
+    return payload.user_id, payload.general.brandId if payload.general else None, len(payload.creatives.files if payload.creatives else [])
+
+
+def main():
+    payloads = {
+        "small (2 creatives, 5 countries)": campaign_payload(creatives=2, countries=5, file_kb=64),
+        "large (20 creatives, 60 countries)": campaign_payload(),
+        "no media (0 creatives, 60 countries)": campaign_payload(creatives=0),
+    }
+    for name, payload in payloads.items():
+        body = json.dumps(payload).encode()
+        existing = payload
+        runs = 100
+        legacy = timeit.timeit(lambda: legacy_parse(body, existing), number=runs) / runs
+        create = timeit.timeit(lambda: model_parse(body, CampaignCreateRequest, existing), number=runs) / runs
+        update = timeit.timeit(lambda: model_parse(body, CampaignUpdateRequest, existing), number=runs) / runs
+        print(
+            f"{name:<38} {len(body) / 1024:8.0f} KB   legacy {legacy * 1e3:7.2f} ms   "
+            f"create model {create * 1e3:7.2f} ms   update model {update * 1e3:7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
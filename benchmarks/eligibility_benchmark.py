@@ -0,0 +1,91 @@
+# benchmarks/eligibility_benchmark.py
+#
+# Eligibility queries against the in-memory index versus filtering the
+# simplified campaign rows one by one (what partners do with get_campaigns
+# output today). Both answers are checked to be identical.
+# Run from the repository root:  python -m benchmarks.eligibility_benchmark
+
+import json
+import random
+import timeit
+from services.campaignapis.eligibility_matcher import APPROVED_STATUSES, EligibilityIndex, simplify_targeting
+
+COUNTRIES = [f"C{i:02d}" for i in range(60)]
+STATES = [f"S{i:02d}" for i in range(30)]
+OSES = ["android", "ios", None]
+
+
+def synthetic_rows(campaigns: int, sources: int, seed: int = 7):
+    rng = random.Random(seed)
+    rows = []
+    for row_id in range(1, campaigns + 1):
+        selections = []
+        for country in rng.sample(COUNTRIES, rng.randint(0, 4)):
+            included = rng.sample(STATES, rng.randint(0, 3)) if rng.random() < 0.3 else []
+            excluded = rng.sample(STATES, rng.randint(1, 3)) if not included and rng.random() < 0.3 else []
+            selections.append({"selectedCountry": country, "includedStates": included, "excludedStates": excluded})
+        rows.append((
+            row_id,
+            f"CRB-{row_id}",
+            "active" if rng.random() < 0.8 else "paused",
+            json.dumps({"countrySelections": selections}),
+            json.dumps({"os": rng.choice(OSES)}),
+            json.dumps({"events": [{"id": "install" if rng.random() < 0.5 else "ftd"}]}),
+        ))
+    partner = [(str(s), row_id, "active" if rng.random() < 0.9 else "paused")
+               for s in range(sources) for row_id in rng.sample(range(1, campaigns + 1), campaigns // 3)]
+    sub2 = [(str(s), row_id, f"pub{rng.randint(0, 20)}", rng.choice(["active", "blocked"]))
+            for s, row_id, _ in rng.sample(partner, len(partner) // 20)]
+    return rows, partner, sub2
+
+
+def naive_match(rows, partner, sub2_rows, source_id, sub2, country, state, os_name):
+    approved = {row_id for s, row_id, status in partner if s == source_id and status in APPROVED_STATUSES}
+    for s, row_id, sub, status in sub2_rows:
+        if s == source_id and sub == sub2:
+            (approved.add if status in APPROVED_STATUSES else approved.discard)(row_id)
+    matched = []
+    for row_id, campaign_id, status, targeting, app_details, _ in rows:
+        if status != "active" or row_id not in approved:
+            continue
+        campaign_os = (json.loads(app_details).get("os") or "").upper()
+        if campaign_os and campaign_os != os_name.upper():
+            continue
+        for entry in simplify_targeting(json.loads(targeting)):
+            if entry["country"] is None:
+                matched.append(campaign_id)
+                break
+            if entry["country"] != country:
+                continue
+            if entry["includedStates"] and state not in entry["includedStates"]:
+                continue
+            if state in entry["excludedStates"]:
+                continue
+            matched.append(campaign_id)
+            break
+    return sorted(matched)
+
+
+def main():
+    for campaigns in (1_000, 10_000):
+        rows, partner, sub2_rows = synthetic_rows(campaigns, sources=50)
+        index = EligibilityIndex()
+        build = timeit.timeit(lambda: [index.upsert_campaign(*row) for row in rows], number=1)
+        for row in partner:
+            index.set_partner_status(*row)
+        for row in sub2_rows:
+            index.set_sub2_status(*row)
+
+        queries = [("7", f"pub{i % 20}", COUNTRIES[i % 60], STATES[i % 30], OSES[i % 2]) for i in range(50)]
+        for q in queries[:10]:
+            assert sorted(index.match(*q)) == naive_match(rows, partner, sub2_rows, *q), q
+
+        runs = 2000
+        indexed = timeit.timeit(lambda: [index.match(*q) for q in queries], number=runs // 50) / runs
+        naive = timeit.timeit(lambda: naive_match(rows, partner, sub2_rows, *queries[0]), number=5) / 5
+        print(f"{campaigns:>6} campaigns: build {build * 1e3:7.1f} ms   "
+              f"naive {naive * 1e6:10.1f} us/query   index {indexed * 1e6:6.1f} us/query   x{naive / indexed:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# benchmarks/funds_batch_benchmark.py
+#
+# Credit throughput of /add_funds/post_funds_batch/ versus the same credits
+# sent one per request to /add_funds/post_fund/. Needs a running server and
+# database, and really credits the synthetic BENCH-* users, so point it at a
+# staging deployment:
+#
+#   python -m benchmarks.funds_batch_benchmark --url http://localhost:8000 --api-key KEY \
+#       --credits 5000 --users 500 --batch 1000 --concurrency 16
+#
+# Emails are queued for every credited user; --email should be an address
+# nobody reads.
+
+import argparse
+import asyncio
+import random
+import time
+
+
+def synthetic_credits(count: int, users: int, email: str, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return [
+        {
+            "user_id": f"BENCH-{rng.randrange(users)}",
+            "user_name": "Benchmark",
+            "fund": f"{rng.uniform(1, 100):.2f}",
+            "created_by": "funds_batch_benchmark",
+            "email": email,
+        }
+        for _ in range(count)
+    ]
+
+
+async def run_single(client, credits: list, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def post(credit):
+        nonlocal errors
+        async with semaphore:
+            response = await client.post("/add_funds/post_fund/", json=credit)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(post(credit) for credit in credits))
+    return time.perf_counter() - started, errors
+
+
+async def run_batch(client, credits: list, batch: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def post(chunk):
+        nonlocal errors
+        async with semaphore:
+            response = await client.post("/add_funds/post_funds_batch/", json={"credits": chunk})
+            if response.status_code != 200:
+                errors += len(chunk)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(post(credits[i:i + batch]) for i in range(0, len(credits), batch)))
+    return time.perf_counter() - started, errors
+
+
+async def run(url: str, api_key: str, count: int, users: int, batch: int, concurrency: int, email: str):
+    import httpx
+
+    credits = synthetic_credits(count, users, email)
+    async with httpx.AsyncClient(base_url=url, headers={"x-api-key": api_key}, timeout=120) as client:
+        single_elapsed, single_errors = await run_single(client, credits, concurrency)
+        batch_elapsed, batch_errors = await run_batch(client, credits, batch, concurrency)
+
+    print(f"{count} credits over {users} users, {concurrency} concurrent requests")
+    print(f"  post_fund:        {count / single_elapsed:>10,.0f} credits/s  ({single_elapsed:.2f}s, {single_errors} failed)")
+    print(f"  post_funds_batch: {count / batch_elapsed:>10,.0f} credits/s  ({batch_elapsed:.2f}s, {batch_errors} failed, {batch}/request)")
+    print(f"  speedup: {single_elapsed / batch_elapsed:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch fund credit throughput")
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--api-key", default="")
+    parser.add_argument("--credits", type=int, default=5_000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=1_000, help="Credits per post_funds_batch request (max 5000)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--email", default="bench@example.invalid")
+    args = parser.parse_args()
+    if not 1 <= args.batch <= 5_000:
+        parser.error("--batch must be between 1 and 5000")
+    asyncio.run(run(args.url, args.api_key, args.credits, args.users, args.batch, args.concurrency, args.email))
+
+
+if __name__ == "__main__":
+    main()
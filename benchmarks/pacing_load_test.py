@@ -0,0 +1,105 @@
+# benchmarks/pacing_load_test.py
+#
+# Load test for the budget pacer.
+#
+#   python -m benchmarks.pacing_load_test
+#       In-process: preloads synthetic campaigns and drives spend events
+#       through BudgetPacer.record_spend, reporting events/second. Flushes
+#       and pauses are not started, so no database is needed.
+#
+#   python -m benchmarks.pacing_load_test --url http://localhost:8000 --api-key KEY \
+#       --campaigns CRB-1,CRB-2 --seconds 30 --batch 500 --concurrency 16
+#       Against a running server: posts batches to /budget_pacing/spend/.
+
+import argparse
+import asyncio
+import random
+import time
+from services.campaignapis.budget_pacing import BudgetPacer, CampaignPacing, AdvertiserPacing, MICROS, current_day
+
+
+def preload(campaigns: int, advertisers: int):
+    BudgetPacer.campaigns.clear()
+    BudgetPacer.advertisers.clear()
+    BudgetPacer.pending_spend.clear()
+    BudgetPacer.pending_debits.clear()
+    today = current_day()
+    for a in range(advertisers):
+        BudgetPacer.advertisers[f"USR-{a}"] = AdvertiserPacing(f"USR-{a}", 10_000_000 * MICROS)
+    ids = []
+    for c in range(campaigns):
+        campaign_id = f"CRB-LOAD-{c}"
+        BudgetPacer.campaigns[campaign_id] = CampaignPacing(
+            campaign_id, f"USR-{c % advertisers}",
+            daily_cap=50_000 * MICROS, total_cap=1_000_000 * MICROS,
+            spent_today=0, spent_total=0, day=today, paused=False
+        )
+        ids.append(campaign_id)
+    return ids
+
+
+async def run_in_process(events: int, campaigns: int, advertisers: int):
+    ids = preload(campaigns, advertisers)
+    # Pre-generate so the measurement is the pacer, not random()
+    stream = [(random.choice(ids), random.randint(1_000, 50_000)) for _ in range(events)]
+    record = BudgetPacer.record_spend
+
+    started = time.perf_counter()
+    for campaign_id, amount in stream:
+        await record(campaign_id, amount)
+    elapsed = time.perf_counter() - started
+
+    print(f"in-process: {events} events over {campaigns} campaigns / {advertisers} advertisers")
+    print(f"  {events / elapsed:,.0f} events/s  ({elapsed * 1e6 / events:.2f} us/event)")
+    print(f"  pending spend rows: {len(BudgetPacer.pending_spend)}, pause requests: {len(BudgetPacer.pause_requests)}")
+
+
+async def run_http(url: str, api_key: str, campaign_ids: list, seconds: int, batch: int, concurrency: int):
+    import httpx
+
+    sent = 0
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker(client):
+        nonlocal sent, errors
+        while time.perf_counter() < deadline:
+            events = [{"campaign_id": random.choice(campaign_ids), "amount": round(random.uniform(0.001, 0.05), 6)} for _ in range(batch)]
+            response = await client.post("/budget_pacing/spend/", json={"events": events})
+            if response.status_code == 200:
+                sent += batch
+            else:
+                errors += 1
+
+    async with httpx.AsyncClient(base_url=url, headers={"x-api-key": api_key}, timeout=30) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(f"http: {sent} events in {elapsed:.1f}s with {concurrency} clients x {batch}/request")
+    print(f"  {sent / elapsed:,.0f} events/s, {errors} failed requests")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Budget pacer load test")
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--campaign-count", type=int, default=5_000)
+    parser.add_argument("--advertisers", type=int, default=500)
+    parser.add_argument("--url")
+    parser.add_argument("--api-key", default="")
+    parser.add_argument("--campaigns", help="Comma-separated campaign ids for --url mode")
+    parser.add_argument("--seconds", type=int, default=30)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    if args.url:
+        if not args.campaigns:
+            parser.error("--campaigns is required with --url")
+        asyncio.run(run_http(args.url, args.api_key, args.campaigns.split(","), args.seconds, args.batch, args.concurrency))
+    else:
+        asyncio.run(run_in_process(args.events, args.campaign_count, args.advertisers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# benchmarks/postback_load_test.py
+#
+# Load test for postback ingestion.
+#
+#   python -m benchmarks.postback_load_test
+#       In-process: preloads event tables for synthetic campaigns and times
+#       ingest_postback per event (validation, de-duplication, queueing).
+#       The writer task is not started, the queue is drained between rounds,
+#       so no database is needed.
+#
+#   python -m benchmarks.postback_load_test --url http://localhost:8000 --api-key KEY \
+#       --campaign CRB-1 --event install --seconds 30 --concurrency 64
+#       Against a running server: single GET postbacks, reports throughput and p99.
+
+import argparse
+import asyncio
+import time
+import uuid
+from services.campaignapis.postback_ingestion import EventCatalog, PostbackWriter, build_event_table, ingest_postback
+
+
+def percentile(samples: list, p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def run_in_process(events: int, campaigns: int, duplicates: float):
+    flow = {"amount": "1.50", "events": [
+        {"id": "install", "name": "Install"},
+        {"id": "reg", "name": "Registration", "payout": "0.40"},
+        {"id": "ftd", "name": "First Deposit", "payout": "12"},
+    ]}
+    table = build_event_table(flow)
+    for c in range(campaigns):
+        EventCatalog.cache.set(f"CRB-LOAD-{c}", table, ttl=3600)
+    PostbackWriter.queue = asyncio.Queue(maxsize=events + 1)
+    PostbackWriter.recent_keys.clear()
+
+    names = ["install", "Registration", "ftd"]
+    resend_every = int(1 / duplicates) if duplicates > 0 else 0
+    stream = []
+    for i in range(events):
+        if resend_every and i and i % resend_every == 0:
+            stream.append(stream[-1])
+        else:
+            stream.append((f"CRB-LOAD-{i % campaigns}", names[i % 3], uuid.uuid4().hex))
+
+    latencies = []
+    clock = time.perf_counter
+    started = clock()
+    for campaign_id, event, click_id in stream:
+        t0 = clock()
+        await ingest_postback(campaign_id, event, click_id=click_id, params={"sub1": "x"})
+        latencies.append(clock() - t0)
+    elapsed = clock() - started
+
+    print(f"in-process: {events} postbacks over {campaigns} campaigns")
+    print(f"  {events / elapsed:,.0f} postbacks/s")
+    print(f"  p50 {percentile(latencies, 0.5) * 1e6:.1f} us, p99 {percentile(latencies, 0.99) * 1e6:.1f} us")
+    print(f"  {PostbackWriter.stats}")
+
+
+async def run_http(url: str, api_key: str, campaign_id: str, event: str, seconds: int, concurrency: int):
+    import httpx
+
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker(client):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            response = await client.get("/postbacks/", params={
+                "campaign_id": campaign_id, "event": event, "click_id": uuid.uuid4().hex
+            })
+            latencies.append(time.perf_counter() - t0)
+            if response.status_code != 200:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, headers={"x-api-key": api_key}, limits=limits, timeout=30) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(f"http: {len(latencies)} postbacks in {elapsed:.1f}s with {concurrency} clients")
+    print(f"  {len(latencies) / elapsed:,.0f} postbacks/s, {errors} errors")
+    print(f"  p50 {percentile(latencies, 0.5) * 1e3:.2f} ms, p99 {percentile(latencies, 0.99) * 1e3:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Postback ingestion load test")
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--campaign-count", type=int, default=2_000)
+    parser.add_argument("--duplicates", type=float, default=0.05, help="Share of re-sent postbacks")
+    parser.add_argument("--url")
+    parser.add_argument("--api-key", default="")
+    parser.add_argument("--campaign")
+    parser.add_argument("--event", default="install")
+    parser.add_argument("--seconds", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    if args.url:
+        if not args.campaign:
+            parser.error("--campaign is required with --url")
+        asyncio.run(run_http(args.url, args.api_key, args.campaign, args.event, args.seconds, args.concurrency))
+    else:
+        asyncio.run(run_in_process(args.events, args.campaign_count, args.duplicates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+# benchmarks/sanitizer_benchmark.py
+#
+# Micro-benchmark of the campaign payload sanitizer against the previous
+# per-module implementation (re.compile per value, recursive walk, eager paths).
+# Run from the repository root:  python -m benchmarks.sanitizer_benchmark
+
+import timeit
+from tests.sanitizer_reference import campaign_payload, legacy_find_malicious_value
+from utils.input_validation import CAMPAIGN_SKIP_SCHEMA, find_malicious_value
+
+
+def main():
+    payloads = {
+        "small (2 creatives, 5 countries)": campaign_payload(creatives=2, countries=5, file_kb=64),
+        "large (20 creatives, 60 countries)": campaign_payload(),
+        "xl (50 creatives, 200 countries)": campaign_payload(creatives=50, countries=200),
+    }
+    for name, payload in payloads.items():
+        assert legacy_find_malicious_value(payload) is None
+        assert find_malicious_value(payload, skip=CAMPAIGN_SKIP_SCHEMA) is None
+        runs = 200
+        legacy = timeit.timeit(lambda: legacy_find_malicious_value(payload), number=runs) / runs
+        current = timeit.timeit(lambda: find_malicious_value(payload, skip=CAMPAIGN_SKIP_SCHEMA), number=runs) / runs
+        print(f"{name:<38} legacy {legacy * 1e6:9.1f} us   shared {current * 1e6:9.1f} us   x{legacy / current:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,9 @@ class Settings(BaseSettings):
     # Secret key for signing JWTs. Keep this truly secret!
     jwt_secret_key: str
 
+    # Back the in-process app-details cache with cronbid_app_details_cache
+    app_details_persistent_cache: bool = False
+
 
     model_config = {
         "env_file": ".env"
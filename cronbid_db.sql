@@ -247,3 +247,242 @@ INSERT INTO cronbid_logs (
 
 
 
+
+-- One balance row per user so bulk credits can upsert with ON DUPLICATE KEY UPDATE.
+-- Duplicates left by the old SELECT-then-INSERT post_fund are merged first:
+-- their balances are summed into the lowest id, then the other rows removed
+START TRANSACTION;
+UPDATE cronbid_user_funds f
+JOIN (
+    SELECT user_id, MIN(id) AS keep_id, SUM(COALESCE(fund, 0)) AS total_fund, MAX(last_updated_at) AS last_updated_at
+    FROM cronbid_user_funds
+    WHERE user_id IS NOT NULL
+    GROUP BY user_id
+    HAVING COUNT(*) > 1
+) d ON f.id = d.keep_id
+SET f.fund = d.total_fund, f.last_updated_at = d.last_updated_at;
+DELETE f1 FROM cronbid_user_funds f1
+JOIN cronbid_user_funds f2
+  ON f1.user_id = f2.user_id AND f1.id > f2.id;
+COMMIT;
+ALTER TABLE cronbid_user_funds
+ADD UNIQUE KEY uq_user_funds_user_id (user_id);
+
+-- Statement views and range scans on the ledger
+ALTER TABLE cronbid_fund_transactions
+ADD INDEX idx_fund_txn_user_created (user_id, created_at, id),
+ADD INDEX idx_fund_txn_created (created_at, id),
+ADD INDEX idx_fund_txn_transaction_id (transaction_id);
+
+-- Table: cronbid_fund_balance_snapshots
+-- Periodic per-user balances; "balance as of X" = nearest snapshot + transactions after it
+CREATE TABLE cronbid_fund_balance_snapshots (
+    user_id VARCHAR(150) NOT NULL,
+    snapshot_at DATETIME NOT NULL,
+    balance DECIMAL(15,2) NOT NULL,
+    last_transaction_row_id INT NOT NULL,  -- cronbid_fund_transactions.id included in this balance
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, snapshot_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Audit log lookups: bounded key columns and composite indexes for
+-- "history of record X", "actions by user Y" and time-range scans
+ALTER TABLE cronbid_logs
+MODIFY COLUMN record_id VARCHAR(255) NOT NULL,
+MODIFY COLUMN user_id VARCHAR(255) NOT NULL,
+MODIFY COLUMN table_name VARCHAR(64) NOT NULL,
+MODIFY COLUMN created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+ADD INDEX idx_logs_table_record_created (table_name, record_id, created_at, id),
+ADD INDEX idx_logs_user_created (user_id, created_at, id),
+ADD INDEX idx_logs_created (created_at, id);
+
+-- Optional: monthly partitioning of cronbid_logs by created_at.
+-- MySQL requires the partition column in every unique key, so the primary key
+-- becomes (id, created_at) and log_id uniqueness is dropped (ids are random
+-- hex from generate_log_id, so a plain index is enough for lookups).
+-- Add a new partition before each month starts (REORGANIZE PARTITION p_future).
+--
+-- ALTER TABLE cronbid_logs
+-- DROP PRIMARY KEY,
+-- ADD PRIMARY KEY (id, created_at),
+-- DROP INDEX log_id,
+-- ADD INDEX idx_logs_log_id (log_id);
+--
+-- ALTER TABLE cronbid_logs
+-- PARTITION BY RANGE COLUMNS (created_at) (
+--     PARTITION p2025_01 VALUES LESS THAN ('2025-02-01'),
+--     PARTITION p2025_02 VALUES LESS THAN ('2025-03-01'),
+--     PARTITION p_future VALUES LESS THAN (MAXVALUE)
+-- );
+
+-- Table: cronbid_app_details_cache
+-- Optional persistent backing for app-store lookups (settings.app_details_persistent_cache)
+CREATE TABLE cronbid_app_details_cache (
+    package_id VARCHAR(255) NOT NULL,
+    country VARCHAR(10) NOT NULL,
+    lang VARCHAR(10) NOT NULL,
+    payload JSON NOT NULL,
+    expires_at DATETIME NOT NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (package_id, country, lang),
+    INDEX idx_app_details_cache_expires (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Table: cronbid_media_uploads
+-- Creatives/audience files uploaded before campaign create/update, referenced by upload_id
+CREATE TABLE cronbid_media_uploads (
+    id INT UNSIGNED NOT NULL AUTO_INCREMENT,
+    upload_id VARCHAR(64) NOT NULL,
+    user_id VARCHAR(255) NOT NULL,
+    original_name VARCHAR(255) DEFAULT NULL,
+    mime_type VARCHAR(100) NOT NULL,
+    size_bytes BIGINT UNSIGNED NOT NULL,
+    storage_path TEXT NOT NULL,
+    status ENUM('staged', 'attached') DEFAULT 'staged',
+    campaign_id VARCHAR(255) DEFAULT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    attached_at DATETIME DEFAULT NULL,
+    PRIMARY KEY (id),
+    UNIQUE KEY (upload_id),
+    INDEX idx_media_uploads_user_status (user_id, status)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Resumable upload sessions share cronbid_media_uploads: a session is
+-- 'uploading' until finalized, then 'staged' like a multipart upload
+ALTER TABLE cronbid_media_uploads
+MODIFY COLUMN mime_type VARCHAR(100) DEFAULT NULL,
+MODIFY COLUMN status ENUM('uploading', 'staged', 'attached') DEFAULT 'staged',
+ADD COLUMN upload_length BIGINT UNSIGNED DEFAULT NULL AFTER size_bytes,
+ADD COLUMN upload_offset BIGINT UNSIGNED DEFAULT NULL AFTER upload_length,
+ADD COLUMN expires_at DATETIME DEFAULT NULL,
+ADD INDEX idx_media_uploads_status_expires (status, expires_at);
+
+-- Content-addressed media store: one row per distinct file under
+-- uploads/campaignsmedia/blobs/, ref_count = number of campaign references
+CREATE TABLE IF NOT EXISTS cronbid_media_blobs (
+    sha256 CHAR(64) NOT NULL PRIMARY KEY,
+    mime_type VARCHAR(100) NOT NULL,
+    size_bytes BIGINT UNSIGNED NOT NULL,
+    ref_count INT UNSIGNED NOT NULL DEFAULT 0,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    released_at DATETIME DEFAULT NULL,
+    INDEX idx_media_blobs_gc (ref_count, released_at)
+);
+
+-- Optimistic concurrency for campaign edits: bumped by every update,
+-- checked by PATCH /update_campaigns/update_campaign/{id} via If-Match
+ALTER TABLE cronbid_campaigns
+ADD COLUMN version INT UNSIGNED NOT NULL DEFAULT 0 AFTER updated_at;
+
+-- Bulk status changes select campaigns by brand
+ALTER TABLE cronbid_campaigns
+ADD INDEX idx_campaigns_brand (brand);
+
+-- Durable spend per campaign and UTC day, written in batches by the budget pacer
+CREATE TABLE IF NOT EXISTS cronbid_campaign_spend_daily (
+    campaign_id VARCHAR(255) NOT NULL,
+    spend_date DATE NOT NULL,
+    amount DECIMAL(16,6) NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (campaign_id, spend_date)
+);
+
+-- Conversion/install postbacks, written in batches by the postback writer.
+-- The unique key makes re-sent postbacks no-ops (INSERT IGNORE)
+CREATE TABLE IF NOT EXISTS cronbid_postback_events (
+    id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    campaign_id VARCHAR(255) NOT NULL,
+    event_id VARCHAR(191) NOT NULL,
+    event_name VARCHAR(255) DEFAULT NULL,
+    click_id VARCHAR(191) DEFAULT NULL,
+    transaction_id VARCHAR(191) DEFAULT NULL,
+    dedupe_key VARCHAR(191) NOT NULL,
+    payout DECIMAL(12,4) DEFAULT NULL,
+    params JSON DEFAULT NULL,
+    event_time DATETIME NOT NULL,
+    received_at DATETIME NOT NULL,
+    UNIQUE KEY uq_postback_dedupe (campaign_id, event_id, dedupe_key),
+    INDEX idx_postback_campaign_time (campaign_id, event_time)
+);
+
+-- Reporting dimensions on postbacks ('' when the sender didn't provide them)
+ALTER TABLE cronbid_postback_events
+ADD COLUMN source_id VARCHAR(64) NOT NULL DEFAULT '',
+ADD COLUMN sub2 VARCHAR(191) NOT NULL DEFAULT '',
+ADD COLUMN country VARCHAR(16) NOT NULL DEFAULT '';
+
+-- Report rollups, folded in incrementally from cronbid_postback_events by
+-- the report rollup job. Reports read only these, never the raw events
+CREATE TABLE IF NOT EXISTS cronbid_report_hourly (
+    bucket DATETIME NOT NULL,
+    campaign_id VARCHAR(191) NOT NULL,
+    source_id VARCHAR(64) NOT NULL DEFAULT '',
+    sub2 VARCHAR(191) NOT NULL DEFAULT '',
+    country VARCHAR(16) NOT NULL DEFAULT '',
+    event_id VARCHAR(191) NOT NULL,
+    conversions BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    payout DECIMAL(18,4) NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, campaign_id, source_id, sub2, country, event_id),
+    INDEX idx_report_hourly_campaign (campaign_id, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS cronbid_report_daily (
+    bucket DATE NOT NULL,
+    campaign_id VARCHAR(191) NOT NULL,
+    source_id VARCHAR(64) NOT NULL DEFAULT '',
+    sub2 VARCHAR(191) NOT NULL DEFAULT '',
+    country VARCHAR(16) NOT NULL DEFAULT '',
+    event_id VARCHAR(191) NOT NULL,
+    conversions BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    payout DECIMAL(18,4) NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, campaign_id, source_id, sub2, country, event_id),
+    INDEX idx_report_daily_campaign (campaign_id, bucket),
+    INDEX idx_report_daily_source (source_id, bucket)
+);
+
+-- How far each rollup has read its source table
+CREATE TABLE IF NOT EXISTS cronbid_report_rollup_state (
+    name VARCHAR(64) NOT NULL PRIMARY KEY,
+    last_row_id BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+INSERT IGNORE INTO cronbid_report_rollup_state (name, last_row_id) VALUES ('postbacks', 0);
+
+-- One status row per pair so status writes can be a single upsert.
+-- Duplicates left by the old SELECT-then-INSERT race are removed first (newest row kept)
+DELETE p1 FROM partner_status p1
+JOIN partner_status p2
+  ON p1.source_id = p2.source_id AND p1.campaign_id = p2.campaign_id AND p1.id < p2.id;
+ALTER TABLE partner_status
+ADD UNIQUE KEY uq_partner_status (source_id, campaign_id);
+
+DELETE s1 FROM sub2_status s1
+JOIN sub2_status s2
+  ON s1.campaign_id = s2.campaign_id AND s1.source_id = s2.source_id AND s1.sub2 = s2.sub2 AND s1.id < s2.id;
+ALTER TABLE sub2_status
+ADD UNIQUE KEY uq_sub2_status (campaign_id, source_id, sub2);
+
+-- Delta reads (?since=) and keyset pages order status rows by (updated_at, id)
+ALTER TABLE partner_status
+ADD COLUMN updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+ADD INDEX idx_partner_status_updated (updated_at, id),
+ADD INDEX idx_partner_status_campaign (campaign_id);
+
+ALTER TABLE sub2_status
+ADD COLUMN updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+ADD INDEX idx_sub2_status_updated (updated_at, id),
+ADD INDEX idx_sub2_status_source (source_id);
+
+-- Resized logo variants written by the image pipeline: {"thumb": {"webp": url, "png": url}, "thumb_2x": {...}}
+ALTER TABLE cronbid_brands
+ADD COLUMN brand_logo_variants JSON DEFAULT NULL AFTER brand_logo;
+
+ALTER TABLE cronbid_sources
+ADD COLUMN logo_variants JSON DEFAULT NULL AFTER logo;
+
+-- Why the system paused a campaign ('daily_cap', 'total_cap', 'funds_exhausted');
+-- NULL for manual changes. Daily-cap pauses are resumed from this, not from memory
+ALTER TABLE cronbid_campaigns
+ADD COLUMN pause_reason VARCHAR(32) DEFAULT NULL,
+ADD COLUMN paused_at DATETIME DEFAULT NULL,
+ADD INDEX idx_campaigns_pause_reason (status, pause_reason, paused_at);
@@ -1,10 +1,22 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 from routes import include_all_routes
 from database import Database
+from utils.mail_queue import MailQueue
+from utils.static_files import CachedStaticFiles
+from utils.logger import AuditLogWriter
+from services.fundapis.balance_snapshots import BalanceSnapshotter
+from services.customapis.app_details_services import StoreHttpClient
+from services.customapis.app_metadata_refresh import AppMetadataRefresher
+from services.mediaapis.resumable_uploads import UploadJanitor
+from services.mediaapis.media_store import MediaGarbageCollector
+from services.campaignapis.budget_pacing import BudgetPacer
+from services.campaignapis.postback_ingestion import PostbackWriter
+from services.reportapis.report_rollups import ReportRollup
+from services.campaignapis.eligibility_matcher import EligibilityMatcher
+from services.statusapis.status_events import StatusEvents
 
 origins = [
       "https://ads.cronbid.com",
@@ -13,7 +25,29 @@ origins = [
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await Database.connect()
+    await MailQueue.start()
+    await AuditLogWriter.start()
+    await BalanceSnapshotter.start()
+    await AppMetadataRefresher.start()
+    await UploadJanitor.start()
+    await MediaGarbageCollector.start()
+    await BudgetPacer.start()
+    await PostbackWriter.start()
+    await ReportRollup.start()
+    await EligibilityMatcher.start()
     yield
+    await StatusEvents.stop()
+    await EligibilityMatcher.stop()
+    await ReportRollup.stop()
+    await PostbackWriter.stop()
+    await BudgetPacer.stop()
+    await MediaGarbageCollector.stop()
+    await UploadJanitor.stop()
+    await AppMetadataRefresher.stop()
+    await BalanceSnapshotter.stop()
+    await AuditLogWriter.stop()
+    await MailQueue.stop()
+    await StoreHttpClient.close()
     await Database.close()
 
 app = FastAPI(
@@ -32,8 +66,8 @@ app.add_middleware(
 
 include_all_routes(app)
 
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
-app.mount("/campaignsmedia", StaticFiles(directory="uploads/campaignsmedia"), name="campaignsmedia")
+app.mount("/uploads", CachedStaticFiles(directory="uploads"), name="uploads")
+app.mount("/campaignsmedia", CachedStaticFiles(directory="uploads/campaignsmedia"), name="campaignsmedia")
 
 @app.get("/")
 async def read_root():
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Literal
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal
 
 
 class AppDetails(BaseModel):
@@ -10,3 +10,15 @@ class AppDetails(BaseModel):
     store_url: str
     os: Literal["android", "ios"]
     device: Literal["mobile", "tablet", "unknown"] = "mobile"
+
+
+class AppDetailsBatchRequest(BaseModel):
+    packages: List[str] = Field(..., min_length=1, max_length=500, description="Package names or App Store IDs like 'id123456789'")
+    country: str = "us"
+    lang: str = "en"
+
+
+class AppDetailsBatchResponse(BaseModel):
+    results: Dict[str, AppDetails]
+    not_found: List[str]
+    errors: Dict[str, str]
@@ -0,0 +1,140 @@
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from typing import Any, Dict, List, Optional, Union
+from fastapi import HTTPException
+
+
+class CampaignSection(BaseModel):
+    # The campaign wizard sends more keys than the backend reads; they are
+    # kept and stored as-is in the section's JSON column
+    model_config = ConfigDict(extra="allow", coerce_numbers_to_str=True)
+
+
+class GeneralSection(CampaignSection):
+    brandId: Optional[str] = None
+    brandName: Optional[str] = None
+
+
+class AppDetailsSection(CampaignSection):
+    name: Optional[str] = None
+    package: Optional[str] = None
+    os: Optional[str] = None
+    icon: Optional[str] = None
+    description: Optional[str] = None
+
+
+class CampaignDetailsSection(CampaignSection):
+    campaignTitle: Optional[str] = None
+
+
+class CreativeFile(CampaignSection):
+    fileName: Optional[str] = None
+    # base64 data URL for new files, relative path once stored
+    fileData: Optional[str] = None
+    filePath: Optional[str] = None
+    mimeType: Optional[str] = None
+    uploadId: Optional[str] = None
+
+
+class CreativesSection(CampaignSection):
+    files: List[CreativeFile] = Field(default_factory=list)
+
+
+class ConversionFlowSection(CampaignSection):
+    pass
+
+
+class BudgetSection(CampaignSection):
+    pass
+
+
+class UploadAudience(CampaignSection):
+    fileData: Optional[str] = None
+    filePath: Optional[str] = None
+    uploadId: Optional[str] = None
+    event: Optional[str] = None
+    isEncrypted: bool = False
+    encryptionKey: Optional[str] = None
+
+
+class AudienceTargeting(CampaignSection):
+    uploadAudience: List[UploadAudience] = Field(default_factory=list)
+    createAudience: List[Any] = Field(default_factory=list)
+    cronAudience: str = "Disabled"
+
+
+class CountrySelection(CampaignSection):
+    selectedCountry: Optional[str] = None
+    country: Optional[str] = None
+    includedStates: List[Any] = Field(default_factory=list)
+    excludedStates: List[Any] = Field(default_factory=list)
+
+
+class TargetingSection(CampaignSection):
+    # A list of per-country entries, or the older {"selectedCountries": [...], ...} shape
+    countrySelections: Union[List[CountrySelection], Dict[str, Any]] = Field(default_factory=list)
+    formData: Dict[str, Any] = Field(default_factory=dict)
+    audienceTargeting: Optional[AudienceTargeting] = None
+    isValid: Optional[bool] = None
+
+
+class SourceSection(CampaignSection):
+    pass
+
+
+class CampaignCreateRequest(CampaignSection):
+    user_id: str = "unknown"
+    user_name: str = "Unknown User"
+    general: GeneralSection = Field(default_factory=GeneralSection)
+    appDetails: AppDetailsSection = Field(default_factory=AppDetailsSection)
+    campaignDetails: CampaignDetailsSection = Field(default_factory=CampaignDetailsSection)
+    creatives: CreativesSection = Field(default_factory=CreativesSection)
+    conversionFlow: ConversionFlowSection = Field(default_factory=ConversionFlowSection)
+    budget: BudgetSection = Field(default_factory=BudgetSection)
+    targeting: TargetingSection = Field(default_factory=TargetingSection)
+    source: SourceSection = Field(default_factory=SourceSection)
+
+
+class CampaignUpdateRequest(CampaignSection):
+    # Only the sections present in the request are updated
+    user_id: str = "unknown"
+    user_name: str = "Unknown User"
+    general: Optional[GeneralSection] = None
+    appDetails: Optional[AppDetailsSection] = None
+    campaignDetails: Optional[CampaignDetailsSection] = None
+    creatives: Optional[CreativesSection] = None
+    conversionFlow: Optional[ConversionFlowSection] = None
+    budget: Optional[BudgetSection] = None
+    targeting: Optional[TargetingSection] = None
+    source: Optional[SourceSection] = None
+
+
+def parse_campaign_request(body: bytes, model: type):
+    """
+    Parse and validate the raw body in one pass inside pydantic_core.
+    Returns the typed request and its plain-dict form with only the keys
+    the client actually sent, which is what gets stored.
+    """
+    try:
+        payload = model.model_validate_json(body)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False, include_input=False))
+    return payload, payload.model_dump(exclude_unset=True)
+
+
+class CampaignPatchRequest(BaseModel):
+    """
+    RFC 7396 merge patches per JSON section: keys set to null are removed,
+    objects are merged recursively, anything else replaces the stored value.
+    Creatives and uploaded audience files go through the full update instead.
+    """
+    model_config = ConfigDict(extra="forbid", coerce_numbers_to_str=True)
+
+    user_id: str = "unknown"
+    user_name: str = "Unknown User"
+    general: Optional[GeneralSection] = None
+    appDetails: Optional[Dict[str, Any]] = None
+    campaignDetails: Optional[Dict[str, Any]] = None
+    conversionFlow: Optional[Dict[str, Any]] = None
+    budget: Optional[Dict[str, Any]] = None
+    targeting: Optional[Dict[str, Any]] = None
+    source: Optional[Dict[str, Any]] = None
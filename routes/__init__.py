@@ -1,12 +1,12 @@
 from fastapi import FastAPI
 from .authroutes import authentication
-from .serviceroutes import app_details_route,get_tables
+from .serviceroutes import app_details_route,get_tables,audit_logs
 from .operationroutes.brands import brands, add_brands, update_brands
-from .operationroutes.campaigns import add_campaigns, campaigns, campaign_status, update_campaigns, audience_sync
+from .operationroutes.campaigns import add_campaigns, campaigns, campaign_status, update_campaigns, audience_sync, app_metadata_refresh, creative_uploads, resumable_uploads, budget_pacing, postbacks
 from .operationroutes.funds import funds,add_funds
 from .operationroutes.sources import sources
 from .userroutes import user_details
-from .stat_routes import partner_status, sub2_status  # Add this import
+from .stat_routes import partner_status, sub2_status, status_stream, reports, dashboard
 
 # campaigns, funds, reports, settings, dashboard, auth, external_apis
 
@@ -14,6 +14,7 @@ def include_all_routes(app: FastAPI):
     app.include_router(authentication.router, prefix="/authentication", tags=["authentication"])
     app.include_router(app_details_route.router, prefix="/app-details", tags=["App Details"])
     app.include_router(get_tables.router, prefix="/get-tables", tags=["Get Tables"])
+    app.include_router(audit_logs.router, prefix="/audit-logs", tags=["Audit Logs"])
 
     #BRANDS RELATED ROUTES
     app.include_router(brands.router, prefix="/brands", tags=["brands"])
@@ -25,6 +26,11 @@ def include_all_routes(app: FastAPI):
     app.include_router(add_campaigns.router, prefix="/add_campaigns", tags=["add_campaigns"])
     app.include_router(campaign_status.router, prefix="/campaign_status", tags=["Campaign Status"])
     app.include_router(update_campaigns.router, prefix="/update_campaigns", tags=["Update Campaigns"])
+    app.include_router(app_metadata_refresh.router, prefix="/campaign_app_refresh", tags=["Campaigns"])
+    app.include_router(creative_uploads.router, prefix="/campaign_uploads", tags=["Campaign Uploads"])
+    app.include_router(resumable_uploads.router, prefix="/resumable_uploads", tags=["Campaign Uploads"])
+    app.include_router(budget_pacing.router, prefix="/budget_pacing", tags=["Budget Pacing"])
+    app.include_router(postbacks.router, prefix="/postbacks", tags=["Postbacks"])
     
     # NEW AUDIENCE SYNC INTEGRATION ROUTES (Uniform Base Path)
     app.include_router(audience_sync.router, prefix="/audience-sync", tags=["Audience Sync Integration"])
@@ -42,9 +48,10 @@ def include_all_routes(app: FastAPI):
     #Partner status routes
     app.include_router(partner_status.router, prefix="/partnerstatus", tags=["partner-Status"])
     app.include_router(sub2_status.router, prefix="/sub2status", tags=["sub2-Status"])
+    app.include_router(status_stream.router, prefix="/statusstream", tags=["Status Stream"])
     
-    # app.include_router(reports.router, prefix="/reports", tags=["Reports"])
+    app.include_router(reports.router, prefix="/reports", tags=["Reports"])
     # app.include_router(settings.router, prefix="/settings", tags=["Settings"])
-    # app.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboard"])
+    app.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboard"])
     # app.include_router(auth.router, prefix="/auth", tags=["Auth"])
     # app.include_router(external_apis.router, prefix="/external", tags=["External APIs"])
\ No newline at end of file
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from database import Database
 from auth import verify_api_key
 import aiomysql
+import json
 from typing import Optional
 
 router = APIRouter()
@@ -48,6 +49,11 @@ async def get_brands(
                 await cur.execute(query, values)
                 rows = await cur.fetchall()
 
+        for row in rows:
+            # Variant URLs by size and format; None for logos saved before the image pipeline
+            if row.get("brand_logo_variants"):
+                row["brand_logo_variants"] = json.loads(row["brand_logo_variants"])
+
         return {"brands": rows}
 
     except Exception as e:
@@ -3,70 +3,39 @@ import os
 import base64
 import uuid
 import json
-import re
 import binascii
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Request
 from database import Database
 from auth import verify_api_key
+from utils.input_validation import sanitize_payload
+from models.campaign_model import CampaignCreateRequest, parse_campaign_request
 from utils.logger import generate_log_id, insert_log_entry
+from services.mediaapis.creative_uploads import ALLOWED_MIME_TYPES, remove_staged_files, resolve_upload_references
+from services.mediaapis.media_store import is_blob_path, retain_blob, store_blob
+from services.campaignapis.eligibility_matcher import EligibilityMatcher
 
 router = APIRouter()
 
-UPLOADS_DIR = "uploads/campaignsmedia"
-ALLOWED_MIME_TYPES = {
-    "image/jpeg": ".jpg",
-    "image/png": ".png",
-    "image/gif": ".gif",
-    "video/mp4": ".mp4",
-    "video/quicktime": ".mov",
-    "text/csv": ".csv"
-}
-
-def is_malicious_input(value: str) -> bool:
-    """Enhanced input validation to prevent malicious content"""
-    regex = re.compile(
-        r"(['\";]|--|\b(drop|alter|insert|delete|update|select|union|exec|sleep|waitfor|shutdown)\b)|(<script>)",
-        re.IGNORECASE
-    )
-    return bool(regex.search(value))
-
-def sanitize_input(data: dict):
-    """Recursive sanitization check that excludes fileData and description fields"""
-    def recursive_check(data_node, path=""):
-        if isinstance(data_node, dict):
-            for key, value in data_node.items():
-                current_path = f"{path}.{key}" if path else key
-                if key in {'fileData', 'description'}:  # Skip validation for specific fields
-                    continue
-                if isinstance(value, str):
-                    if is_malicious_input(value):
-                        raise HTTPException(status_code=400, detail=f"Invalid input detected in field: {current_path}")
-                elif isinstance(value, (dict, list)):
-                    recursive_check(value, current_path)
-        elif isinstance(data_node, list):
-            for idx, item in enumerate(data_node):
-                recursive_check(item, f"{path}[{idx}]")
-    
-    try:
-        recursive_check(data)
-        return True
-    except HTTPException as he:
-        raise he
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Input validation failed: {str(e)}")
-
 def get_file_extension(mime_type: str) -> str:
     """Get file extension from MIME type with validation"""
     return ALLOWED_MIME_TYPES.get(mime_type.split(';')[0].strip(), None)
 
-async def save_media_files(creatives_data: dict, user_id: str, campaign_id: str, subdir: str = "") -> dict:
-    """Process and save media files to filesystem with optional subdirectory"""
+async def save_media_files(conn, creatives_data: dict, user_id: str, campaign_id: str, attached_paths: set = frozenset()) -> dict:
+    """Store media files in the content-addressed media store, in the transaction on `conn`"""
     if not creatives_data.get("files"):
         return creatives_data
 
     processed_files = []
     for file in creatives_data["files"]:
+        # Already in the store: attached through the upload endpoints (see
+        # resolve_upload_references) or reused from another campaign
+        if isinstance(file, dict) and is_blob_path(file.get("filePath")) \
+                and not str(file.get("fileData", "")).startswith("data:"):
+            if file["filePath"] not in attached_paths:
+                await retain_blob(conn, file["filePath"])
+            processed_files.append(file)
+            continue
         try:
             # Validate file data structure
             if not isinstance(file, dict) or 'fileData' not in file:
@@ -93,26 +62,12 @@ async def save_media_files(creatives_data: dict, user_id: str, campaign_id: str,
             except binascii.Error:
                 raise ValueError("Invalid base64 encoding")
 
-            # Create directory structure
-            campaign_dir = os.path.join(UPLOADS_DIR, user_id, campaign_id)
-            if subdir:
-                campaign_dir = os.path.join(campaign_dir, subdir)
-            os.makedirs(campaign_dir, exist_ok=True)
-
-            # Generate unique filename
-            filename = f"{uuid.uuid4().hex}{extension}"
-            file_path = os.path.join(campaign_dir, filename)
-
-            # Save file
-            with open(file_path, "wb") as f:
-                f.write(file_bytes)
-
-            # Update file entry with relative path
-            processed_file_path = os.path.join(user_id, campaign_id, subdir, filename) if subdir else os.path.join(user_id, campaign_id, filename)
+            # Identical content is stored once; this only adds a reference
+            blob = await store_blob(conn, file_bytes, mime_type)
             processed_files.append({
                 **file,
-                "fileData": processed_file_path,
-                "filePath": f"/campaignsmedia/{processed_file_path}"
+                "fileData": blob["fileData"],
+                "filePath": blob["filePath"]
             })
 
         except Exception as e:
@@ -123,7 +78,7 @@ async def save_media_files(creatives_data: dict, user_id: str, campaign_id: str,
 
     return {**creatives_data, "files": processed_files}
 
-async def process_audience_targeting_data(audience_targeting: dict, user_id: str, campaign_id: str) -> dict:
+async def process_audience_targeting_data(conn, audience_targeting: dict, user_id: str, campaign_id: str, attached_paths: set = frozenset()) -> dict:
     """Process and save audience targeting data"""
     if not audience_targeting:
         return {}
@@ -134,10 +89,10 @@ async def process_audience_targeting_data(audience_targeting: dict, user_id: str
         if "fileData" in audience and audience["fileData"].startswith("data:"):
             # This is a new file upload
             processed_file = await save_media_files(
+                conn,
                 {"files": [audience]},
                 user_id,
-                campaign_id,
-                "audiences"
+                campaign_id
             )
             # Take the first (and only) file from the processed list
             uploaded_audiences.append({
@@ -148,6 +103,8 @@ async def process_audience_targeting_data(audience_targeting: dict, user_id: str
             })
         elif "filePath" in audience:
             # This is an existing file, keep its path
+            if is_blob_path(audience["filePath"]) and audience["filePath"] not in attached_paths:
+                await retain_blob(conn, audience["filePath"])
             uploaded_audiences.append(audience)
 
     return {
@@ -156,91 +113,18 @@ async def process_audience_targeting_data(audience_targeting: dict, user_id: str
         "cronAudience": audience_targeting.get("cronAudience", "Disabled")
     }
 
-def process_targeting_data(targeting: dict) -> dict:
-    """Process and structure targeting data for insertion, including audience targeting"""
-    if not targeting:
-        return {
-            "countrySelections": [],
-            "formData": {},
-            "audienceTargeting": {},
-        }
-    
-    # Extract country selections in the required format
-    country_selections = []
-    for entry in targeting.get("countrySelections", []):
-        country_name = entry.get("selectedCountry", "")
-        if not country_name:
-            continue
-            
-        country_selections.append({
-            "country": country_name,
-            "includedStates": entry.get("includedStates", []),
-            "excludedStates": entry.get("excludedStates", []),
-        })
-    
-    return {
-        "countrySelections": country_selections,
-        "formData": targeting.get("formData", {}),
-        "audienceTargeting": targeting.get("audienceTargeting", {}), # Add the new key here
-    }
-
 @router.post("/post_campaign/", dependencies=[Depends(verify_api_key)])
 async def post_campaign(request: Request):
     try:
-        data = await request.json()
-        sanitize_input(data)
+        payload, data = parse_campaign_request(await request.body(), CampaignCreateRequest)
+        sanitize_payload(data)
 
         # Extract basic info
-        user_id = data.get("user_id", "unknown")
-        user_name = data.get("user_name", "Unknown User")
+        user_id = payload.user_id
+        user_name = payload.user_name
         campaign_id = f"CRB-{int(datetime.utcnow().timestamp())}-{uuid.uuid4().hex[:6]}"
         log_id = generate_log_id()
 
-        # Save media files
-        creatives = await save_media_files(
-            data.get("creatives", {}),
-            user_id,
-            campaign_id
-        )
-
-        # Process new audience targeting data first to handle file uploads
-        audience_targeting_data = await process_audience_targeting_data(
-            data.get("targeting", {}).get("audienceTargeting", {}),
-            user_id,
-            campaign_id
-        )
-
-        # Prepare the combined targeting object for storage in the 'targeting' column
-        full_targeting_data = {
-            "countrySelections": data.get("targeting", {}).get("countrySelections", []),
-            "formData": data.get("targeting", {}).get("formData", {}),
-            "audienceTargeting": audience_targeting_data
-        }
-        
-        # Prepare JSON data for DB insertion
-        app_details = json.dumps(data.get("appDetails", {}))
-        budget = json.dumps(data.get("budget", {}))
-        campaign_details = json.dumps(data.get("campaignDetails", {}))
-        conversion_flow = json.dumps(data.get("conversionFlow", {}))
-        source_json = json.dumps(data.get("source", {}))
-        targeting_json = json.dumps(full_targeting_data) # Use the combined data here
-
-        # Prepare DB values
-        values = (
-            campaign_id,
-            data.get("general", {}).get("brandId"),  # brand (brandId)
-            data.get("general", {}).get("brandName"),  # brand_name
-            app_details,
-            campaign_details,
-            json.dumps(creatives.get("files", [])),  # creatives remains as-is
-            conversion_flow,
-            budget,
-            targeting_json, # Correct column
-            source_json,
-            user_id,
-            log_id
-        )
-
         query = """
         INSERT INTO cronbid_campaigns (
             campaign_id, brand, brand_name, app_details, campaign_details,
@@ -250,20 +134,85 @@ async def post_campaign(request: Request):
 
         pool = await Database.connect()
         async with pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(query, values)
+            # Media references are taken in the same transaction as the
+            # INSERT, so a failed create doesn't leave them counted
+            await conn.begin()
+            try:
+                # Attach files uploaded beforehand through /campaign_uploads/
+                attached_paths, staged_paths = await resolve_upload_references(conn, data, user_id, campaign_id)
+
+                # Save media files
+                creatives = await save_media_files(
+                    conn,
+                    data.get("creatives", {}),
+                    user_id,
+                    campaign_id,
+                    attached_paths
+                )
 
-                await insert_log_entry(
-                    conn=conn,
-                    action="create",
-                    table_name="cronbid_campaigns",
-                    record_id=campaign_id,
-                    user_id=user_id,
-                    username=user_name,
-                    action_description=f"Campaign created with ID {campaign_id}",
-                    log_id=log_id
+                # Process new audience targeting data first to handle file uploads
+                audience_targeting_data = await process_audience_targeting_data(
+                    conn,
+                    data.get("targeting", {}).get("audienceTargeting", {}),
+                    user_id,
+                    campaign_id,
+                    attached_paths
                 )
 
+                # Prepare the combined targeting object for storage in the 'targeting' column
+                full_targeting_data = {
+                    "countrySelections": data.get("targeting", {}).get("countrySelections", []),
+                    "formData": data.get("targeting", {}).get("formData", {}),
+                    "audienceTargeting": audience_targeting_data
+                }
+
+                # Prepare JSON data for DB insertion
+                app_details = json.dumps(data.get("appDetails", {}))
+                budget = json.dumps(data.get("budget", {}))
+                campaign_details = json.dumps(data.get("campaignDetails", {}))
+                conversion_flow = json.dumps(data.get("conversionFlow", {}))
+                source_json = json.dumps(data.get("source", {}))
+                targeting_json = json.dumps(full_targeting_data) # Use the combined data here
+
+                # Prepare DB values
+                values = (
+                    campaign_id,
+                    payload.general.brandId,  # brand (brandId)
+                    payload.general.brandName,  # brand_name
+                    app_details,
+                    campaign_details,
+                    json.dumps(creatives.get("files", [])),  # creatives remains as-is
+                    conversion_flow,
+                    budget,
+                    targeting_json, # Correct column
+                    source_json,
+                    user_id,
+                    log_id
+                )
+
+                async with conn.cursor() as cur:
+                    await cur.execute(query, values)
+
+                    await insert_log_entry(
+                        conn=conn,
+                        action="create",
+                        table_name="cronbid_campaigns",
+                        record_id=campaign_id,
+                        user_id=user_id,
+                        username=user_name,
+                        action_description=f"Campaign created with ID {campaign_id}",
+                        log_id=log_id,
+                        # Commits or rolls back with the campaign row
+                        sync=True
+                    )
+                await conn.commit()
+            except BaseException:
+                await conn.rollback()
+                raise
+
+        await remove_staged_files(staged_paths)
+        EligibilityMatcher.campaign_changed(campaign_id)
+
         return {
             "success": True,
             "message": "Campaign created successfully",
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends
+from auth import verify_api_key
+from services.customapis.app_metadata_refresh import AppMetadataRefresher
+
+router = APIRouter()
+
+@router.get("/status/", dependencies=[Depends(verify_api_key)])
+async def get_refresh_status():
+    """Statistics of the current or last app metadata refresh run."""
+    return {"status": "success", "refresh": AppMetadataRefresher.stats}
+
+@router.post("/run/", dependencies=[Depends(verify_api_key)])
+async def run_refresh():
+    """Start a refresh now; it runs in the background, poll /status/ for progress."""
+    if not AppMetadataRefresher.run_now():
+        return {"status": "success", "message": "Refresh already running", "refresh": AppMetadataRefresher.stats}
+    return {"status": "success", "message": "Refresh started"}
@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from typing import List
+from auth import verify_api_key
+from services.campaignapis.budget_pacing import BudgetPacer, MICROS
+
+router = APIRouter()
+
+class SpendEvent(BaseModel):
+    campaign_id: str = Field(..., min_length=1)
+    amount: float = Field(..., gt=0)
+
+class SpendBatchRequest(BaseModel):
+    events: List[SpendEvent] = Field(..., min_length=1, max_length=10000)
+
+@router.post("/spend/", dependencies=[Depends(verify_api_key)])
+async def record_spend(payload: SpendBatchRequest):
+    """
+    Count spend events against campaign budgets. Events for paused or unknown
+    campaigns are not counted and are reported back so the caller stops serving them.
+    """
+    accepted = 0
+    capped, paused, unknown = set(), set(), set()
+    for event in payload.events:
+        result = await BudgetPacer.record_spend(event.campaign_id, round(event.amount * MICROS))
+        if result == "ok":
+            accepted += 1
+        elif result == "capped":
+            accepted += 1
+            capped.add(event.campaign_id)
+        elif result == "paused":
+            paused.add(event.campaign_id)
+        else:
+            unknown.add(event.campaign_id)
+    return {
+        "accepted": accepted,
+        "capped": sorted(capped),
+        "paused": sorted(paused - capped),
+        "unknown": sorted(unknown)
+    }
+
+@router.get("/status/{campaign_id}", dependencies=[Depends(verify_api_key)])
+async def pacing_status(campaign_id: str):
+    state = BudgetPacer.campaigns.get(campaign_id) or await BudgetPacer.load(campaign_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"Campaign {campaign_id} not found")
+    return state.to_dict()
+
+@router.get("/stats/", dependencies=[Depends(verify_api_key)])
+async def pacing_stats():
+    return {
+        **BudgetPacer.stats,
+        "campaigns_tracked": len(BudgetPacer.campaigns),
+        "advertisers_tracked": len(BudgetPacer.advertisers),
+        "pending_spend_rows": len(BudgetPacer.pending_spend),
+        "pending_pauses": len(BudgetPacer.pause_requests)
+    }
@@ -2,10 +2,14 @@ import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel, Field, model_validator
 import aiomysql
 from database import Database
 import logging
-from typing import Optional
+from typing import List, Literal, Optional
+from utils.mail_queue import MailQueue
+from services.campaignapis.eligibility_matcher import EligibilityMatcher
+from services.campaignapis.campaign_status import change_campaigns_status
 
 # Constants
 APP_NAME = "CRONBID"
@@ -46,6 +50,10 @@ def send_campaign_activation_email(to_email: str, is_active: bool, campaign_name
     </html>
     """
 
+    send_html_email(to_email, subject, html_content)
+
+
+def send_html_email(to_email: str, subject: str, html_content: str):
     message = MIMEMultipart()
     message["From"] = SENDER_EMAIL
     message["To"] = to_email
@@ -61,6 +69,22 @@ def send_campaign_activation_email(to_email: str, is_active: bool, campaign_name
         print(f"[EMAIL ERROR] Failed to send email to {to_email}: {str(e)}")
 
 
+class BulkCampaignStatusRequest(BaseModel):
+    status: Literal["active", "inactive", "paused", "ended"]
+    # Explicit ids and/or filters; when combined, a campaign must match all of them
+    campaign_ids: Optional[List[str]] = Field(None, min_length=1, max_length=5000)
+    brand: Optional[str] = None
+    created_by: Optional[str] = None
+    user_id: str = "unknown"
+    user_name: Optional[str] = None
+
+    @model_validator(mode="after")
+    def require_selector(self):
+        if not (self.campaign_ids or self.brand or self.created_by):
+            raise ValueError("Provide campaign_ids, brand or created_by")
+        return self
+
+
 @router.post("/campaign_activation/{campaign_id}")
 async def activate_campaign(campaign_id: str, request: Request):
     """Activate or deactivate a campaign."""
@@ -103,10 +127,11 @@ async def activate_campaign(campaign_id: str, request: Request):
                 try:
                     # Update campaign status
                     await cur.execute(
-                        "UPDATE cronbid_campaigns SET status = %s WHERE campaign_id = %s",
+                        "UPDATE cronbid_campaigns SET status = %s, pause_reason = NULL, paused_at = NULL WHERE campaign_id = %s",
                         (new_status, campaign_id)
                     )
                     await conn.commit()
+                    EligibilityMatcher.campaign_status_changed(campaign_id, new_status)
                 except Exception as e:
                     logger.error(f"Database update error: {str(e)}")
                     await conn.rollback()
@@ -127,15 +152,13 @@ async def activate_campaign(campaign_id: str, request: Request):
                     raise HTTPException(status_code=500, detail="Failed to fetch campaign details")
 
                 if result and result.get('email'):
-                    try:
-                        send_campaign_activation_email(
-                            to_email=result['email'],
-                            is_active=is_active,
-                            campaign_name=result.get('campaign_title') or 'Untitled Campaign'
-                        )
-                    except Exception as e:
-                        logger.error(f"Email sending failed: {str(e)}")
-                        # Don't fail the request if email fails
+                    # Sent in the background; a failed email doesn't fail the request
+                    MailQueue.enqueue(
+                        send_campaign_activation_email,
+                        to_email=result['email'],
+                        is_active=is_active,
+                        campaign_name=result.get('campaign_title') or 'Untitled Campaign'
+                    )
 
         return {
             "status": "success",
@@ -153,3 +176,18 @@ async def activate_campaign(campaign_id: str, request: Request):
             detail=f"An unexpected error occurred: {str(e)}"
         )
 
+
+@router.post("/campaign_activation_bulk/")
+async def bulk_campaign_status(payload: BulkCampaignStatusRequest, request: Request):
+    """Set the status of campaigns selected by ids and/or brand / owner."""
+    if request.headers.get("x-api-key") != VALID_API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API key")
+
+    return await change_campaigns_status(
+        payload.status,
+        campaign_ids=payload.campaign_ids,
+        brand=payload.brand,
+        created_by=payload.created_by,
+        user_id=payload.user_id,
+        user_name=payload.user_name
+    )
@@ -4,6 +4,7 @@ from auth import double_key
 import aiomysql
 from typing import Optional, List
 import json
+from services.campaignapis.eligibility_matcher import EligibilityMatcher, simplify_targeting
 
 import os
 from dotenv import load_dotenv
@@ -17,6 +18,39 @@ UPLOADS_DIR = os.getenv("UPLOADS_DIR", "uploads/campaignsmedia") # Fallback to a
 
 router = APIRouter()
 
+def shape_campaign_row(row: dict, auth_key: int) -> dict:
+    """Partner view of a campaign row: payout alias, event ids and simplified targeting."""
+    # Handle conversion_flow (kept as per original logic)
+    if "conversion_flow" in row and row["conversion_flow"]:
+        try:
+            cf = json.loads(row["conversion_flow"])
+            if isinstance(cf, dict) and "amount" in cf:
+                cf["payout"] = cf["amount"]
+
+                # For auth_key == 2, replace event IDs with event names
+                if auth_key == 2 and "events" in cf:
+                    if isinstance(cf["events"], list):
+                        for event in cf["events"]:
+                            if isinstance(event, dict) and "name" in event:
+                                event["id"] = event["name"]
+
+                row["conversion_flow"] = json.dumps(cf)
+        except json.JSONDecodeError:
+            pass
+
+    original_targeting_data = None
+    if row.get("targeting"):
+        try:
+            original_targeting_data = json.loads(row["targeting"])
+        except json.JSONDecodeError:
+            original_targeting_data = None # Failed to parse
+
+    # Keep the original data in 'advanced_targeting' for completeness
+    row["advanced_targeting"] = json.dumps(original_targeting_data if original_targeting_data is not None else {})
+    # Always [{"country": "...", "excludedStates": [], "includedStates": []}]
+    row["targeting"] = json.dumps(simplify_targeting(original_targeting_data))
+    return row
+
 @router.get("/get_campaigns/")
 async def get_campaigns(
     campaign_id: Optional[str] = Query(None),
@@ -68,87 +102,48 @@ async def get_campaigns(
             # Only keep campaigns without "install" in conversion_flow
             rows = [row for row in rows if not (row.get("conversion_flow") and "install" in row.get("conversion_flow"))]
 
-        # Define the default simplified structure: [{"country": null, "excludedStates": [], "includedStates": []}]
-        DEFAULT_TARGETING = [{"country": None, "excludedStates": [], "includedStates": []}]
-
         for row in rows:
-            # Handle conversion_flow (kept as per original logic)
-            if "conversion_flow" in row and row["conversion_flow"]:
-                try:
-                    cf = json.loads(row["conversion_flow"])
-                    if isinstance(cf, dict) and "amount" in cf:
-                        cf["payout"] = cf["amount"]
-                        
-                        # For auth_key == 2, replace event IDs with event names
-                        if auth_key == 2 and "events" in cf:
-                            if isinstance(cf["events"], list):
-                                for event in cf["events"]:
-                                    if isinstance(event, dict) and "name" in event:
-                                        event["id"] = event["name"]
-                        
-                        row["conversion_flow"] = json.dumps(cf)
-                except json.JSONDecodeError:
-                    pass
+            shape_campaign_row(row, auth_key)
 
-            # --- ROBUST TARGETING LOGIC START ---
-            
-            source_targeting_str = row.get("targeting")
-            original_targeting_data = None
-            
-            # 1. Try to load the data from the 'targeting' column (which holds the raw DB data)
-            if source_targeting_str:
-                try:
-                    original_targeting_data = json.loads(source_targeting_str)
-                except json.JSONDecodeError:
-                    original_targeting_data = None # Failed to parse
+        return {"campaigns": rows}
 
-            # 2. Store the original data in 'advanced_targeting' for completeness
-            row["advanced_targeting"] = json.dumps(original_targeting_data if original_targeting_data is not None else {})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"API Error: {str(e)}")
 
-            simplified_targeting = []
-            
-            if original_targeting_data is not None:
-                
-                # Case 1: Complex structure with 'countrySelections' (from your full data example)
-                if isinstance(original_targeting_data, dict) and "countrySelections" in original_targeting_data:
-                    country_selections = original_targeting_data.get("countrySelections", [])
-                    if isinstance(country_selections, list):
-                        for item in country_selections:
-                            # Use 'selectedCountry' key if present; this handles the complex structure
-                            country_val = item.get("selectedCountry") or item.get("country")
-                            
-                            simplified_targeting.append({
-                                "country": country_val,
-                                "excludedStates": item.get("excludedStates", []),
-                                "includedStates": item.get("includedStates", [])
-                            })
-
-                # Case 2: Simplified List Format (from your direct DB query output)
-                elif isinstance(original_targeting_data, list):
-                    for item in original_targeting_data:
-                        # Use 'country' key if present; this handles the already simplified structure
-                        if isinstance(item, dict):
-                            simplified_targeting.append({
-                                "country": item.get("country"),
-                                "excludedStates": item.get("excludedStates", []),
-                                "includedStates": item.get("includedStates", [])
-                            })
-            
-            # 3. If no countries were successfully extracted, use the default structure
-            if not simplified_targeting:
-                simplified_targeting = DEFAULT_TARGETING
-                
-            # 4. Assign the final simplified structure to the 'targeting' key
-            # This ensures the output format is ALWAYS [{"country": "...", "excludedStates": [], "includedStates": []}]
-            row["targeting"] = json.dumps(simplified_targeting)
-            
-            # --- ROBUST TARGETING LOGIC END ---
 
-        return {"campaigns": rows}
+@router.get("/eligible_campaigns/")
+async def get_eligible_campaigns(
+    source_id: str = Query(...),
+    sub2: Optional[str] = Query(None),
+    country: Optional[str] = Query(None),
+    state: Optional[str] = Query(None),
+    os_name: Optional[str] = Query(None, alias="os"),
+    details: bool = Query(False, description="Return full campaign rows like get_campaigns instead of ids"),
+    auth_key: int = Depends(double_key)
+):
+    """
+    Active campaigns the source (and sub2) is approved for, targeting the
+    given country/state and OS. Answered from the in-memory eligibility index.
+    """
+    try:
+        # Same install/event split get_campaigns applies per key
+        campaign_ids = await EligibilityMatcher.match(
+            source_id, sub2, country, state, os_name, install=True if auth_key == 1 else False
+        )
+        if not details or not campaign_ids:
+            return {"count": len(campaign_ids), "campaign_ids": campaign_ids}
+
+        placeholders = ", ".join(["%s"] * len(campaign_ids))
+        pool = await Database.connect()
+        async with pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute(f"SELECT * FROM cronbid_campaigns WHERE campaign_id IN ({placeholders})", campaign_ids)
+                rows = await cur.fetchall()
+        return {"count": len(rows), "campaigns": [shape_campaign_row(row, auth_key) for row in rows]}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"API Error: {str(e)}")
-    
+
 
 
 
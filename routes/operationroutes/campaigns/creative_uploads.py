@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from database import Database
+from auth import verify_api_key
+from services.mediaapis.creative_uploads import (
+    STAGING_DIR, generate_upload_id, receive_multipart_upload, register_upload, user_staging_dir
+)
+import aiofiles.os
+import os
+
+router = APIRouter()
+
+UPLOAD_FORM_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["user_id", "file"],
+            "properties": {"user_id": {"type": "string"}, "file": {"type": "string", "format": "binary"}}
+        }}}
+    }
+}
+
+@router.post("/creative/", dependencies=[Depends(verify_api_key)], openapi_extra=UPLOAD_FORM_SCHEMA)
+async def upload_creative(request: Request):
+    """
+    Upload one creative or audience CSV as multipart/form-data (user_id, file).
+    The body is parsed as it is received and the file written straight to
+    disk, so oversized uploads are refused without being buffered. The
+    returned upload_id is then referenced from post_campaign/update_campaign
+    as {"uploadId": ...} instead of a base64 fileData.
+    """
+    fields, stored = await receive_multipart_upload(request, STAGING_DIR)
+
+    # user_id may come after the file in the body, so the file is moved
+    # into the user's staging directory once the whole form is read
+    user_id = fields.get("user_id")
+    try:
+        user_dir = user_staging_dir(user_id)
+    except HTTPException:
+        await aiofiles.os.remove(stored["path"])
+        raise
+    await aiofiles.os.makedirs(user_dir, exist_ok=True)
+    staged_path = os.path.join(user_dir, os.path.basename(stored["path"]))
+    await aiofiles.os.replace(stored["path"], staged_path)
+    stored["path"] = staged_path
+
+    upload_id = generate_upload_id()
+    try:
+        pool = await Database.connect()
+        async with pool.acquire() as conn:
+            await register_upload(conn, upload_id, user_id, stored["filename"], stored)
+            await conn.commit()
+    except Exception as e:
+        try:
+            await aiofiles.os.remove(stored["path"])
+        except OSError:
+            pass
+        raise HTTPException(status_code=500, detail=f"Upload registration failed: {str(e)}")
+
+    return {
+        "success": True,
+        "upload_id": upload_id,
+        "file_name": stored["filename"],
+        "mime_type": stored["mime_type"],
+        "size": stored["size"]
+    }
@@ -0,0 +1,86 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from auth import verify_api_key
+from services.campaignapis.postback_ingestion import EventCatalog, PostbackWriter, ingest_postback
+
+router = APIRouter()
+
+# Query parameters with a meaning of their own; everything else is kept in params
+POSTBACK_FIELDS = {"campaign_id", "event", "click_id", "transaction_id", "payout", "event_time", "source_id", "sub2", "country"}
+
+STATUS_CODES = {
+    "missing_id": (400, "click_id or transaction_id is required"),
+    "unknown_campaign": (404, "Campaign not found"),
+    "unknown_event": (400, "Event is not part of the campaign's conversion flow"),
+}
+
+class PostbackEvent(BaseModel):
+    campaign_id: str = Field(..., min_length=1, max_length=255)
+    event: str = Field(..., min_length=1, max_length=191)
+    click_id: Optional[str] = Field(None, max_length=191)
+    transaction_id: Optional[str] = Field(None, max_length=191)
+    payout: Optional[float] = None
+    event_time: Optional[datetime] = None
+    params: Optional[Dict[str, Any]] = None
+    source_id: Optional[str] = Field(None, max_length=64)
+    sub2: Optional[str] = Field(None, max_length=191)
+    country: Optional[str] = Field(None, max_length=16)
+
+class PostbackBatchRequest(BaseModel):
+    events: List[PostbackEvent] = Field(..., min_length=1, max_length=5000)
+
+@router.get("/", dependencies=[Depends(verify_api_key)])
+async def receive_postback(
+    request: Request,
+    campaign_id: str = Query(..., min_length=1, max_length=255),
+    event: str = Query(..., min_length=1, max_length=191),
+    click_id: Optional[str] = Query(None, max_length=191),
+    transaction_id: Optional[str] = Query(None, max_length=191),
+    payout: Optional[float] = None,
+    event_time: Optional[datetime] = None,
+    source_id: Optional[str] = Query(None, max_length=64),
+    sub2: Optional[str] = Query(None, max_length=191),
+    country: Optional[str] = Query(None, max_length=16)
+):
+    """
+    Single postback in the usual tracker format (query string). Answers once
+    the event is queued; a duplicate is a success so the sender stops retrying.
+    """
+    params = {k: v for k, v in request.query_params.items() if k not in POSTBACK_FIELDS}
+    result = await ingest_postback(
+        campaign_id, event, click_id, transaction_id, payout, event_time, params, source_id, sub2, country
+    )
+    status = result["status"]
+    if status == "overloaded":
+        raise HTTPException(status_code=503, detail="Postback queue full, retry later", headers={"Retry-After": "1"})
+    if status in STATUS_CODES:
+        code, message = STATUS_CODES[status]
+        raise HTTPException(status_code=code, detail=message)
+    return {"status": status, "event_id": result["event_id"]}
+
+@router.post("/batch/", dependencies=[Depends(verify_api_key)])
+async def receive_postback_batch(payload: PostbackBatchRequest):
+    """
+    Many postbacks in one request. Results are returned per event, in order;
+    events marked "overloaded" were not stored and should be sent again.
+    """
+    results = []
+    counts = {}
+    for item in payload.events:
+        result = await ingest_postback(
+            item.campaign_id, item.event, item.click_id, item.transaction_id,
+            item.payout, item.event_time, item.params, item.source_id, item.sub2, item.country
+        )
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+        results.append(result)
+    return {"counts": counts, "results": results}
+
+@router.get("/stats/", dependencies=[Depends(verify_api_key)])
+async def postback_stats():
+    return {
+        **PostbackWriter.stats,
+        "queued": PostbackWriter.queue.qsize() if PostbackWriter.queue else 0,
+        "campaigns_cached": len(EventCatalog.cache)
+    }
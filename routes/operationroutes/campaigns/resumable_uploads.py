@@ -0,0 +1,93 @@
+# Resumable (tus-style) uploads for large creatives and audience files:
+#   POST   /                       create a session, returns upload_id
+#   PATCH  /{upload_id}            append bytes at Upload-Offset (body = raw bytes)
+#   HEAD   /{upload_id}            current Upload-Offset / Upload-Length, to resume
+#   GET    /{upload_id}            same as HEAD, as JSON
+#   POST   /{upload_id}/finalize   validate and stage; optionally attach to a campaign
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+from database import Database
+from auth import verify_api_key
+from services.mediaapis.creative_uploads import USER_ID_PATTERN
+from services.mediaapis.resumable_uploads import (
+    append_chunk, attach_to_campaign, create_session, finalize_session, get_session
+)
+
+router = APIRouter()
+
+class CreateUploadRequest(BaseModel):
+    user_id: str = Field(..., min_length=1, pattern=f"^{USER_ID_PATTERN.pattern}$")
+    file_name: str = Field(..., min_length=1, max_length=255)
+    upload_length: int = Field(..., gt=0)
+
+class FinalizeUploadRequest(BaseModel):
+    campaign_id: Optional[str] = None
+    target: Literal["creatives", "uploadAudience"] = "creatives"
+    # uploadAudience entries only
+    event: Optional[str] = None
+    isEncrypted: bool = False
+    encryptionKey: Optional[str] = None
+
+def offset_headers(session: dict) -> dict:
+    return {
+        "Upload-Offset": str(session["upload_offset"]),
+        "Upload-Length": str(session["upload_length"]),
+        "Cache-Control": "no-store",
+    }
+
+@router.post("/", status_code=201, dependencies=[Depends(verify_api_key)])
+async def create_upload(payload: CreateUploadRequest):
+    pool = await Database.connect()
+    async with pool.acquire() as conn:
+        session = await create_session(conn, payload.user_id, payload.file_name, payload.upload_length)
+    return {"success": True, **session}
+
+@router.patch("/{upload_id}", dependencies=[Depends(verify_api_key)])
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    content_type: str = Header(None)
+):
+    if content_type != "application/offset+octet-stream":
+        raise HTTPException(status_code=415, detail="Content-Type must be application/offset+octet-stream")
+    pool = await Database.connect()
+    async with pool.acquire() as conn:
+        new_offset = await append_chunk(conn, upload_id, upload_offset, request)
+    return Response(status_code=204, headers={"Upload-Offset": str(new_offset)})
+
+@router.head("/{upload_id}", dependencies=[Depends(verify_api_key)])
+async def upload_offset(upload_id: str):
+    pool = await Database.connect()
+    async with pool.acquire() as conn:
+        session = await get_session(conn, upload_id)
+    return Response(status_code=200, headers=offset_headers(session))
+
+@router.get("/{upload_id}", dependencies=[Depends(verify_api_key)])
+async def upload_status(upload_id: str, response: Response):
+    pool = await Database.connect()
+    async with pool.acquire() as conn:
+        session = await get_session(conn, upload_id)
+    response.headers.update(offset_headers(session))
+    return {
+        "upload_id": session["upload_id"],
+        "status": session["status"],
+        "upload_offset": session["upload_offset"],
+        "upload_length": session["upload_length"],
+        "mime_type": session["mime_type"],
+        "expires_at": session["expires_at"],
+    }
+
+@router.post("/{upload_id}/finalize", dependencies=[Depends(verify_api_key)])
+async def finalize_upload(upload_id: str, payload: FinalizeUploadRequest = FinalizeUploadRequest()):
+    pool = await Database.connect()
+    async with pool.acquire() as conn:
+        staged = await finalize_session(conn, upload_id)
+        result = {"success": True, **staged}
+        if payload.campaign_id:
+            result["attached"] = await attach_to_campaign(
+                conn, upload_id, staged["user_id"], payload.campaign_id, payload.target,
+                payload.model_dump(include={"event", "isEncrypted", "encryptionKey"})
+            )
+    return result
@@ -3,9 +3,10 @@ from pydantic import BaseModel, Field
 from decimal import Decimal, InvalidOperation
 from database import Database
 from auth import verify_api_key
+from utils.mail_queue import MailQueue
+from utils.id_generator import generate_clean_id
+from typing import List
 import datetime
-import random
-import string
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
@@ -26,10 +27,11 @@ class FundRequest(BaseModel):
     created_by: str = Field(..., min_length=1)
     email: str = Field(..., min_length=5)
 
-def generate_clean_id(prefix: str) -> str:
-    timestamp = datetime.datetime.now().strftime("%y%m%d%H%M%S")
-    rand_suffix = ''.join(random.choices(string.ascii_lowercase + string.digits, k=4))
-    return f"{prefix}-{timestamp}{rand_suffix}"
+class FundBatchRequest(BaseModel):
+    credits: List[FundRequest] = Field(..., min_length=1, max_length=5000)
+
+# Rows per multi-row INSERT; keeps each statement well under max_allowed_packet
+BATCH_CHUNK_SIZE = 500
 
 def send_fund_email(to_email: str, user_name: str, amount: str, balance: str, transaction_type: str):
     subject = f"{APP_NAME} | Fund {transaction_type.capitalize()}"
@@ -147,7 +149,7 @@ async def post_funds(payload: FundRequest):
 
                 await cur.execute("COMMIT")
 
-        send_fund_email(payload.email, payload.user_name, str(fund_amount), str(new_fund), "credit")
+        MailQueue.enqueue(send_fund_email, payload.email, payload.user_name, str(fund_amount), str(new_fund), "credit")
 
         return {
             "message": "Funds processed successfully.",
@@ -164,3 +166,114 @@ async def post_funds(payload: FundRequest):
             async with conn.cursor() as cur:
                 await cur.execute("ROLLBACK")
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
+@router.post("/post_funds_batch/", dependencies=[Depends(verify_api_key)])
+async def post_funds_batch(payload: FundBatchRequest):
+    """
+    Apply many credits in one transaction.
+    Balances are locked once per user, transactions are written with multi-row
+    INSERTs and balances with a single upsert per chunk. Emails are queued,
+    one per user with the total credited in this batch.
+    """
+    currency = "USD"
+    current_time = datetime.datetime.now()
+    credits = payload.credits
+    user_ids = list(dict.fromkeys(c.user_id for c in credits))
+
+    pool = await Database.connect()
+    async with pool.acquire() as conn:
+        try:
+            await conn.begin()
+            async with conn.cursor() as cur:
+                balances = {}
+                for i in range(0, len(user_ids), BATCH_CHUNK_SIZE):
+                    chunk = user_ids[i:i + BATCH_CHUNK_SIZE]
+                    placeholders = ", ".join(["%s"] * len(chunk))
+                    await cur.execute(f"""
+                        SELECT user_id, fund FROM cronbid_user_funds
+                        WHERE user_id IN ({placeholders})
+                        FOR UPDATE
+                    """, chunk)
+                    for user_id, fund in await cur.fetchall():
+                        balances[user_id] = Decimal(fund or 0)
+
+                existing_users = set(balances)
+                results = []
+                transaction_rows = []
+                totals = {}
+                last_credit = {}
+
+                for index, credit in enumerate(credits):
+                    amount = Decimal(credit.fund)
+                    new_balance = balances.get(credit.user_id, Decimal("0")) + amount
+                    balances[credit.user_id] = new_balance
+                    totals[credit.user_id] = totals.get(credit.user_id, Decimal("0")) + amount
+                    last_credit[credit.user_id] = credit
+
+                    # Thousands of ids share one timestamp here, so use a longer suffix
+                    transaction_id = generate_clean_id("txn", suffix_length=8)
+                    transaction_rows.append((
+                        transaction_id, credit.user_id, credit.user_name,
+                        currency, amount, "credit", "Fund added",
+                        new_balance, credit.created_by, current_time
+                    ))
+                    results.append({
+                        "index": index,
+                        "user_id": credit.user_id,
+                        "transaction_id": transaction_id,
+                        "amount_added": str(amount),
+                        "new_balance": str(new_balance),
+                        "status": "credited"
+                    })
+
+                fund_rows = [
+                    (
+                        generate_clean_id("fund", suffix_length=8), user_id, last_credit[user_id].user_name,
+                        totals[user_id], currency, last_credit[user_id].created_by, current_time
+                    )
+                    for user_id in user_ids
+                ]
+
+                # executemany rewrites these into multi-row INSERT statements
+                for i in range(0, len(fund_rows), BATCH_CHUNK_SIZE):
+                    await cur.executemany("""
+                        INSERT INTO cronbid_user_funds (
+                            fund_id, user_id, user_name, fund, currency, created_by, last_updated_at
+                        )
+                        VALUES (%s, %s, %s, %s, %s, %s, %s)
+                        ON DUPLICATE KEY UPDATE
+                            fund = fund + VALUES(fund),
+                            last_updated_at = VALUES(last_updated_at)
+                    """, fund_rows[i:i + BATCH_CHUNK_SIZE])
+
+                for i in range(0, len(transaction_rows), BATCH_CHUNK_SIZE):
+                    await cur.executemany("""
+                        INSERT INTO cronbid_fund_transactions (
+                            transaction_id, user_id, user_name, currency,
+                            amount, type, description, balance_after_transaction,
+                            created_by, created_at
+                        )
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    """, transaction_rows[i:i + BATCH_CHUNK_SIZE])
+
+            await conn.commit()
+
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=f"Batch credit failed, no funds were applied: {str(e)}")
+
+    for user_id in user_ids:
+        credit = last_credit[user_id]
+        MailQueue.enqueue(
+            send_fund_email, credit.email, credit.user_name,
+            str(totals[user_id]), str(balances[user_id]), "credit"
+        )
+
+    return {
+        "message": "Batch funds processed successfully.",
+        "credited": len(results),
+        "users": len(user_ids),
+        "new_users": len(set(user_ids) - existing_users),
+        "results": results
+    }
@@ -2,10 +2,19 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from database import Database
 from auth import verify_api_key
 import aiomysql
-from typing import Optional
+import datetime
+from typing import Optional, Literal
+from services.fundapis.balance_snapshots import take_balance_snapshots, get_balance_as_of
+from utils.pagination import keyset_filter, split_page
 
 router = APIRouter()
 
+PERIOD_FORMATS = {
+    "day": "%%Y-%%m-%%d",
+    "month": "%%Y-%%m",
+    "year": "%%Y",
+}
+
 @router.get("/get_user_funds/", dependencies=[Depends(verify_api_key)])
 async def get_user_funds(
     user_id: Optional[str] = Query(None),
@@ -54,6 +63,10 @@ async def get_fund_transactions(
     user_name: Optional[str] = Query(None),
     fund_id: Optional[str] = Query(None),
     created_by: Optional[str] = Query(None),
+    start_date: Optional[datetime.datetime] = Query(None),
+    end_date: Optional[datetime.datetime] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
 ):
     try:
         filters = []
@@ -74,11 +87,73 @@ async def get_fund_transactions(
         if created_by:
             filters.append("created_by = %s")
             values.append(created_by)
+        if start_date:
+            filters.append("created_at >= %s")
+            values.append(start_date)
+        if end_date:
+            filters.append("created_at < %s")
+            values.append(end_date)
+        if cursor:
+            clause, cursor_values = keyset_filter(cursor)
+            filters.append(clause)
+            values.extend(cursor_values)
 
-        # Base query
+        # Base query, newest first; (user_id, created_at, id) index serves statement views
         query = "SELECT * FROM cronbid_fund_transactions"
         if filters:
             query += " WHERE " + " AND ".join(filters)
+        query += " ORDER BY created_at DESC, id DESC LIMIT %s"
+        values.append(limit + 1)
+
+        pool = await Database.connect()
+        async with pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute(query, values)
+                rows = await cur.fetchall()
+
+        rows, next_cursor = split_page(rows, limit)
+
+        return {"fund_transactions": rows, "next_cursor": next_cursor}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/get_fund_summary/", dependencies=[Depends(verify_api_key)])
+async def get_fund_summary(
+    user_id: Optional[str] = Query(None),
+    start_date: Optional[datetime.datetime] = Query(None),
+    end_date: Optional[datetime.datetime] = Query(None),
+    period: Literal["day", "month", "year"] = Query("day"),
+):
+    """Credit/debit totals per period, aggregated in MySQL."""
+    try:
+        filters = []
+        values = []
+
+        if user_id:
+            filters.append("user_id = %s")
+            values.append(user_id)
+        if start_date:
+            filters.append("created_at >= %s")
+            values.append(start_date)
+        if end_date:
+            filters.append("created_at < %s")
+            values.append(end_date)
+
+        period_format = PERIOD_FORMATS[period]
+        query = f"""
+            SELECT DATE_FORMAT(created_at, '{period_format}') AS period,
+                   SUM(CASE WHEN type = 'credit' THEN amount ELSE 0 END) AS total_credits,
+                   SUM(CASE WHEN type = 'debit' THEN amount ELSE 0 END) AS total_debits,
+                   COUNT(*) AS transaction_count
+            FROM cronbid_fund_transactions
+        """
+        if filters:
+            query += " WHERE " + " AND ".join(filters)
+        query += " GROUP BY period ORDER BY period"
 
         pool = await Database.connect()
         async with pool.acquire() as conn:
@@ -86,7 +161,32 @@ async def get_fund_transactions(
                 await cur.execute(query, values)
                 rows = await cur.fetchall()
 
-        return {"fund_transactions": rows}
+        return {"period": period, "summary": rows}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/get_balance_as_of/", dependencies=[Depends(verify_api_key)])
+async def get_user_balance_as_of(
+    user_id: str = Query(...),
+    as_of: datetime.datetime = Query(...),
+):
+    try:
+        pool = await Database.connect()
+        async with pool.acquire() as conn:
+            return await get_balance_as_of(conn, user_id, as_of)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/snapshot_balances/", dependencies=[Depends(verify_api_key)])
+async def snapshot_balances():
+    """Run the balance snapshot job now instead of waiting for the next scheduled run."""
+    try:
+        pool = await Database.connect()
+        async with pool.acquire() as conn:
+            written = await take_balance_snapshots(conn)
+        return {"message": "Balance snapshots updated.", "snapshots_written": written}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
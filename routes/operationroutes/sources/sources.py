@@ -1,55 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, Form
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, Form
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
 from database import Database
 from auth import verify_api_key
 import aiomysql
-import aiofiles
+import json
 import os
 from typing import Optional
+from services.mediaapis.image_pipeline import MAX_LOGO_BYTES, store_logo
+from services.sourceapis.source_catalog import invalidate_source_catalog, read_sources
 
 router = APIRouter()
 
+# Browsers may reuse the list for a minute, then revalidate with the ETag
+SOURCES_CACHE_CONTROL = "private, max-age=60"
+# Served by the /uploads mount in main.py
+LOGO_UPLOAD_DIR = os.path.join("uploads", "sourcesmedia")
+LOGO_URL_PREFIX = "/uploads/sourcesmedia"
+
 
 # ✅ GET sources with optional filters
 @router.get("/get_sources/", dependencies=[Depends(verify_api_key)])
 async def get_sources(
+    request: Request,
     source_id: Optional[str] = Query(None),
     name: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
     type: Optional[str] = Query(None)
 ):
+    """
+    Served from the in-process source catalog cache. Responses carry an ETag;
+    a matching If-None-Match gets a 304 instead of the list.
+    """
     try:
-        filters = []
-        values = []
-
-        if source_id:
-            filters.append("source_id = %s")
-            values.append(source_id)
-        if name:
-            filters.append("name = %s")
-            values.append(name)
-        if category:
-            filters.append("category = %s")
-            values.append(category)
-        if type:
-            filters.append("type = %s")
-            values.append(type)
-
-        query = "SELECT * FROM cronbid_sources"
-        if filters:
-            query += " WHERE " + " AND ".join(filters)
-
-        pool = await Database.connect()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute(query, values)
-                rows = await cur.fetchall()
-
-        return {"status": "success", "sources": rows}
-
+        catalog = await read_sources({"source_id": source_id, "name": name, "category": category, "type": type})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    headers = {"ETag": catalog["etag"], "Cache-Control": SOURCES_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match", "")
+    if catalog["etag"] in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(
+        content=jsonable_encoder({"status": "success", "sources": catalog["sources"]}),
+        headers=headers
+    )
+
 
 # ✅ POST: Add a new source
 
@@ -63,44 +59,40 @@ async def add_sources(
 ):
     """
     Add a new source record to cronbid_sources.
-    Saves logo asynchronously if provided and inserts the record into MySQL.
+    A logo, if provided, is validated, stripped of metadata and saved with
+    resized WebP/PNG variants before the record is inserted into MySQL.
     """
 
     try:
-        # --- ✅ Prepare upload directory safely ---
-        BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-        upload_dir = os.path.join(BASE_DIR, "uploads", "sourcesmedia")
-        os.makedirs(upload_dir, exist_ok=True)
-
         logo_path = None
+        logo_variants = None
 
-        # --- ✅ Handle logo upload asynchronously ---
+        # --- ✅ Handle logo upload in the image pipeline ---
         if logo:
-            file_ext = os.path.splitext(logo.filename)[1]
             safe_name = name.replace(" ", "_").replace("/", "_")
-            logo_filename = f"{safe_name}_{source_id}{file_ext}"
-            file_location = os.path.join(upload_dir, logo_filename)
-
-            # Async file write (non-blocking)
-            async with aiofiles.open(file_location, "wb") as f:
-                content = await logo.read()
-                await f.write(content)
-
-            # Relative path for response and DB
-            logo_path = f"/uploads/sourcesmedia/{logo_filename}"
+            content = await logo.read(MAX_LOGO_BYTES + 1)
+            try:
+                # Sniffed and re-encoded; the name carries a content digest so
+                # the logo and its variants can be served as immutable
+                saved_logo = await store_logo(content, LOGO_UPLOAD_DIR, LOGO_URL_PREFIX, f"{safe_name}_{source_id}")
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            logo_path = saved_logo["path"]
+            logo_variants = saved_logo["variants"]
 
         # --- ✅ Insert record into DB ---
         query = """
-            INSERT INTO cronbid_sources (source_id, name, category, type, logo)
-            VALUES (%s, %s, %s, %s, %s)
+            INSERT INTO cronbid_sources (source_id, name, category, type, logo, logo_variants)
+            VALUES (%s, %s, %s, %s, %s, %s)
         """
-        values = (source_id, name, category, type, logo_path)
+        values = (source_id, name, category, type, logo_path, json.dumps(logo_variants) if logo_variants is not None else None)
 
         pool = await Database.connect()
         async with pool.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cur:
                 await cur.execute(query, values)
                 await conn.commit()
+        invalidate_source_catalog()
 
         # --- ✅ Response ---
         return {
@@ -112,9 +104,13 @@ async def add_sources(
                 "category": category,
                 "type": type,
                 "logo": logo_path,
+                "logo_variants": logo_variants,
             },
         }
 
+    except HTTPException:
+        raise
+
     except aiomysql.Error as db_err:
         raise HTTPException(status_code=500, detail=f"Database error: {str(db_err)}")
 
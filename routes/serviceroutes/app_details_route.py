@@ -1,10 +1,15 @@
 # routes/app_details_route.py
 from fastapi import APIRouter, Query
-from models.app_details_model import AppDetails
-from services.customapis.app_details_services import fetch_app_details
+from models.app_details_model import AppDetails, AppDetailsBatchRequest, AppDetailsBatchResponse
+from services.customapis.app_details_services import fetch_app_details, fetch_app_details_batch
 
 router = APIRouter()
 
 @router.get("", response_model=AppDetails)
 async def get_app_details(package_id: str = Query(..., alias="package")):
     return await fetch_app_details(package_id)
+
+
+@router.post("/batch", response_model=AppDetailsBatchResponse)
+async def get_app_details_batch(payload: AppDetailsBatchRequest):
+    return await fetch_app_details_batch(payload.packages, payload.country, payload.lang)
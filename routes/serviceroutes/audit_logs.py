@@ -0,0 +1,75 @@
+# routes/serviceroutes/audit_logs.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from database import Database
+from auth import verify_api_key
+from utils.pagination import keyset_filter, split_page
+import aiomysql
+import datetime
+from typing import Optional, Literal
+
+router = APIRouter()
+
+LOG_COLUMNS = "id, log_id, action, table_name, record_id, user_id, username, action_description, created_at"
+
+@router.get("/logs/", dependencies=[Depends(verify_api_key)])
+async def get_audit_logs(
+    table_name: Optional[str] = Query(None),
+    record_id: Optional[str] = Query(None),
+    user_id: Optional[str] = Query(None),
+    action: Optional[Literal["create", "update", "delete", "view"]] = Query(None),
+    start_date: Optional[datetime.datetime] = Query(None),
+    end_date: Optional[datetime.datetime] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    Audit history, newest first. "History of campaign X" is
+    ?table_name=cronbid_campaigns&record_id=X and is served by
+    idx_logs_table_record_created; user filters use idx_logs_user_created.
+    """
+    try:
+        filters = []
+        values = []
+
+        if table_name:
+            filters.append("table_name = %s")
+            values.append(table_name)
+        if record_id:
+            filters.append("record_id = %s")
+            values.append(record_id)
+        if user_id:
+            filters.append("user_id = %s")
+            values.append(user_id)
+        if action:
+            filters.append("action = %s")
+            values.append(action)
+        if start_date:
+            filters.append("created_at >= %s")
+            values.append(start_date)
+        if end_date:
+            filters.append("created_at < %s")
+            values.append(end_date)
+        if cursor:
+            clause, cursor_values = keyset_filter(cursor)
+            filters.append(clause)
+            values.extend(cursor_values)
+
+        query = f"SELECT {LOG_COLUMNS} FROM cronbid_logs"
+        if filters:
+            query += " WHERE " + " AND ".join(filters)
+        query += " ORDER BY created_at DESC, id DESC LIMIT %s"
+        values.append(limit + 1)
+
+        pool = await Database.connect()
+        async with pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute(query, values)
+                rows = await cur.fetchall()
+
+        rows, next_cursor = split_page(rows, limit)
+        return {"logs": rows, "next_cursor": next_cursor}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
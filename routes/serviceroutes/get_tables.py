@@ -1,6 +1,11 @@
 # app/routes/database_routes.py
-from fastapi import APIRouter, Request, Header, HTTPException, Body
+from fastapi import APIRouter, Request, Header, HTTPException, Body, Query
+from fastapi.responses import StreamingResponse
 from database import Database
+from typing import List, Literal, Optional
+import csv
+import io
+import json
 # from config import settings
 import smtplib
 from email.mime.multipart import MIMEMultipart
@@ -9,27 +14,168 @@ import aiomysql
 
 router = APIRouter()
 
+# Tables exposed through the admin fetch/export endpoints and the column
+# used for keyset pagination. Anything not listed here is rejected.
+TABLE_REGISTRY = {
+    "cronbid_users": {"primary_key": "id", "hidden_columns": {"password"}},
+    "cronbid_campaigns": {"primary_key": "id"},
+    "cronbid_brands": {"primary_key": "id"},
+    "cronbid_logs": {"primary_key": "id"},
+    "cronbid_user_funds": {"primary_key": "id"},
+    "cronbid_fund_transactions": {"primary_key": "id"},
+    "cronbid_sources": {"primary_key": "id"},
+    "partner_status": {"primary_key": "id"},
+    "sub2_status": {"primary_key": "id"},
+}
+
+EXPORT_FETCH_SIZE = 1000
+
+# table_name -> column names, loaded once from SHOW COLUMNS
+_table_columns_cache = {}
+
+async def get_table_columns(conn, table_name: str) -> list:
+    if table_name not in _table_columns_cache:
+        async with conn.cursor() as cur:
+            await cur.execute(f"SHOW COLUMNS FROM `{table_name}`")
+            hidden = TABLE_REGISTRY[table_name].get("hidden_columns", set())
+            _table_columns_cache[table_name] = [row[0] for row in await cur.fetchall() if row[0] not in hidden]
+    return _table_columns_cache[table_name]
+
+def get_table_meta(table_name: str) -> dict:
+    meta = TABLE_REGISTRY.get(table_name)
+    if not meta:
+        raise HTTPException(status_code=404, detail=f"Table `{table_name}` is not available")
+    return meta
+
+def parse_where(where: List[str], columns: list):
+    """Each filter is 'column:value' (equality); columns must exist on the table."""
+    filters = []
+    values = []
+    for item in where or []:
+        column, sep, value = item.partition(":")
+        if not sep or column not in columns:
+            raise HTTPException(status_code=400, detail=f"Invalid filter: {item}")
+        filters.append(f"`{column}` = %s")
+        values.append(value)
+    return filters, values
+
+def select_columns(columns_param: Optional[str], columns: list, primary_key: str) -> list:
+    if not columns_param:
+        return columns
+    selected = [c.strip() for c in columns_param.split(",") if c.strip()]
+    unknown = [c for c in selected if c not in columns]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(unknown)}")
+    # The primary key is needed to build the next cursor
+    if primary_key not in selected:
+        selected.insert(0, primary_key)
+    return selected
+
+async def build_table_query(conn, table_name: str, columns_param: Optional[str], where: List[str]):
+    meta = get_table_meta(table_name)
+    primary_key = meta["primary_key"]
+    columns = await get_table_columns(conn, table_name)
+    selected = select_columns(columns_param, columns, primary_key)
+    filters, values = parse_where(where, columns)
+    query = f"SELECT {', '.join(f'`{c}`' for c in selected)} FROM `{table_name}`"
+    return query, filters, values, primary_key, selected
+
 @router.get("/fetch/{table_name}")
 async def fetch_table_data(
     table_name: str,
+    columns: Optional[str] = Query(None, description="Comma separated column list"),
+    where: List[str] = Query([], description="Equality filters as column:value, repeatable"),
+    after: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(500, ge=1, le=5000),
     x_api_key: str = Header(None)
 ):
     if x_api_key != "jdfjdhfjdhbfjdhfjhdjjhbdj":
         raise HTTPException(status_code=403, detail="Invalid or missing API key")
 
+    get_table_meta(table_name)
     pool = await Database.connect()
-    
+
     async with pool.acquire() as conn:
-        async with conn.cursor(aiomysql.DictCursor) as cur:
-            try:
-                await cur.execute(f"SELECT * FROM `{table_name}`")
+        try:
+            query, filters, values, primary_key, _ = await build_table_query(conn, table_name, columns, where)
+            if after is not None:
+                filters.append(f"`{primary_key}` > %s")
+                values.append(after)
+            if filters:
+                query += " WHERE " + " AND ".join(filters)
+            query += f" ORDER BY `{primary_key}` LIMIT %s"
+            values.append(limit + 1)
+
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute(query, values)
                 rows = await cur.fetchall()
-                return {"status": "success", "data": rows}
-            except aiomysql.MySQLError as e:
-                raise HTTPException(status_code=500, detail=str(e))
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"Error fetching data from table `{table_name}`: {str(e)}")
-            
+
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = rows[-1][primary_key]
+            return {"status": "success", "data": rows, "next_cursor": next_cursor}
+        except HTTPException:
+            raise
+        except aiomysql.MySQLError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Error fetching data from table `{table_name}`: {str(e)}")
+
+
+@router.get("/export/{table_name}")
+async def export_table_data(
+    table_name: str,
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    columns: Optional[str] = Query(None, description="Comma separated column list"),
+    where: List[str] = Query([], description="Equality filters as column:value, repeatable"),
+    x_api_key: str = Header(None)
+):
+    """
+    Stream a whole table as NDJSON or CSV. Rows come from a server-side
+    (unbuffered) cursor in chunks, so memory use does not grow with table size.
+    """
+    if x_api_key != "jdfjdhfjdhbfjdhfjhdjjhbdj":
+        raise HTTPException(status_code=403, detail="Invalid or missing API key")
+
+    get_table_meta(table_name)
+    pool = await Database.connect()
+
+    # Validate everything before the response starts, errors can't be reported mid-stream
+    async with pool.acquire() as conn:
+        query, filters, values, primary_key, selected = await build_table_query(conn, table_name, columns, where)
+    if filters:
+        query += " WHERE " + " AND ".join(filters)
+    query += f" ORDER BY `{primary_key}`"
+
+    async def stream_rows():
+        async with pool.acquire() as conn:
+            async with conn.cursor(aiomysql.SSCursor) as cur:
+                await cur.execute(query, values)
+                if format == "csv":
+                    buffer = io.StringIO()
+                    writer = csv.writer(buffer)
+                    writer.writerow(selected)
+                    yield buffer.getvalue()
+                while True:
+                    rows = await cur.fetchmany(EXPORT_FETCH_SIZE)
+                    if not rows:
+                        break
+                    if format == "csv":
+                        buffer = io.StringIO()
+                        writer = csv.writer(buffer)
+                        writer.writerows(rows)
+                        yield buffer.getvalue()
+                    else:
+                        yield "".join(json.dumps(dict(zip(selected, row)), default=str) + "\n" for row in rows)
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_rows(),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={table_name}.{'csv' if format == 'csv' else 'ndjson'}"}
+    )
+
 
 
 @router.delete("/delete_rows/")
@@ -0,0 +1,97 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from database import Database
+from auth import verify_api_key
+import aiomysql
+import datetime
+from typing import Optional
+from utils.ttl_cache import TTLCache
+
+router = APIRouter()
+
+DEFAULT_RANGE_DAYS = 30
+TOP_LIMIT = 10
+# The rollups only move every ROLLUP_INTERVAL_SECONDS, so neither should the dashboard
+dashboard_cache = TTLCache(maxsize=256, ttl=60)
+
+@router.get("/summary/", dependencies=[Depends(verify_api_key)])
+async def get_dashboard_summary(
+    date_from: Optional[datetime.date] = Query(None),
+    date_to: Optional[datetime.date] = Query(None),
+    campaign_id: Optional[str] = Query(None)
+):
+    """
+    Totals, a daily series and the top campaigns, sources and countries,
+    all from cronbid_report_daily (defaults to the last 30 days).
+    """
+    date_to = date_to or datetime.datetime.utcnow().date()
+    date_from = date_from or date_to - datetime.timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to is before date_from")
+
+    cache_key = (date_from, date_to, campaign_id)
+    cached = dashboard_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    where = "bucket >= %s AND bucket < %s"
+    values = [date_from, date_to + datetime.timedelta(days=1)]
+    if campaign_id:
+        where += " AND campaign_id = %s"
+        values.append(campaign_id)
+
+    try:
+        pool = await Database.connect()
+        async with pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute(f"""
+                    SELECT bucket AS day, SUM(conversions) AS conversions, SUM(payout) AS payout
+                    FROM cronbid_report_daily WHERE {where}
+                    GROUP BY bucket ORDER BY bucket
+                """, values)
+                series = await cur.fetchall()
+
+                await cur.execute(f"""
+                    SELECT r.campaign_id,
+                           JSON_UNQUOTE(JSON_EXTRACT(c.campaign_details, '$.campaignTitle')) AS campaign_title,
+                           r.conversions, r.payout
+                    FROM (
+                        SELECT campaign_id, SUM(conversions) AS conversions, SUM(payout) AS payout
+                        FROM cronbid_report_daily WHERE {where}
+                        GROUP BY campaign_id ORDER BY conversions DESC LIMIT %s
+                    ) r
+                    LEFT JOIN cronbid_campaigns c ON c.campaign_id = r.campaign_id
+                    ORDER BY r.conversions DESC
+                """, values + [TOP_LIMIT])
+                top_campaigns = await cur.fetchall()
+
+                await cur.execute(f"""
+                    SELECT source_id, SUM(conversions) AS conversions, SUM(payout) AS payout
+                    FROM cronbid_report_daily WHERE {where}
+                    GROUP BY source_id ORDER BY conversions DESC LIMIT %s
+                """, values + [TOP_LIMIT])
+                top_sources = await cur.fetchall()
+
+                await cur.execute(f"""
+                    SELECT country, SUM(conversions) AS conversions, SUM(payout) AS payout
+                    FROM cronbid_report_daily WHERE {where}
+                    GROUP BY country ORDER BY conversions DESC LIMIT %s
+                """, values + [TOP_LIMIT])
+                top_countries = await cur.fetchall()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    summary = {
+        "date_from": date_from,
+        "date_to": date_to,
+        "totals": {
+            # Summed from the series instead of another query over the same rows
+            "conversions": sum(row["conversions"] for row in series),
+            "payout": sum(row["payout"] for row in series),
+        },
+        "series": series,
+        "top_campaigns": top_campaigns,
+        "top_sources": top_sources,
+        "top_countries": top_countries,
+    }
+    dashboard_cache.set(cache_key, summary)
+    return summary
@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from database import Database
+import datetime
 from auth import verify_api_key
-import aiomysql
-from typing import Optional
-from utils.send_auth_mails import send_partner_status_notification
+from typing import List, Optional
+from utils.send_auth_mails import send_partner_status_digest, send_partner_status_notification
+from utils.mail_queue import MailQueue
+from services.campaignapis.eligibility_matcher import EligibilityMatcher
+from services.statusapis.status_reads import invalidate_status_cache, read_all_statuses, read_statuses
+from services.statusapis.status_events import StatusEvents
 
 router = APIRouter()
 
@@ -17,56 +21,87 @@ class PartnerStatusRequest(BaseModel):
     campaign_name: str
 
 @router.get("/partner-status/", dependencies=[Depends(verify_api_key)])
-async def get_partner_status():
+async def get_partner_status(
+    campaign_id: Optional[int] = Query(None),
+    source_id: Optional[int] = Query(None),
+    status: Optional[str] = Query(None),
+    since: Optional[datetime.datetime] = Query(None, description="Only rows changed at or after this time (next_since of the previous poll)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=5000),
+):
+    """
+    Without parameters: the whole table as a list, as before. With any filter,
+    since, cursor or limit: {"rows", "next_cursor", "next_since"} pages in
+    updated_at order. Both are served from a short-lived in-process cache.
+    """
     try:
-        pool = await Database.connect()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                query = "SELECT * FROM partner_status"
-                await cur.execute(query)
-                rows = await cur.fetchall()
-        return  rows
+        if all(v is None for v in (campaign_id, source_id, status, since, cursor, limit)):
+            return await read_all_statuses("partner_status")
+        filters = {"campaign_id": campaign_id, "source_id": source_id, "status": status}
+        return await read_statuses("partner_status", filters, since, cursor, limit or 500)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+PARTNER_STATUS_UPSERT_SQL = """
+    INSERT INTO partner_status (status, source_id, campaign_id, source_name, campaign_name)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE status = VALUES(status)
+"""
+
+class PartnerStatusBatchRequest(BaseModel):
+    changes: List[PartnerStatusRequest] = Field(..., min_length=1, max_length=1000)
+
 @router.post("/partner-status/", dependencies=[Depends(verify_api_key)])
 async def create_or_update_partner_status(request: PartnerStatusRequest):
     try:
         pool = await Database.connect()
         async with pool.acquire() as conn:
             async with conn.cursor() as cur:
-                # Check if record exists
-                check_query = """
-                    SELECT id FROM partner_status 
-                    WHERE source_id = %s AND campaign_id = %s
-                """
-                await cur.execute(check_query, (request.source_id, request.campaign_id))
-                existing_record = await cur.fetchone()
+                # One statement against uq_partner_status: no read-then-write race
+                await cur.execute(
+                    PARTNER_STATUS_UPSERT_SQL,
+                    (request.status, request.source_id, request.campaign_id, request.source_name, request.campaign_name)
+                )
+                # MySQL reports 1 for an insert, 2 for a changed row, 0 for no change
+                created = cur.rowcount == 1
+            await conn.commit()
+        invalidate_status_cache("partner_status")
+        EligibilityMatcher.partner_status_changed(request.source_id, request.campaign_id, request.status)
+        StatusEvents.publish("partner_status", request.model_dump())
 
-                if existing_record:
-                    # Update existing record
-                    update_query = """
-                        UPDATE partner_status 
-                        SET status = %s 
-                        WHERE source_id = %s AND campaign_id = %s
-                    """
-                    await cur.execute(update_query, (request.status, request.source_id, request.campaign_id))
-                    message = "Status updated successfully"
-                else:
-                    # Insert new record
-                    insert_query = """
-                        INSERT INTO partner_status (status, source_id, campaign_id, source_name, campaign_name) 
-                        VALUES (%s, %s, %s, %s, %s)
-                    """
-                    await cur.execute(insert_query, (request.status, request.source_id, request.campaign_id, request.source_name, request.campaign_name))
-                    message = "Status created successfully"
+        # Sent in the background; a failed email doesn't fail the request
+        MailQueue.enqueue(
+            send_partner_status_notification,
+            request.status, request.source_id, request.campaign_id, request.source_name, request.campaign_name
+        )
 
-                await conn.commit()
+        return {"status": "success", "message": "Status created successfully" if created else "Status updated successfully"}
 
-                # Send email notification
-                send_partner_status_notification(request.status, request.source_id, request.campaign_id, request.source_name, request.campaign_name)
-
-        return {"status": "success", "message": message}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/partner-status/batch/", dependencies=[Depends(verify_api_key)])
+async def create_or_update_partner_status_batch(request: PartnerStatusBatchRequest):
+    """Set many partner statuses in one multi-row upsert and send one digest email."""
+    # The last change for a (source, campaign) pair wins, as it would sequentially
+    changes = list({(c.source_id, c.campaign_id): c for c in request.changes}.values())
+    try:
+        pool = await Database.connect()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.executemany(PARTNER_STATUS_UPSERT_SQL, [
+                    (c.status, c.source_id, c.campaign_id, c.source_name, c.campaign_name) for c in changes
+                ])
+            await conn.commit()
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+    invalidate_status_cache("partner_status")
+    for c in changes:
+        EligibilityMatcher.partner_status_changed(c.source_id, c.campaign_id, c.status)
+        StatusEvents.publish("partner_status", c.model_dump())
+    MailQueue.enqueue(send_partner_status_digest, [c.model_dump() for c in changes])
+
+    return {"status": "success", "message": f"{len(changes)} statuses saved", "processed": len(changes)}
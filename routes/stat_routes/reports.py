@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from database import Database
+from auth import verify_api_key
+import aiomysql
+import datetime
+from typing import Optional, Literal
+from services.reportapis.report_rollups import build_report_query, run_rollups
+
+router = APIRouter()
+
+@router.get("/", dependencies=[Depends(verify_api_key)])
+async def get_report(
+    date_from: datetime.date = Query(...),
+    date_to: datetime.date = Query(...),
+    granularity: Literal["hour", "day", "month", "total"] = Query("day"),
+    group_by: Optional[str] = Query(None, description="Comma-separated: campaign, source, sub2, country, event"),
+    campaign_id: Optional[str] = Query(None),
+    source_id: Optional[str] = Query(None),
+    sub2: Optional[str] = Query(None),
+    country: Optional[str] = Query(None),
+    event_id: Optional[str] = Query(None),
+    limit: int = Query(1000, ge=1, le=10000)
+):
+    """
+    Conversions and payout from the rollup tables; both dates are inclusive.
+    Hourly reports cover at most 31 days, longer ranges use day or month.
+    """
+    dimensions = [d.strip() for d in group_by.split(",") if d.strip()] if group_by else []
+    filters = {
+        "campaign": campaign_id,
+        "source": source_id,
+        "sub2": sub2,
+        "country": country.upper() if country else None,
+        "event": event_id,
+    }
+    try:
+        query, values = build_report_query(granularity, date_from, date_to, dimensions, filters, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        pool = await Database.connect()
+        async with pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute(query, values)
+                rows = await cur.fetchall()
+        return {"granularity": granularity, "group_by": dimensions, "rows": rows}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/run_rollups/", dependencies=[Depends(verify_api_key)])
+async def run_report_rollups():
+    """Fold pending postbacks now instead of waiting for the next scheduled run."""
+    try:
+        pool = await Database.connect()
+        async with pool.acquire() as conn:
+            folded = await run_rollups(conn)
+        return {"message": "Report rollups updated.", "events_folded": folded}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
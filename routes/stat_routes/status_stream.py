@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from auth import verify_api_key
+import json
+from typing import Literal, Optional
+from services.statusapis.status_events import StatusEvents
+
+router = APIRouter()
+
+HEARTBEAT_SECONDS = 15
+
+def format_sse(event: dict) -> str:
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+@router.get("/events/", dependencies=[Depends(verify_api_key)])
+async def stream_status_events(
+    request: Request,
+    type: Optional[Literal["partner_status", "sub2_status"]] = Query(None),
+    campaign_id: Optional[int] = Query(None),
+    source_id: Optional[int] = Query(None),
+    sub2: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    last_event_id: Optional[int] = Query(None, description="Resume after this event id; the Last-Event-ID header takes precedence"),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Server-sent events for partner/sub2 status changes as they are committed,
+    limited to the given filters. Each event's id is its sequence number;
+    reconnecting with Last-Event-ID replays what was missed. A "reset" event
+    means the gap is too old to replay: re-read /partnerstatus or /sub2status
+    with ?since= and keep following the stream.
+    """
+    if last_event_id_header:
+        try:
+            last_event_id = int(last_event_id_header)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+
+    filters = {"type": type, "campaign_id": campaign_id, "source_id": source_id, "sub2": sub2, "status": status}
+    # Subscribed before the response starts so nothing committed meanwhile is missed
+    subscription = StatusEvents.broker.subscribe(filters, last_event_id)
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                event = await subscription.next_event(HEARTBEAT_SECONDS)
+                if event is None:
+                    if subscription.closed or await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            StatusEvents.broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/stats/", dependencies=[Depends(verify_api_key)])
+async def status_event_stats():
+    broker = StatusEvents.broker
+    return {
+        "subscribers": len(getattr(broker, "subscribers", ())),
+        "last_event_id": getattr(broker, "seq", None),
+        **getattr(broker, "stats", {}),
+    }
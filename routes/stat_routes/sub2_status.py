@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from database import Database
+import datetime
 from auth import verify_api_key
-import aiomysql
-from typing import Optional
-from utils.send_auth_mails import send_sub2_status_notification
+from typing import List, Optional
+from utils.send_auth_mails import send_sub2_status_digest, send_sub2_status_notification
+from utils.mail_queue import MailQueue
+from services.campaignapis.eligibility_matcher import EligibilityMatcher
+from services.statusapis.status_reads import invalidate_status_cache, read_all_statuses, read_statuses
+from services.statusapis.status_events import StatusEvents
 
 router = APIRouter()
 
@@ -18,56 +22,88 @@ class Sub2StatusRequest(BaseModel):
     campaign_name: str
 
 @router.get("/sub2-status/", dependencies=[Depends(verify_api_key)])
-async def get_sub2_status():
+async def get_sub2_status(
+    campaign_id: Optional[int] = Query(None),
+    source_id: Optional[int] = Query(None),
+    sub2: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    since: Optional[datetime.datetime] = Query(None, description="Only rows changed at or after this time (next_since of the previous poll)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=5000),
+):
+    """
+    Without parameters: the whole table as a list, as before. With any filter,
+    since, cursor or limit: {"rows", "next_cursor", "next_since"} pages in
+    updated_at order. Both are served from a short-lived in-process cache.
+    """
     try:
-        pool = await Database.connect()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                query = "SELECT * FROM sub2_status"
-                await cur.execute(query)
-                rows = await cur.fetchall()
-        return rows
+        if all(v is None for v in (campaign_id, source_id, sub2, status, since, cursor, limit)):
+            return await read_all_statuses("sub2_status")
+        filters = {"campaign_id": campaign_id, "source_id": source_id, "sub2": sub2, "status": status}
+        return await read_statuses("sub2_status", filters, since, cursor, limit or 500)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+SUB2_STATUS_UPSERT_SQL = """
+    INSERT INTO sub2_status (status, campaign_id, source_id, sub2, source_name, campaign_name)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE status = VALUES(status)
+"""
+
+class Sub2StatusBatchRequest(BaseModel):
+    changes: List[Sub2StatusRequest] = Field(..., min_length=1, max_length=1000)
+
 @router.post("/sub2-status/", dependencies=[Depends(verify_api_key)])
 async def create_or_update_sub2_status(request: Sub2StatusRequest):
     try:
         pool = await Database.connect()
         async with pool.acquire() as conn:
             async with conn.cursor() as cur:
-                # Check if record exists
-                check_query = """
-                    SELECT id FROM sub2_status 
-                    WHERE campaign_id = %s AND source_id = %s AND sub2 = %s
-                """
-                await cur.execute(check_query, (request.campaign_id, request.source_id, request.sub2))
-                existing_record = await cur.fetchone()
+                # One statement against uq_sub2_status: no read-then-write race
+                await cur.execute(
+                    SUB2_STATUS_UPSERT_SQL,
+                    (request.status, request.campaign_id, request.source_id, request.sub2, request.source_name, request.campaign_name)
+                )
+                # MySQL reports 1 for an insert, 2 for a changed row, 0 for no change
+                created = cur.rowcount == 1
+            await conn.commit()
+        invalidate_status_cache("sub2_status")
+        EligibilityMatcher.sub2_status_changed(request.source_id, request.campaign_id, request.sub2, request.status)
+        StatusEvents.publish("sub2_status", request.model_dump())
 
-                if existing_record:
-                    # Update existing record
-                    update_query = """
-                        UPDATE sub2_status 
-                        SET status = %s 
-                        WHERE campaign_id = %s AND source_id = %s AND sub2 = %s
-                    """
-                    await cur.execute(update_query, (request.status, request.campaign_id, request.source_id, request.sub2))
-                    message = "Status updated successfully"
-                else:
-                    # Insert new record
-                    insert_query = """
-                        INSERT INTO sub2_status (status, campaign_id, source_id, sub2, source_name, campaign_name) 
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                    """
-                    await cur.execute(insert_query, (request.status, request.campaign_id, request.source_id, request.sub2, request.source_name, request.campaign_name))
-                    message = "Status created successfully"
+        # Sent in the background; a failed email doesn't fail the request
+        MailQueue.enqueue(
+            send_sub2_status_notification,
+            request.status, request.campaign_id, request.source_id, request.sub2, request.source_name, request.campaign_name
+        )
 
-                await conn.commit()
+        return {"status": "success", "message": "Status created successfully" if created else "Status updated successfully"}
 
-                # Send email notification
-                send_sub2_status_notification(request.status, request.campaign_id, request.source_id, request.sub2, request.source_name, request.campaign_name)
-
-        return {"status": "success", "message": message}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/sub2-status/batch/", dependencies=[Depends(verify_api_key)])
+async def create_or_update_sub2_status_batch(request: Sub2StatusBatchRequest):
+    """Set many sub2 statuses (e.g. block a whole sub2 list) in one multi-row upsert and send one digest email."""
+    # The last change for a (campaign, source, sub2) triple wins, as it would sequentially
+    changes = list({(c.campaign_id, c.source_id, c.sub2): c for c in request.changes}.values())
+    try:
+        pool = await Database.connect()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.executemany(SUB2_STATUS_UPSERT_SQL, [
+                    (c.status, c.campaign_id, c.source_id, c.sub2, c.source_name, c.campaign_name) for c in changes
+                ])
+            await conn.commit()
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+    invalidate_status_cache("sub2_status")
+    for c in changes:
+        EligibilityMatcher.sub2_status_changed(c.source_id, c.campaign_id, c.sub2, c.status)
+        StatusEvents.publish("sub2_status", c.model_dump())
+    MailQueue.enqueue(send_sub2_status_digest, [c.model_dump() for c in changes])
+
+    return {"status": "success", "message": f"{len(changes)} statuses saved", "processed": len(changes)}
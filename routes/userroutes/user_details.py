@@ -1,6 +1,6 @@
-import re
 from fastapi import APIRouter, HTTPException, Header, status
 from database import Database
+from utils.input_validation import USER_PATTERN, is_malicious_input, validate_email
 from typing import Dict, List
 import os
 from dotenv import load_dotenv
@@ -10,23 +10,6 @@ load_dotenv()
 
 router = APIRouter()
 
-def is_malicious_input(value: str) -> bool:
-    """Enhanced check to detect SQL/malicious input."""
-    # More comprehensive regex pattern
-    regex = re.compile(
-        r"['\";]|--|#|/\*|\*/|"  # SQL comment markers and string terminators
-        r"\b(drop|alter|insert|delete|update|select|union|create|"  # SQL commands
-        r"exec|execute|declare|set|waitfor|cast|convert)\b|"  # More SQL keywords
-        r"xp_|sp_|syscolumns|syslogins|sysusers|sysobjects",  # SQL stored procedures and system tables
-        re.IGNORECASE
-    )
-    return bool(regex.search(str(value)))
-
-def validate_email(email: str) -> bool:
-    """Validate email format."""
-    email_regex = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
-    return bool(email_regex.match(email))
-
 def sanitize_input(data: dict):
     """Enhanced input sanitization and validation."""
     # Validate email formats if provided
@@ -61,7 +44,7 @@ def sanitize_input(data: dict):
     
     # Check for malicious input in all string fields
     for key, value in data.items():
-        if isinstance(value, str) and is_malicious_input(value):
+        if isinstance(value, str) and is_malicious_input(value, USER_PATTERN):
             raise HTTPException(
                 status_code=400,
                 detail=f"Invalid or dangerous input in field: {key}"
@@ -0,0 +1,472 @@
+# services/campaignapis/budget_pacing.py
+#
+# Budget pacing: spend events update in-memory counters per campaign and per
+# advertiser (O(1), no I/O on the hot path). A background flush writes the
+# accumulated deltas to cronbid_campaign_spend_daily and debits
+# cronbid_user_funds, and campaigns that hit their daily or total cap, or
+# whose advertiser ran out of funds, are paused through the regular status path.
+# The pause reason is stored on the campaign row (pause_reason), so daily-cap
+# pauses are resumed on the next UTC day by whichever node checks first, even
+# after a restart, and never once someone else has changed the campaign.
+#
+# Amounts are kept as integer micro-units to avoid float drift. Each node
+# counts its own events and re-reads durable totals every STATE_TTL_SECONDS,
+# so with several nodes a cap can be overshot by at most one flush interval
+# of the other nodes' spend.
+
+import asyncio
+import datetime
+import json
+import logging
+import time
+from decimal import Decimal, InvalidOperation
+from database import Database
+from utils.id_generator import generate_clean_id
+from services.campaignapis.campaign_status import change_campaigns_status
+
+logger = logging.getLogger(__name__)
+
+MICROS = 1_000_000
+FLUSH_INTERVAL_SECONDS = 10
+STATE_TTL_SECONDS = 60
+RESUME_CHECK_INTERVAL_SECONDS = 60
+EPOCH = datetime.date(1970, 1, 1)
+
+# Keys the campaign wizard may use inside the budget JSON
+DAILY_BUDGET_KEYS = ("dailyBudget", "daily_budget", "dailyCap", "daily")
+TOTAL_BUDGET_KEYS = ("totalBudget", "total_budget", "lifetimeBudget", "totalCap", "total")
+
+# cronbid_campaigns.pause_reason -> log text
+PAUSE_REASONS = {
+    "daily_cap": "Daily budget reached",
+    "total_cap": "Total budget reached",
+    "funds_exhausted": "advertiser funds exhausted",
+}
+
+
+def to_micros(value) -> int:
+    """Parse an amount ("1,250.50", 99, 12.5) to micro-units; None if missing or not positive."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        amount = Decimal(str(value).replace(",", "").strip())
+    except InvalidOperation:
+        return None
+    if not amount.is_finite() or amount <= 0:
+        return None
+    return int(amount * MICROS)
+
+
+def parse_budget_caps(budget: dict) -> tuple:
+    """(daily_cap, total_cap) in micros from the campaign budget JSON; None = no cap."""
+    if not isinstance(budget, dict):
+        return None, None
+    daily = next((to_micros(budget[k]) for k in DAILY_BUDGET_KEYS if budget.get(k) not in (None, "")), None)
+    total = next((to_micros(budget[k]) for k in TOTAL_BUDGET_KEYS if budget.get(k) not in (None, "")), None)
+    return daily, total
+
+
+def current_day() -> int:
+    """UTC day number; spend days roll over at 00:00 UTC."""
+    return int(time.time() // 86400)
+
+
+class CampaignPacing:
+    __slots__ = ("campaign_id", "user_id", "daily_cap", "total_cap", "spent_today",
+                 "spent_total", "day", "paused", "loaded_at")
+
+    def __init__(self, campaign_id, user_id, daily_cap, total_cap, spent_today, spent_total, day, paused):
+        self.campaign_id = campaign_id
+        self.user_id = user_id
+        self.daily_cap = daily_cap
+        self.total_cap = total_cap
+        self.spent_today = spent_today
+        self.spent_total = spent_total
+        self.day = day
+        self.paused = paused
+        self.loaded_at = time.monotonic()
+
+    def to_dict(self) -> dict:
+        return {
+            "campaign_id": self.campaign_id,
+            "user_id": self.user_id,
+            "daily_cap": self.daily_cap / MICROS if self.daily_cap else None,
+            "total_cap": self.total_cap / MICROS if self.total_cap else None,
+            "spent_today": self.spent_today / MICROS,
+            "spent_total": self.spent_total / MICROS,
+            "paused": self.paused,
+        }
+
+
+class AdvertiserPacing:
+    __slots__ = ("user_id", "balance", "unflushed", "exhausted")
+
+    def __init__(self, user_id, balance):
+        self.user_id = user_id
+        # Balance as last read from cronbid_user_funds; spend since then is in unflushed
+        self.balance = balance
+        self.unflushed = 0
+        self.exhausted = False
+
+
+class BudgetPacer:
+    campaigns = {}
+    advertisers = {}
+    # (campaign_id, day) -> micros not yet written
+    pending_spend = {}
+    # user_id -> micros not yet debited
+    pending_debits = {}
+    # campaign_id -> pause reason code, waiting for the status update
+    pause_requests = {}
+    exhausted_advertisers = set()
+    stats = {"events": 0, "rejected": 0, "unknown": 0, "paused": 0, "flushes": 0, "flush_errors": 0}
+
+    _loading = {}
+    _resume_checked_at = 0.0
+    _pause_wakeup: asyncio.Event = None
+    flush_task: asyncio.Task = None
+    pause_task: asyncio.Task = None
+
+    @classmethod
+    async def start(cls, flush_interval: int = FLUSH_INTERVAL_SECONDS):
+        if cls.flush_task is None:
+            cls._pause_wakeup = asyncio.Event()
+            cls.flush_task = asyncio.create_task(cls._flush_loop(flush_interval))
+            cls.pause_task = asyncio.create_task(cls._pause_loop())
+
+    @classmethod
+    async def stop(cls):
+        for task in (cls.flush_task, cls.pause_task):
+            if task:
+                task.cancel()
+        cls.flush_task = cls.pause_task = None
+        # Don't lose the last interval's spend
+        await cls.flush()
+
+    # ---- hot path ----
+
+    @classmethod
+    async def record_spend(cls, campaign_id: str, amount: int) -> str:
+        """
+        Count `amount` micros of spend. Returns "ok", "capped" (this event hit
+        a cap), "paused" (campaign already paused, not counted) or "unknown".
+        """
+        state = cls.campaigns.get(campaign_id)
+        if state is None:
+            state = await cls.load(campaign_id)
+            if state is None:
+                cls.stats["unknown"] += 1
+                return "unknown"
+        elif time.monotonic() - state.loaded_at > STATE_TTL_SECONDS and campaign_id not in cls._loading:
+            # Refresh caps/status in the background; keep serving the current state
+            cls._loading[campaign_id] = asyncio.ensure_future(cls._load(campaign_id))
+        return cls.apply_spend(state, amount)
+
+    @classmethod
+    def apply_spend(cls, state: CampaignPacing, amount: int) -> str:
+        today = current_day()
+        if state.day != today:
+            state.day = today
+            state.spent_today = 0
+        if state.paused:
+            cls.stats["rejected"] += 1
+            return "paused"
+
+        cls.stats["events"] += 1
+        state.spent_today += amount
+        state.spent_total += amount
+        key = (state.campaign_id, today)
+        cls.pending_spend[key] = cls.pending_spend.get(key, 0) + amount
+
+        advertiser = cls.advertisers.get(state.user_id)
+        if advertiser is not None:
+            advertiser.unflushed += amount
+            cls.pending_debits[state.user_id] = cls.pending_debits.get(state.user_id, 0) + amount
+            if not advertiser.exhausted and advertiser.balance - advertiser.unflushed <= 0:
+                cls.exhaust_advertiser(advertiser)
+                return "capped"
+
+        if state.total_cap and state.spent_total >= state.total_cap:
+            cls.request_pause(state, "total_cap")
+            return "capped"
+        if state.daily_cap and state.spent_today >= state.daily_cap:
+            cls.request_pause(state, "daily_cap")
+            return "capped"
+        return "ok"
+
+    @classmethod
+    def request_pause(cls, state: CampaignPacing, reason: str):
+        state.paused = True
+        cls.stats["paused"] += 1
+        cls.pause_requests[state.campaign_id] = reason
+        if cls._pause_wakeup:
+            cls._pause_wakeup.set()
+
+    @classmethod
+    def exhaust_advertiser(cls, advertiser: AdvertiserPacing):
+        advertiser.exhausted = True
+        for state in cls.campaigns.values():
+            if state.user_id == advertiser.user_id:
+                state.paused = True
+        cls.exhausted_advertisers.add(advertiser.user_id)
+        if cls._pause_wakeup:
+            cls._pause_wakeup.set()
+
+    # ---- state loading ----
+
+    @classmethod
+    async def load(cls, campaign_id: str):
+        """Load one campaign's caps and durable totals; concurrent callers share the query."""
+        task = cls._loading.get(campaign_id)
+        if task is None:
+            task = cls._loading[campaign_id] = asyncio.ensure_future(cls._load(campaign_id))
+        return await asyncio.shield(task)
+
+    @classmethod
+    async def _load(cls, campaign_id: str):
+        try:
+            today = current_day()
+            pool = await Database.connect()
+            async with pool.acquire() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute("""
+                        SELECT c.created_by, c.status, c.budget, f.fund,
+                               COALESCE(SUM(CASE WHEN s.spend_date = %s THEN s.amount END), 0),
+                               COALESCE(SUM(s.amount), 0)
+                        FROM cronbid_campaigns c
+                        LEFT JOIN cronbid_user_funds f ON f.user_id = c.created_by
+                        LEFT JOIN cronbid_campaign_spend_daily s ON s.campaign_id = c.campaign_id
+                        WHERE c.campaign_id = %s
+                        GROUP BY c.id, f.fund
+                    """, (EPOCH + datetime.timedelta(days=today), campaign_id))
+                    row = await cur.fetchone()
+            if not row:
+                cls.campaigns.pop(campaign_id, None)
+                return None
+
+            user_id, status, budget, fund, spent_today, spent_total = row
+            try:
+                daily_cap, total_cap = parse_budget_caps(json.loads(budget) if budget else {})
+            except ValueError:
+                daily_cap, total_cap = None, None
+            # Spend counted here but not flushed yet is not in the database totals
+            unflushed_today = cls.pending_spend.get((campaign_id, today), 0)
+            unflushed_total = sum(v for (cid, _), v in cls.pending_spend.items() if cid == campaign_id)
+            state = CampaignPacing(
+                campaign_id, user_id, daily_cap, total_cap,
+                int(Decimal(spent_today) * MICROS) + unflushed_today,
+                int(Decimal(spent_total) * MICROS) + unflushed_total,
+                today,
+                paused=status != "active" or campaign_id in cls.pause_requests,
+            )
+            cls.campaigns[campaign_id] = state
+
+            if user_id and fund is not None:
+                advertiser = cls.advertisers.get(user_id)
+                if advertiser is None:
+                    cls.advertisers[user_id] = AdvertiserPacing(user_id, int(Decimal(fund) * MICROS))
+                elif user_id not in cls.exhausted_advertisers:
+                    # Picks up credits made since; spend not debited yet stays in unflushed
+                    advertiser.balance = int(Decimal(fund) * MICROS)
+                    advertiser.exhausted = advertiser.balance - advertiser.unflushed <= 0
+            return state
+        except Exception as e:
+            logger.error(f"[PACING] Loading {campaign_id} failed: {e}")
+            return cls.campaigns.get(campaign_id)
+        finally:
+            cls._loading.pop(campaign_id, None)
+
+    # ---- durable flush ----
+
+    @classmethod
+    async def _flush_loop(cls, interval: int):
+        while True:
+            await asyncio.sleep(interval)
+            await cls.flush()
+            await cls._resume_daily_capped()
+
+    @classmethod
+    async def flush(cls):
+        if not cls.pending_spend and not cls.pending_debits:
+            return
+        spend, cls.pending_spend = cls.pending_spend, {}
+        debits, cls.pending_debits = cls.pending_debits, {}
+        # Funds are DECIMAL(10,2): debit whole cents, carry the remainder
+        cents = {user_id: micros // 10_000 for user_id, micros in debits.items()}
+        carried = {user_id: micros % 10_000 for user_id, micros in debits.items() if micros % 10_000}
+        cents = {user_id: c for user_id, c in cents.items() if c > 0}
+
+        try:
+            pool = await Database.connect()
+            async with pool.acquire() as conn:
+                await conn.begin()
+                try:
+                    async with conn.cursor() as cur:
+                        # executemany rewrites this into one multi-row upsert
+                        await cur.executemany("""
+                            INSERT INTO cronbid_campaign_spend_daily (campaign_id, spend_date, amount)
+                            VALUES (%s, %s, %s)
+                            ON DUPLICATE KEY UPDATE amount = amount + VALUES(amount)
+                        """, [
+                            (campaign_id, EPOCH + datetime.timedelta(days=day), Decimal(micros) / MICROS)
+                            for (campaign_id, day), micros in spend.items()
+                        ])
+
+                        balances = {}
+                        if cents:
+                            user_ids = list(cents)
+                            cases = " ".join(["WHEN %s THEN %s"] * len(user_ids))
+                            placeholders = ", ".join(["%s"] * len(user_ids))
+                            case_values = [v for user_id in user_ids for v in (user_id, Decimal(cents[user_id]) / 100)]
+                            await cur.execute(f"""
+                                UPDATE cronbid_user_funds
+                                SET fund = fund - CASE user_id {cases} END
+                                WHERE user_id IN ({placeholders})
+                            """, (*case_values, *user_ids))
+                            await cur.execute(
+                                f"SELECT user_id, user_name, fund FROM cronbid_user_funds WHERE user_id IN ({placeholders})",
+                                user_ids
+                            )
+                            now = datetime.datetime.now()
+                            rows = await cur.fetchall()
+                            balances = {user_id: fund for user_id, _, fund in rows}
+                            # Keep the ledger consistent with the balances (snapshots are built from it)
+                            await cur.executemany("""
+                                INSERT INTO cronbid_fund_transactions (
+                                    transaction_id, user_id, user_name, currency,
+                                    amount, type, description, balance_after_transaction,
+                                    created_by, created_at
+                                )
+                                VALUES (%s, %s, %s, 'USD', %s, 'debit', 'Campaign spend', %s, 'budget_pacing', %s)
+                            """, [
+                                (generate_clean_id("txn", suffix_length=8), user_id, user_name,
+                                 Decimal(cents[user_id]) / 100, fund, now)
+                                for user_id, user_name, fund in rows
+                            ])
+                    await conn.commit()
+                except Exception:
+                    await conn.rollback()
+                    raise
+        except Exception as e:
+            cls.stats["flush_errors"] += 1
+            logger.error(f"[PACING] Flush failed, keeping {len(spend)} spend rows for the next one: {e}")
+            for key, micros in spend.items():
+                cls.pending_spend[key] = cls.pending_spend.get(key, 0) + micros
+            for user_id, micros in debits.items():
+                cls.pending_debits[user_id] = cls.pending_debits.get(user_id, 0) + micros
+            return
+
+        cls.stats["flushes"] += 1
+        for user_id, micros in carried.items():
+            cls.pending_debits[user_id] = cls.pending_debits.get(user_id, 0) + micros
+        for user_id, fund in balances.items():
+            advertiser = cls.advertisers.get(user_id)
+            if advertiser is not None:
+                advertiser.balance = int(Decimal(fund) * MICROS)
+                advertiser.unflushed -= cents[user_id] * 10_000
+
+    # ---- pausing through the status path ----
+
+    @classmethod
+    async def _pause_loop(cls):
+        while True:
+            await cls._pause_wakeup.wait()
+            cls._pause_wakeup.clear()
+
+            requests, cls.pause_requests = cls.pause_requests, {}
+            by_reason = {}
+            for campaign_id, reason in requests.items():
+                by_reason.setdefault(reason, []).append(campaign_id)
+            for reason, campaign_ids in by_reason.items():
+                try:
+                    # Only active campaigns: a stale request must not relabel
+                    # a campaign someone paused or stopped by hand
+                    await change_campaigns_status(
+                        "paused", campaign_ids=campaign_ids, from_status="active", pause_reason=reason,
+                        user_id="budget_pacing", reason=f"Auto-paused: {PAUSE_REASONS[reason]}"
+                    )
+                except Exception as e:
+                    logger.error(f"[PACING] Pausing {campaign_ids} failed: {e}")
+                    for campaign_id in campaign_ids:
+                        cls.pause_requests.setdefault(campaign_id, reason)
+
+            exhausted, cls.exhausted_advertisers = cls.exhausted_advertisers, set()
+            for user_id in exhausted:
+                try:
+                    await change_campaigns_status(
+                        "paused", created_by=user_id, from_status="active", pause_reason="funds_exhausted",
+                        user_id="budget_pacing", reason=f"Auto-paused: {PAUSE_REASONS['funds_exhausted']}"
+                    )
+                except Exception as e:
+                    logger.error(f"[PACING] Pausing campaigns of {user_id} failed: {e}")
+                    cls.exhausted_advertisers.add(user_id)
+
+            if cls.pause_requests or cls.exhausted_advertisers:
+                # Failed ones: retry after a pause instead of spinning
+                await asyncio.sleep(5)
+                cls._pause_wakeup.set()
+
+    @classmethod
+    async def _resume_daily_capped(cls):
+        """
+        Campaigns paused for their daily cap on an earlier UTC day start
+        spending again. The conditional UPDATE in change_campaigns_status only
+        matches rows still paused with pause_reason 'daily_cap', so a campaign
+        paused, resumed or edited by anyone else since is left alone.
+        """
+        now = time.monotonic()
+        if now - cls._resume_checked_at < RESUME_CHECK_INTERVAL_SECONDS:
+            return
+        cls._resume_checked_at = now
+
+        day_start = datetime.datetime.combine(EPOCH + datetime.timedelta(days=current_day()), datetime.time())
+        try:
+            pool = await Database.connect()
+            async with pool.acquire() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute("""
+                        SELECT campaign_id FROM cronbid_campaigns
+                        WHERE status = 'paused' AND pause_reason = 'daily_cap' AND paused_at < %s
+                    """, (day_start,))
+                    candidates = [row[0] for row in await cur.fetchall()]
+        except Exception as e:
+            logger.error(f"[PACING] Looking up daily-capped campaigns failed: {e}")
+            return
+
+        resume_ids, total_capped = [], []
+        for campaign_id in candidates:
+            if campaign_id in cls.pause_requests:
+                continue
+            state = cls.campaigns.get(campaign_id) or await cls.load(campaign_id)
+            if state is None:
+                continue
+            advertiser = cls.advertisers.get(state.user_id)
+            if advertiser is not None and advertiser.exhausted:
+                continue
+            if state.total_cap and state.spent_total >= state.total_cap:
+                total_capped.append(campaign_id)
+            else:
+                resume_ids.append(campaign_id)
+
+        try:
+            if total_capped:
+                # Still paused, but a new day must not bring these back
+                await change_campaigns_status(
+                    "paused", campaign_ids=total_capped,
+                    from_status="paused", from_pause_reason="daily_cap", pause_reason="total_cap",
+                    user_id="budget_pacing"
+                )
+            if resume_ids:
+                result = await change_campaigns_status(
+                    "active", campaign_ids=resume_ids,
+                    from_status="paused", from_pause_reason="daily_cap",
+                    user_id="budget_pacing", reason="Auto-resumed: new budget day"
+                )
+                for campaign_id in result["updated"]:
+                    state = cls.campaigns.get(campaign_id)
+                    if state is not None:
+                        state.paused = False
+        except Exception as e:
+            logger.error(f"[PACING] Resuming daily-capped campaigns failed: {e}")
+            # Try again on the next flush instead of waiting a full interval
+            cls._resume_checked_at = 0.0
@@ -0,0 +1,128 @@
+# services/campaignapis/campaign_status.py
+#
+# Bulk campaign status changes, shared by the status routes and the budget
+# pacer.
+
+import datetime
+import logging
+from collections import defaultdict
+from typing import List
+import aiomysql
+from fastapi import HTTPException
+from database import Database
+from utils.logger import insert_log_entry
+from utils.mail_queue import MailQueue
+from utils.send_auth_mails import send_campaign_status_digest
+from services.campaignapis.eligibility_matcher import EligibilityMatcher
+
+logger = logging.getLogger(__name__)
+
+
+async def change_campaigns_status(
+    new_status: str,
+    campaign_ids: List[str] = None,
+    brand: str = None,
+    created_by: str = None,
+    user_id: str = "unknown",
+    user_name: str = None,
+    reason: str = None,
+    pause_reason: str = None,
+    from_status: str = None,
+    from_pause_reason: str = None
+) -> dict:
+    """
+    Set the status of many campaigns at once: one locking JOIN to find the
+    campaigns and their owners, one UPDATE, and one digest email per owner.
+    Filters combine with AND; from_status / from_pause_reason restrict the
+    change to campaigns currently in that state.
+
+    pause_reason records why a campaign was paused by the system (e.g.
+    "daily_cap"); any other change, including a manual pause, clears it so
+    automatic resumes only ever touch campaigns the system paused itself.
+    """
+    conditions = []
+    params = []
+    if campaign_ids:
+        campaign_ids = list(dict.fromkeys(campaign_ids))
+        conditions.append(f"c.campaign_id IN ({', '.join(['%s'] * len(campaign_ids))})")
+        params.extend(campaign_ids)
+    if brand:
+        conditions.append("c.brand = %s")
+        params.append(brand)
+    if created_by:
+        conditions.append("c.created_by = %s")
+        params.append(created_by)
+    if not conditions:
+        raise ValueError("change_campaigns_status needs campaign_ids, brand or created_by")
+    if from_status:
+        conditions.append("c.status = %s")
+        params.append(from_status)
+    if from_pause_reason:
+        conditions.append("c.pause_reason = %s")
+        params.append(from_pause_reason)
+    new_pause_reason = pause_reason if new_status == "paused" else None
+    paused_at = datetime.datetime.utcnow() if new_pause_reason else None
+
+    pool = await Database.connect()
+    async with pool.acquire() as conn:
+        await conn.begin()
+        try:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute(f"""
+                    SELECT c.campaign_id, c.status, c.pause_reason, c.created_by, u.email,
+                           JSON_UNQUOTE(JSON_EXTRACT(c.campaign_details, '$.campaignTitle')) AS campaign_title
+                    FROM cronbid_campaigns c
+                    LEFT JOIN cronbid_users u ON c.created_by = u.user_id
+                    WHERE {' AND '.join(conditions)}
+                    FOR UPDATE
+                """, params)
+                campaigns = await cur.fetchall()
+
+                changed = [c for c in campaigns if c["status"] != new_status]
+                # Same status, different reason (e.g. an operator pausing an
+                # auto-paused campaign): only the reason changes, no email
+                relabeled = [
+                    c for c in campaigns
+                    if c["status"] == new_status and c["pause_reason"] != new_pause_reason
+                ]
+                to_update = changed + relabeled
+                if to_update:
+                    await cur.execute(
+                        f"""UPDATE cronbid_campaigns SET status = %s, pause_reason = %s, paused_at = %s
+                            WHERE campaign_id IN ({', '.join(['%s'] * len(to_update))})""",
+                        (new_status, new_pause_reason, paused_at, *[c["campaign_id"] for c in to_update])
+                    )
+            await conn.commit()
+        except Exception as e:
+            await conn.rollback()
+            logger.error(f"Bulk status update failed: {str(e)}")
+            raise HTTPException(status_code=500, detail="Failed to update campaign status")
+
+        for campaign in changed:
+            EligibilityMatcher.campaign_status_changed(campaign["campaign_id"], new_status)
+            await insert_log_entry(
+                conn,
+                action="update",
+                table_name="cronbid_campaigns",
+                record_id=campaign["campaign_id"],
+                user_id=user_id,
+                username=user_name,
+                action_description=reason or f"Bulk status change to '{new_status}'"
+            )
+
+    digests = defaultdict(list)
+    for campaign in changed:
+        if campaign["email"]:
+            digests[campaign["email"]].append(campaign["campaign_title"] or "Untitled Campaign")
+    for email, campaign_names in digests.items():
+        MailQueue.enqueue(send_campaign_status_digest, email, new_status, campaign_names)
+
+    found = {c["campaign_id"] for c in campaigns}
+    return {
+        "status": "success",
+        "new_status": new_status,
+        "updated": [c["campaign_id"] for c in changed],
+        "unchanged": [c["campaign_id"] for c in campaigns if c["status"] == new_status],
+        "not_matched": [cid for cid in (campaign_ids or []) if cid not in found],
+        "emails_queued": len(digests)
+    }
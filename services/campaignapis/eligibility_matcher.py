@@ -0,0 +1,449 @@
+# services/campaignapis/eligibility_matcher.py
+#
+# In-memory eligibility index for partner offer-wall queries: "which
+# campaigns can source S (sub2 X) run for a user in country C / state Y on
+# OS O". Every indexed campaign gets a slot number and each attribute keeps
+# a bitmap (a Python int) of the slots that have it, so a query is a handful
+# of integer ANDs/ORs followed by decoding the set bits.
+#
+# The index is built from the same simplified targeting get_campaigns
+# returns. Writes in this worker update it right away (status changes and
+# partner/sub2 approvals directly, campaign edits through a dirty set that
+# is reloaded in the background); a periodic full rebuild picks up writes
+# made by other workers. Hook calls made while a rebuild runs are recorded
+# and replayed on the new index before it replaces the old one.
+
+import asyncio
+import json
+import logging
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+REBUILD_INTERVAL_SECONDS = 5 * 60
+ELIGIBLE_STATUSES = {"active"}
+# partner_status / sub2_status values that mean "may run"; anything else blocks
+APPROVED_STATUSES = {"active", "approved", "enabled", "live", "running", "on", "1", "true"}
+ANY = "*"
+
+CAMPAIGN_INDEX_SQL = """
+    SELECT id, campaign_id, status, targeting, app_details, conversion_flow
+    FROM cronbid_campaigns
+"""
+
+# Default simplified structure: [{"country": null, "excludedStates": [], "includedStates": []}]
+DEFAULT_TARGETING = [{"country": None, "excludedStates": [], "includedStates": []}]
+
+
+def simplify_targeting(targeting) -> list:
+    """
+    Reduce the stored targeting (the wizard's {"countrySelections": [...]} or
+    the older list form) to [{"country", "excludedStates", "includedStates"}].
+    Falls back to DEFAULT_TARGETING (all countries) when nothing is found.
+    """
+    simplified = []
+    # Complex structure with 'countrySelections'
+    if isinstance(targeting, dict) and "countrySelections" in targeting:
+        country_selections = targeting.get("countrySelections", [])
+        if isinstance(country_selections, list):
+            for item in country_selections:
+                if not isinstance(item, dict):
+                    continue
+                simplified.append({
+                    "country": item.get("selectedCountry") or item.get("country"),
+                    "excludedStates": item.get("excludedStates", []),
+                    "includedStates": item.get("includedStates", [])
+                })
+    # Already simplified list format
+    elif isinstance(targeting, list):
+        for item in targeting:
+            if isinstance(item, dict):
+                simplified.append({
+                    "country": item.get("country"),
+                    "excludedStates": item.get("excludedStates", []),
+                    "includedStates": item.get("includedStates", [])
+                })
+    return simplified or DEFAULT_TARGETING
+
+
+def normalize(value) -> str:
+    return str(value).strip().upper() if value not in (None, "") else ""
+
+
+def _load_json(value):
+    if not value:
+        return None
+    try:
+        return json.loads(value) if isinstance(value, str) else value
+    except ValueError:
+        return None
+
+
+def is_approved(status) -> bool:
+    return str(status).strip().lower() in APPROVED_STATUSES
+
+
+class EligibilityIndex:
+    """One consistent snapshot of the bitmaps; rebuilt indexes replace it whole."""
+
+    def __init__(self):
+        self.slot_by_row = {}
+        self.slot_by_campaign = {}
+        self.campaign_ids = []
+        self.row_ids = []
+        self.free_slots = []
+        # slot -> list of (dict, key) it was added to, for removal
+        self.memberships = {}
+        self.active = 0
+        self.install = 0
+        self.by_country = {}
+        self.by_os = {}
+        # country -> campaigns with includedStates there; (country, state) -> included / excluded
+        self.state_restricted = {}
+        self.state_included = {}
+        self.state_excluded = {}
+        # source_id -> approved campaigns; (source_id, sub2) -> overrides
+        self.partner_approved = {}
+        self.sub2_approved = {}
+        self.sub2_blocked = {}
+        # Raw approvals by campaign row id, re-applied when a campaign gets a slot
+        self.partner_status = {}
+        self.sub2_status = {}
+        self.approvals_by_row = {}
+
+    # ---- building ----
+
+    def _set(self, bitmaps: dict, key, slot: int):
+        bitmaps[key] = bitmaps.get(key, 0) | (1 << slot)
+        self.memberships.setdefault(slot, []).append((bitmaps, key))
+
+    def _clear_slot(self, slot: int):
+        mask = ~(1 << slot)
+        for bitmaps, key in self.memberships.pop(slot, ()):
+            bits = bitmaps.get(key, 0) & mask
+            if bits:
+                bitmaps[key] = bits
+            else:
+                bitmaps.pop(key, None)
+        self.active &= mask
+        self.install &= mask
+
+    def upsert_campaign(self, row_id: int, campaign_id: str, status, targeting, app_details, conversion_flow):
+        slot = self.slot_by_row.get(row_id)
+        if slot is None:
+            if self.free_slots:
+                slot = self.free_slots.pop()
+                self.campaign_ids[slot] = campaign_id
+                self.row_ids[slot] = row_id
+            else:
+                slot = len(self.campaign_ids)
+                self.campaign_ids.append(campaign_id)
+                self.row_ids.append(row_id)
+            self.slot_by_row[row_id] = slot
+            self.slot_by_campaign[campaign_id] = slot
+        else:
+            self._clear_slot(slot)
+            self.campaign_ids[slot] = campaign_id
+
+        bit = 1 << slot
+        if status in ELIGIBLE_STATUSES:
+            self.active |= bit
+        # Same test get_campaigns uses to split install and event campaigns by key
+        if conversion_flow and "install" in conversion_flow:
+            self.install |= bit
+
+        app_details = _load_json(app_details)
+        os_name = app_details.get("os") if isinstance(app_details, dict) else None
+        self._set(self.by_os, normalize(os_name) or ANY, slot)
+
+        for entry in simplify_targeting(_load_json(targeting)):
+            country = normalize(entry.get("country"))
+            if not country:
+                self._set(self.by_country, ANY, slot)
+                continue
+            self._set(self.by_country, country, slot)
+            included = [normalize(s) for s in entry.get("includedStates") or [] if normalize(s)]
+            if included:
+                self._set(self.state_restricted, country, slot)
+                for state in included:
+                    self._set(self.state_included, (country, state), slot)
+            for state in entry.get("excludedStates") or []:
+                if normalize(state):
+                    self._set(self.state_excluded, (country, normalize(state)), slot)
+
+        for key in self.approvals_by_row.get(row_id, ()):
+            self._apply_approval(key)
+
+    def remove_campaign(self, row_id: int):
+        slot = self.slot_by_row.pop(row_id, None)
+        if slot is None:
+            return
+        self._clear_slot(slot)
+        self._clear_approval_bits(slot)
+        self.slot_by_campaign.pop(self.campaign_ids[slot], None)
+        self.campaign_ids[slot] = None
+        self.row_ids[slot] = None
+        self.free_slots.append(slot)
+
+    def set_status(self, campaign_id: str, status):
+        slot = self.slot_by_campaign.get(campaign_id)
+        if slot is None:
+            return False
+        if status in ELIGIBLE_STATUSES:
+            self.active |= 1 << slot
+        else:
+            self.active &= ~(1 << slot)
+        return True
+
+    # ---- approvals ----
+
+    def set_partner_status(self, source_id, row_id: int, status):
+        key = (normalize(source_id), row_id, None)
+        self.partner_status[key] = is_approved(status)
+        self.approvals_by_row.setdefault(row_id, set()).add(key)
+        self._apply_approval(key)
+
+    def set_sub2_status(self, source_id, row_id: int, sub2: str, status):
+        key = (normalize(source_id), row_id, sub2)
+        self.sub2_status[key] = is_approved(status)
+        self.approvals_by_row.setdefault(row_id, set()).add(key)
+        self._apply_approval(key)
+
+    def _apply_approval(self, key):
+        source_id, row_id, sub2 = key
+        slot = self.slot_by_row.get(row_id)
+        if slot is None:
+            return
+        bit = 1 << slot
+        if sub2 is None:
+            targets = [(self.partner_approved, source_id, self.partner_status[key])]
+        else:
+            approved = self.sub2_status[key]
+            targets = [(self.sub2_approved, (source_id, sub2), approved), (self.sub2_blocked, (source_id, sub2), not approved)]
+        for bitmaps, bitmap_key, on in targets:
+            bits = bitmaps.get(bitmap_key, 0)
+            bits = bits | bit if on else bits & ~bit
+            if bits:
+                bitmaps[bitmap_key] = bits
+            else:
+                bitmaps.pop(bitmap_key, None)
+
+    def _clear_approval_bits(self, slot: int):
+        mask = ~(1 << slot)
+        for bitmaps in (self.partner_approved, self.sub2_approved, self.sub2_blocked):
+            for key in [k for k, bits in bitmaps.items() if bits >> slot & 1]:
+                bits = bitmaps[key] & mask
+                if bits:
+                    bitmaps[key] = bits
+                else:
+                    del bitmaps[key]
+
+    # ---- queries ----
+
+    def match(self, source_id, sub2: str = None, country: str = None, state: str = None,
+              os_name: str = None, install: bool = None) -> list:
+        """
+        Campaign ids the source may run for this user. Filters left out
+        (country, state, OS) are not applied.
+        """
+        source_id = normalize(source_id)
+        bits = self.partner_approved.get(source_id, 0)
+        if sub2:
+            key = (source_id, sub2)
+            bits = (bits & ~self.sub2_blocked.get(key, 0)) | self.sub2_approved.get(key, 0)
+        bits &= self.active
+        if not bits:
+            return []
+
+        country = normalize(country)
+        if country:
+            bits &= self.by_country.get(ANY, 0) | self.by_country.get(country, 0)
+        if country and bits:
+            state = normalize(state)
+            if state:
+                restricted = self.state_restricted.get(country, 0)
+                bits &= ~(restricted & ~self.state_included.get((country, state), 0))
+                bits &= ~self.state_excluded.get((country, state), 0)
+        if os_name:
+            bits &= self.by_os.get(ANY, 0) | self.by_os.get(normalize(os_name), 0)
+        if install is True:
+            bits &= self.install
+        elif install is False:
+            bits &= ~self.install
+
+        if bits <= 0:
+            return []
+        # Scanning the binary string finds set bits in C; peeling off the lowest
+        # bit in Python would copy the whole integer per match
+        campaign_ids = self.campaign_ids
+        digits = bin(bits)[:1:-1]
+        matched = []
+        slot = digits.find("1")
+        while slot != -1:
+            matched.append(campaign_ids[slot])
+            slot = digits.find("1", slot + 1)
+        return matched
+
+
+async def build_index(conn) -> EligibilityIndex:
+    index = EligibilityIndex()
+    async with conn.cursor() as cur:
+        await cur.execute(CAMPAIGN_INDEX_SQL)
+        for row in await cur.fetchall():
+            index.upsert_campaign(*row)
+        await cur.execute("SELECT source_id, campaign_id, status FROM partner_status")
+        for source_id, row_id, status in await cur.fetchall():
+            index.set_partner_status(source_id, row_id, status)
+        await cur.execute("SELECT source_id, campaign_id, sub2, status FROM sub2_status")
+        for source_id, row_id, sub2, status in await cur.fetchall():
+            index.set_sub2_status(source_id, row_id, sub2, status)
+    return index
+
+
+class EligibilityMatcher:
+    """
+    Holds the live index. The first query builds it; campaign writes mark
+    campaigns dirty and the background task reloads just those rows.
+    """
+    index: EligibilityIndex = None
+    dirty = set()
+    stats = {"builds": 0, "refreshes": 0, "queries": 0}
+    _building: asyncio.Future = None
+    # One event list per rebuild in flight: (index method, args) hook calls
+    _recording = []
+    _wakeup: asyncio.Event = None
+    task: asyncio.Task = None
+
+    @classmethod
+    async def start(cls, interval: int = REBUILD_INTERVAL_SECONDS):
+        if cls.task is None:
+            cls._wakeup = asyncio.Event()
+            cls.task = asyncio.create_task(cls._run(interval))
+
+    @classmethod
+    async def stop(cls):
+        if cls.task:
+            cls.task.cancel()
+            cls.task = None
+
+    @classmethod
+    async def get_index(cls) -> EligibilityIndex:
+        if cls.index is not None:
+            return cls.index
+        if cls._building is None:
+            cls._building = asyncio.ensure_future(cls.rebuild())
+        try:
+            return await asyncio.shield(cls._building)
+        finally:
+            cls._building = None
+
+    @classmethod
+    async def rebuild(cls) -> EligibilityIndex:
+        events = []
+        cls._recording.append(events)
+        try:
+            pool = await Database.connect()
+            async with pool.acquire() as conn:
+                index = await build_index(conn)
+        finally:
+            cls._recording.remove(events)
+        # The build may have read the tables before these writes; apply them
+        # again, in order, with no await until the swap
+        for method, args in events:
+            applied = getattr(index, method)(*args)
+            if method == "set_status" and not applied:
+                cls.dirty.add(args[0])
+        # Campaigns written while the build ran may be missing from it
+        cls.index = index
+        cls.stats["builds"] += 1
+        if cls.dirty and cls._wakeup:
+            cls._wakeup.set()
+        return index
+
+    @classmethod
+    async def match(cls, source_id, sub2=None, country=None, state=None, os_name=None, install=None) -> list:
+        index = await cls.get_index()
+        cls.stats["queries"] += 1
+        return index.match(source_id, sub2, country, state, os_name, install)
+
+    # ---- write hooks ----
+
+    @classmethod
+    def _record(cls, method: str, *args):
+        for events in cls._recording:
+            events.append((method, args))
+
+    @classmethod
+    def campaign_changed(cls, campaign_id: str):
+        """Targeting, OS or flow may have changed; reload the row in the background."""
+        if cls.index is None and not cls._recording:
+            return
+        cls.dirty.add(campaign_id)
+        if cls._wakeup:
+            cls._wakeup.set()
+
+    @classmethod
+    def campaign_status_changed(cls, campaign_id: str, status: str):
+        cls._record("set_status", campaign_id, status)
+        if cls.index is not None and not cls.index.set_status(campaign_id, status):
+            cls.campaign_changed(campaign_id)
+
+    @classmethod
+    def partner_status_changed(cls, source_id, row_id: int, status: str):
+        cls._record("set_partner_status", source_id, row_id, status)
+        if cls.index is not None:
+            cls.index.set_partner_status(source_id, row_id, status)
+
+    @classmethod
+    def sub2_status_changed(cls, source_id, row_id: int, sub2: str, status: str):
+        cls._record("set_sub2_status", source_id, row_id, sub2, status)
+        if cls.index is not None:
+            cls.index.set_sub2_status(source_id, row_id, sub2, status)
+
+    # ---- background ----
+
+    @classmethod
+    async def _refresh_dirty(cls):
+        index = cls.index
+        if not cls.dirty or index is None:
+            return
+        campaign_ids, cls.dirty = cls.dirty, set()
+        placeholders = ", ".join(["%s"] * len(campaign_ids))
+        try:
+            pool = await Database.connect()
+            async with pool.acquire() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(f"{CAMPAIGN_INDEX_SQL} WHERE campaign_id IN ({placeholders})", list(campaign_ids))
+                    rows = await cur.fetchall()
+        except Exception:
+            cls.dirty |= campaign_ids
+            raise
+        found = set()
+        for row in rows:
+            index.upsert_campaign(*row)
+            found.add(row[1])
+        # Dirty campaigns that are gone were deleted
+        for row_id, slot in list(index.slot_by_row.items()):
+            campaign_id = index.campaign_ids[slot]
+            if campaign_id in campaign_ids and campaign_id not in found:
+                index.remove_campaign(row_id)
+        cls.stats["refreshes"] += 1
+
+    @classmethod
+    async def _run(cls, interval: int):
+        loop = asyncio.get_running_loop()
+        next_rebuild = loop.time() + interval
+        while True:
+            try:
+                await asyncio.wait_for(cls._wakeup.wait(), timeout=max(0, next_rebuild - loop.time()))
+            except asyncio.TimeoutError:
+                pass
+            cls._wakeup.clear()
+            try:
+                if loop.time() >= next_rebuild:
+                    next_rebuild = loop.time() + interval
+                    if cls.index is not None:
+                        await cls.rebuild()
+                await cls._refresh_dirty()
+            except Exception as e:
+                logger.error(f"[ELIGIBILITY] Index refresh failed: {e}")
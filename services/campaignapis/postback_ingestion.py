@@ -0,0 +1,299 @@
+# services/campaignapis/postback_ingestion.py
+#
+# Conversion/install postbacks. Each event is checked against the campaign's
+# event table (conversion_flow.events, cached per campaign), de-duplicated on
+# its transaction or click id and put on an in-memory queue; a background
+# writer drains the queue into cronbid_postback_events with multi-row
+# INSERT IGNOREs. The request path does no database I/O once the campaign's
+# event table is cached.
+#
+# The unique key (campaign_id, event_id, dedupe_key) is what makes ingestion
+# idempotent across workers and restarts; the in-process set of recent keys
+# only lets a worker answer "duplicate" without a round trip.
+
+import asyncio
+import datetime
+import json
+import logging
+from decimal import Decimal, InvalidOperation
+from database import Database
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+CATALOG_TTL_SECONDS = 60
+CATALOG_MAX_CAMPAIGNS = 50_000
+RECENT_KEYS_TTL_SECONDS = 60 * 60
+RECENT_KEYS_MAX = 500_000
+
+POSTBACK_INSERT_SQL = """
+    INSERT IGNORE INTO cronbid_postback_events (
+        campaign_id, event_id, event_name, click_id, transaction_id,
+        dedupe_key, payout, params, event_time, received_at,
+        source_id, sub2, country
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+def parse_payout(value):
+    if value is None or value == "" or isinstance(value, bool):
+        return None
+    try:
+        amount = Decimal(str(value).replace(",", "").strip())
+    except InvalidOperation:
+        return None
+    return amount if amount.is_finite() else None
+
+
+def build_event_table(conversion_flow) -> dict:
+    """
+    Map every accepted event identifier (id and name, lower-cased) to
+    (event_id, event_name, payout). Events without their own payout use the
+    flow's amount.
+    """
+    if isinstance(conversion_flow, str):
+        try:
+            conversion_flow = json.loads(conversion_flow)
+        except ValueError:
+            return {}
+    if not isinstance(conversion_flow, dict):
+        return {}
+
+    default_payout = parse_payout(conversion_flow.get("payout", conversion_flow.get("amount")))
+    table = {}
+    for event in conversion_flow.get("events") or []:
+        if not isinstance(event, dict):
+            continue
+        event_id = str(event.get("id") or event.get("name") or "").strip()
+        if not event_id:
+            continue
+        event_name = str(event.get("name") or event_id).strip()
+        payout = parse_payout(event.get("payout", event.get("amount")))
+        entry = (event_id, event_name, payout if payout is not None else default_payout)
+        table.setdefault(event_id.lower(), entry)
+        table.setdefault(event_name.lower(), entry)
+    return table
+
+
+class EventCatalog:
+    """Per-campaign event tables; a campaign that doesn't exist is cached as None."""
+    cache = TTLCache(maxsize=CATALOG_MAX_CAMPAIGNS, ttl=CATALOG_TTL_SECONDS)
+    _loading = {}
+
+    @classmethod
+    async def get(cls, campaign_id: str):
+        table = cls.cache.get(campaign_id, False)
+        if table is not False:
+            return table
+        # Concurrent misses for the same campaign share one query
+        task = cls._loading.get(campaign_id)
+        if task is None:
+            task = cls._loading[campaign_id] = asyncio.ensure_future(cls._load(campaign_id))
+        return await asyncio.shield(task)
+
+    @classmethod
+    async def _load(cls, campaign_id: str):
+        try:
+            pool = await Database.connect()
+            async with pool.acquire() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(
+                        "SELECT conversion_flow FROM cronbid_campaigns WHERE campaign_id = %s",
+                        (campaign_id,)
+                    )
+                    row = await cur.fetchone()
+            table = build_event_table(row[0]) if row else None
+            cls.cache.set(campaign_id, table)
+            return table
+        finally:
+            cls._loading.pop(campaign_id, None)
+
+    @classmethod
+    def invalidate(cls, campaign_id: str):
+        """Called after conversion_flow changes so the next postback reloads it."""
+        cls.cache.delete(campaign_id)
+
+
+class PostbackWriter:
+    """
+    Bounded queue of event rows written in multi-row batches. A full queue
+    rejects new events (the caller answers 503 and the sender retries) instead
+    of letting latency grow without bound.
+    """
+    queue: asyncio.Queue = None
+    task: asyncio.Task = None
+    recent_keys = TTLCache(maxsize=RECENT_KEYS_MAX, ttl=RECENT_KEYS_TTL_SECONDS)
+    batch_size: int = 1000
+    flush_interval: float = 0.5
+    retry_delay: float = 1.0
+    stats = {"accepted": 0, "duplicates": 0, "rejected": 0, "written": 0, "dropped": 0, "flushes": 0}
+
+    @classmethod
+    async def start(cls, maxsize: int = 50_000, batch_size: int = 1000, flush_interval: float = 0.5):
+        if cls.task is None:
+            cls.queue = asyncio.Queue(maxsize=maxsize)
+            cls.batch_size = batch_size
+            cls.flush_interval = flush_interval
+            cls.task = asyncio.create_task(cls._run())
+
+    @classmethod
+    def is_running(cls) -> bool:
+        return cls.task is not None and not cls.task.done()
+
+    @classmethod
+    def submit(cls, row: tuple) -> str:
+        """
+        Queue one row. Returns "accepted", "duplicate" (key seen recently by
+        this worker) or "overloaded". Synchronous: nothing here awaits.
+        """
+        recent_key = (row[0], row[1], row[5])
+        if recent_key in cls.recent_keys:
+            cls.stats["duplicates"] += 1
+            return "duplicate"
+        try:
+            cls.queue.put_nowait(row)
+        except asyncio.QueueFull:
+            cls.stats["rejected"] += 1
+            return "overloaded"
+        cls.recent_keys.set(recent_key, True)
+        cls.stats["accepted"] += 1
+        return "accepted"
+
+    @classmethod
+    async def _run(cls):
+        loop = asyncio.get_running_loop()
+        while True:
+            row = await cls.queue.get()
+            if row is None:
+                return
+            batch = [row]
+            deadline = loop.time() + cls.flush_interval
+            stopping = False
+            while len(batch) < cls.batch_size:
+                # Take whatever is already queued before waiting for more
+                while len(batch) < cls.batch_size and not cls.queue.empty():
+                    row = cls.queue.get_nowait()
+                    if row is None:
+                        stopping = True
+                        break
+                    batch.append(row)
+                if stopping or len(batch) >= cls.batch_size:
+                    break
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(cls.queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+            await cls._flush(batch)
+            if stopping:
+                return
+
+    @classmethod
+    async def _flush(cls, batch: list):
+        for attempt in (1, 2):
+            try:
+                pool = await Database.connect()
+                async with pool.acquire() as conn:
+                    async with conn.cursor() as cur:
+                        # executemany rewrites this into one multi-row INSERT;
+                        # rows already stored are skipped by the unique key
+                        await cur.executemany(POSTBACK_INSERT_SQL, batch)
+                cls.stats["written"] += len(batch)
+                cls.stats["flushes"] += 1
+                return
+            except Exception as e:
+                logger.error(f"[POSTBACKS] Flush of {len(batch)} events failed (attempt {attempt}): {e}")
+                await asyncio.sleep(cls.retry_delay)
+        # Forget the keys so the sender's retry is accepted again
+        for row in batch:
+            cls.recent_keys.delete((row[0], row[1], row[5]))
+        cls.stats["dropped"] += len(batch)
+        logger.error(f"[POSTBACKS] Dropped {len(batch)} events: {[(row[0], row[1], row[5]) for row in batch[:20]]}")
+
+    @classmethod
+    async def stop(cls, timeout: float = 30):
+        """Write everything still queued; called from the app lifespan on shutdown."""
+        if cls.task is None:
+            return
+        try:
+            # Never block on a full queue: the writer may have died
+            cls.queue.put_nowait(None)
+            stopping = not cls.task.done()
+        except asyncio.QueueFull:
+            stopping = False
+        if stopping:
+            try:
+                await asyncio.wait_for(cls.task, timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.error(f"[POSTBACKS] Shutdown flush timed out, writing {cls.queue.qsize()} events directly")
+            except Exception as e:
+                logger.error(f"[POSTBACKS] Writer failed during shutdown ({e}), writing {cls.queue.qsize()} events directly")
+        else:
+            logger.error(f"[POSTBACKS] Writer is not draining, writing {cls.queue.qsize()} events directly")
+        if not cls.task.done():
+            cls.task.cancel()
+            await asyncio.gather(cls.task, return_exceptions=True)
+        remaining = []
+        while not cls.queue.empty():
+            row = cls.queue.get_nowait()
+            if row is not None:
+                remaining.append(row)
+        if remaining:
+            await cls._flush(remaining)
+        cls.task = None
+        cls.queue = None
+
+
+async def ingest_postback(
+    campaign_id: str,
+    event: str,
+    click_id: str = None,
+    transaction_id: str = None,
+    payout=None,
+    event_time: datetime.datetime = None,
+    params: dict = None,
+    source_id: str = None,
+    sub2: str = None,
+    country: str = None
+) -> dict:
+    """
+    Validate and queue one postback. Returns {"status": ...} with one of
+    accepted, duplicate, unknown_campaign, unknown_event, missing_id or
+    overloaded, plus the resolved event id when known.
+    """
+    if not click_id and not transaction_id:
+        return {"status": "missing_id"}
+    table = await EventCatalog.get(campaign_id)
+    if table is None:
+        return {"status": "unknown_campaign"}
+    entry = table.get(event.strip().lower()) if event else None
+    if entry is None:
+        return {"status": "unknown_event"}
+
+    event_id, event_name, default_payout = entry
+    reported_payout = parse_payout(payout)
+    now = datetime.datetime.utcnow()
+    row = (
+        campaign_id,
+        event_id,
+        event_name,
+        click_id,
+        transaction_id,
+        # A transaction id identifies one conversion; without one, a click converts once per event
+        transaction_id or click_id,
+        reported_payout if reported_payout is not None else default_payout,
+        json.dumps(params) if params else None,
+        event_time or now,
+        now,
+        # Reporting dimensions; '' rather than NULL so they can be part of the rollup keys
+        str(source_id) if source_id is not None else "",
+        sub2 or "",
+        (country or "").strip().upper()
+    )
+    return {"status": PostbackWriter.submit(row), "event_id": event_id}
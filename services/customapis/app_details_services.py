@@ -1,72 +1,420 @@
+import asyncio
+import datetime
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
 import httpx
 from fastapi import HTTPException
 from google_play_scraper import app as gp_app
+from google_play_scraper.exceptions import ExtraHTTPError, NotFoundError
+from config import settings
+from database import Database
 from models.app_details_model import AppDetails
+from utils.ttl_cache import TTLCache
 
+ITUNES_LOOKUP_URL = "https://itunes.apple.com/lookup"
+# iTunes accepts comma separated ids; keep each request URL reasonably short
+ITUNES_BATCH_SIZE = 100
+APP_DETAILS_TTL_SECONDS = 24 * 60 * 60
+APP_NOT_FOUND_TTL_SECONDS = 10 * 60
 
-async def fetch_app_details(package_id: str, country: str = "us", lang: str = "en") -> AppDetails:
-    gplay_data = None
-    ios_data = None
+# google_play_scraper is synchronous, keep it off the event loop
+GPLAY_EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix="gplay")
+
+# (package_id, country, lang) -> AppDetails
+app_details_cache = TTLCache(maxsize=10000, ttl=APP_DETAILS_TTL_SECONDS)
+# (package_id, country, lang) -> True for packages neither store knows
+app_not_found_cache = TTLCache(maxsize=10000, ttl=APP_NOT_FOUND_TTL_SECONDS)
+# (package_id, country, lang) -> in-flight lookup shared by concurrent callers
+_inflight_lookups = {}
+
+
+class StoreLookupError(Exception):
+    """A store was skipped or didn't answer, so a miss says nothing about the app."""
+
+
+class StoreCircuitBreaker:
+    """
+    Backs off from a store after it rate-limits us. Each consecutive
+    rate-limit doubles the pause (up to max_backoff); a success resets it.
+    """
+
+    def __init__(self, name: str, base_backoff: float = 30, max_backoff: float = 15 * 60):
+        self.name = name
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.open_until = 0.0
+
+    def is_open(self) -> bool:
+        return time.monotonic() < self.open_until
+
+    def record_rate_limit(self):
+        self.failures += 1
+        backoff = min(self.base_backoff * 2 ** (self.failures - 1), self.max_backoff)
+        self.open_until = time.monotonic() + backoff
+        print(f"[{self.name}] Rate limited, backing off for {backoff:.0f}s")
+
+    def record_success(self):
+        self.failures = 0
+        self.open_until = 0.0
+
+
+gplay_breaker = StoreCircuitBreaker("Google Play")
+itunes_breaker = StoreCircuitBreaker("App Store")
+
+
+def is_gplay_rate_limit(error: Exception) -> bool:
+    message = str(error)
+    return (
+        (isinstance(error, ExtraHTTPError) and ("429" in message or "503" in message))
+        or "PlayGatewayError" in message
+    )
+
+
+class StoreHttpClient:
+    """Shared pooled client for store lookups, closed from the app lifespan."""
+    client: httpx.AsyncClient = None
+
+    @classmethod
+    def get(cls) -> httpx.AsyncClient:
+        if cls.client is None or cls.client.is_closed:
+            cls.client = httpx.AsyncClient(
+                timeout=httpx.Timeout(10.0, connect=5.0),
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            )
+        return cls.client
+
+    @classmethod
+    async def close(cls):
+        if cls.client is not None:
+            await cls.client.aclose()
+            cls.client = None
+
+
+def is_app_store_id(package_id: str) -> bool:
+    # App Store IDs look like 'id123456789'
+    return package_id.startswith("id") and package_id[2:].isdigit()
+
+
+def get_fallback_countries(country: str) -> list:
+    return list(dict.fromkeys([country.lower(), "us", "in", "gb"]))
+
+
+async def first_valid(coros) -> dict:
+    """
+    Run lookups concurrently, return the first non-empty result and cancel the
+    rest. With no result, re-raises StoreLookupError if any lookup failed.
+    """
+    tasks = [asyncio.ensure_future(c) for c in coros]
+    try:
+        failure = None
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                result = await next_done
+            except StoreLookupError as e:
+                failure = e
+                continue
+            if result:
+                return result
+        if failure is not None:
+            raise failure
+        return None
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def fetch_gplay_country(package_id: str, country: str, lang: str) -> dict:
+    """Store data, None if Google Play doesn't know the app, StoreLookupError if it couldn't tell."""
+    if gplay_breaker.is_open():
+        raise StoreLookupError("Google Play lookups are backing off")
+    loop = asyncio.get_running_loop()
+    try:
+        data = await loop.run_in_executor(
+            GPLAY_EXECUTOR, functools.partial(gp_app, package_id, lang=lang, country=country)
+        )
+        gplay_breaker.record_success()
+        return data if data.get("title") else None
+    except NotFoundError:
+        gplay_breaker.record_success()
+        return None
+    except Exception as e:
+        if is_gplay_rate_limit(e):
+            gplay_breaker.record_rate_limit()
+        print(f"[Google Play] Error fetching for {package_id} in country={country}: {e}")
+        raise StoreLookupError(str(e))
+
+
+async def fetch_itunes_country(package_id: str, app_store_id: str, country: str) -> dict:
+    """Store data, None if the App Store doesn't know the app, StoreLookupError if it couldn't tell."""
+    if itunes_breaker.is_open():
+        raise StoreLookupError("App Store lookups are backing off")
+    try:
+        params = {"id": app_store_id, "country": country} if app_store_id else {"bundleId": package_id, "country": country}
+        response = await StoreHttpClient.get().get(ITUNES_LOOKUP_URL, params=params)
+        # Apple answers 403 as well as 429 when throttling lookups
+        if response.status_code in (403, 429):
+            itunes_breaker.record_rate_limit()
+        response.raise_for_status()
+        itunes_breaker.record_success()
+        results = response.json().get("results", [])
+        if results:
+            return results[0]
+        print(f"[App Store] Empty results for {package_id} in country={country}")
+    except Exception as e:
+        print(f"[App Store] Error fetching for {package_id} in country={country}: {e}")
+        raise StoreLookupError(str(e))
+    return None
+
+
+def gplay_to_app_details(gplay_data: dict) -> AppDetails:
+    return AppDetails(
+        name=str(gplay_data.get("title")),
+        icon=str(gplay_data.get("icon")),
+        description=str(gplay_data.get("description")),
+        developer=str(gplay_data.get("developer")),
+        store_url=str(gplay_data.get("url")),
+        os="android",
+        device="mobile"
+    )
+
+
+def itunes_to_app_details(ios_data: dict) -> AppDetails:
+    return AppDetails(
+        name=ios_data.get("trackName"),
+        icon=ios_data.get("artworkUrl100"),
+        description=ios_data.get("description"),
+        developer=ios_data.get("artistName"),
+        store_url=ios_data.get("trackViewUrl"),
+        os="ios",
+        device="mobile"
+    )
+
+
+async def lookup_app_details(package_id: str, country: str, lang: str) -> AppDetails:
+    """
+    Query both stores across all fallback countries at once; Android wins if
+    both match. None only when every store answered that the app doesn't
+    exist; StoreLookupError if some store couldn't be asked.
+    """
     app_store_id = None
-    fallback_countries = [country.lower(), "us", "in", "gb"]
+    fallback_countries = get_fallback_countries(country)
 
-    # Check if it's an App Store ID like 'id123456789'
-    if package_id.startswith("id") and package_id[2:].isdigit():
+    if is_app_store_id(package_id):
         app_store_id = package_id[2:]
 
-    # Try Google Play Store (Android) — fallback through country list
-    if not app_store_id:
-        for c in fallback_countries:
-            try:
-                gplay_data = gp_app(package_id, lang=lang, country=c)
-                if gplay_data.get("title"):
-                    break  # Found valid data
-            except Exception as e:
-                print(f"[Google Play] Error fetching for {package_id} in country={c}: {e}")
-
-    # Try Apple App Store (iOS) — fallback through country list
-    async with httpx.AsyncClient() as client:
-        for c in fallback_countries:
+    ios_task = asyncio.ensure_future(first_valid(
+        fetch_itunes_country(package_id, app_store_id, c) for c in fallback_countries
+    ))
+    failure = None
+    try:
+        if not app_store_id:
             try:
-                params = {"id": app_store_id, "country": c} if app_store_id else {"bundleId": package_id, "country": c}
-                response = await client.get("https://itunes.apple.com/lookup", params=params)
-                response.raise_for_status()
-                json_data = response.json()
-                results = json_data.get("results", [])
-                if results:
-                    ios_data = results[0]
-                    break
-                else:
-                    print(f"[App Store] Empty results for {package_id} in country={c}")
-            except Exception as e:
-                print(f"[App Store] Error fetching for {package_id} in country={c}: {e}")
-
-    # Return Android app if found
-    if gplay_data and gplay_data.get("title"):
-        return AppDetails(
-            name=str(gplay_data.get("title")),
-            icon=str(gplay_data.get("icon")),
-            description=str(gplay_data.get("description")),
-            developer=str(gplay_data.get("developer")),
-            store_url=str(gplay_data.get("url")),
-            os="android",
-            device="mobile"
+                gplay_data = await first_valid(
+                    fetch_gplay_country(package_id, c, lang) for c in fallback_countries
+                )
+            except StoreLookupError as e:
+                gplay_data, failure = None, e
+            if gplay_data:
+                return gplay_to_app_details(gplay_data)
+
+        try:
+            ios_data = await ios_task
+        except StoreLookupError as e:
+            ios_data, failure = None, e
+        if ios_data and ios_data.get("trackName"):
+            return itunes_to_app_details(ios_data)
+    finally:
+        ios_task.cancel()
+
+    if failure is not None:
+        raise failure
+    return None
+
+
+async def load_persisted_app_details(cache_key: tuple) -> AppDetails:
+    try:
+        pool = await Database.connect()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("""
+                    SELECT payload FROM cronbid_app_details_cache
+                    WHERE package_id = %s AND country = %s AND lang = %s AND expires_at > NOW()
+                """, cache_key)
+                row = await cur.fetchone()
+        return AppDetails.model_validate_json(row[0]) if row else None
+    except Exception as e:
+        print(f"[App Details Cache] Read failed for {cache_key}: {e}")
+        return None
+
+
+async def persist_app_details(cache_key: tuple, details: AppDetails):
+    try:
+        expires_at = datetime.datetime.now() + datetime.timedelta(seconds=APP_DETAILS_TTL_SECONDS)
+        pool = await Database.connect()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("""
+                    INSERT INTO cronbid_app_details_cache (package_id, country, lang, payload, expires_at)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE payload = VALUES(payload), expires_at = VALUES(expires_at)
+                """, (*cache_key, details.model_dump_json(), expires_at))
+    except Exception as e:
+        print(f"[App Details Cache] Write failed for {cache_key}: {e}")
+
+
+async def resolve_app_details(cache_key: tuple) -> AppDetails:
+    package_id, country, lang = cache_key
+
+    if settings.app_details_persistent_cache:
+        details = await load_persisted_app_details(cache_key)
+        if details is not None:
+            app_details_cache.set(cache_key, details)
+            return details
+
+    try:
+        details = await lookup_app_details(package_id, country, lang)
+    except StoreLookupError:
+        # Not authoritative: a store was skipped, throttled us or failed, so don't cache the miss
+        raise HTTPException(
+            status_code=503,
+            detail="App stores could not be reached or are rate limiting lookups right now. Please retry in a few minutes."
+        )
+    if details is None:
+        app_not_found_cache.set(cache_key, True)
+        # If neither source returned valid data
+        raise HTTPException(
+            status_code=404,
+            detail="App data unavailable. The app may not exist, be restricted in your region, or blocked due to IP limits."
         )
 
-    # Return iOS app if found
-    if ios_data and ios_data.get("trackName"):
-        return AppDetails(
-            name=ios_data.get("trackName"),
-            icon=ios_data.get("artworkUrl100"),
-            description=ios_data.get("description"),
-            developer=ios_data.get("artistName"),
-            store_url=ios_data.get("trackViewUrl"),
-            os="ios",
-            device="mobile"
+    app_details_cache.set(cache_key, details)
+    if settings.app_details_persistent_cache:
+        await persist_app_details(cache_key, details)
+    return details
+
+
+async def fetch_app_details(package_id: str, country: str = "us", lang: str = "en") -> AppDetails:
+    cache_key = (package_id, country.lower(), lang)
+    details = app_details_cache.get(cache_key)
+    if details is not None:
+        return details
+
+    if cache_key in app_not_found_cache:
+        raise HTTPException(
+            status_code=404,
+            detail="App data unavailable. The app may not exist, be restricted in your region, or blocked due to IP limits."
         )
 
-    # If neither source returned valid data
-    raise HTTPException(
-        status_code=404,
-        detail="App data unavailable. The app may not exist, be restricted in your region, or blocked due to IP limits."
-    )
+    # Single flight: concurrent requests for the same key share one lookup
+    task = _inflight_lookups.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(resolve_app_details(cache_key))
+        _inflight_lookups[cache_key] = task
+        task.add_done_callback(lambda _: _inflight_lookups.pop(cache_key, None))
+    # shield: a caller disconnecting must not cancel the lookup for everyone else
+    return await asyncio.shield(task)
+
+
+async def fetch_itunes_ids(app_store_ids: list, country: str) -> dict:
+    """
+    One multi-id iTunes lookup. Returns trackId -> result for the ids that
+    exist, or None if the lookup was skipped or failed (nothing is known then).
+    """
+    if itunes_breaker.is_open():
+        return None
+    try:
+        response = await StoreHttpClient.get().get(
+            ITUNES_LOOKUP_URL, params={"id": ",".join(app_store_ids), "country": country}
+        )
+        if response.status_code in (403, 429):
+            itunes_breaker.record_rate_limit()
+        response.raise_for_status()
+        itunes_breaker.record_success()
+        return {
+            str(result.get("trackId")): result
+            for result in response.json().get("results", [])
+            if result.get("trackName")
+        }
+    except Exception as e:
+        print(f"[App Store] Batch lookup of {len(app_store_ids)} ids failed in country={country}: {e}")
+        return None
+
+
+async def prefetch_app_store_ids(package_ids: list, country: str, lang: str):
+    """
+    Resolve 'id123...' packages with multi-id lookups and fill the caches,
+    walking the fallback countries only for ids not found yet.
+    """
+    pending = {package_id[2:]: package_id for package_id in package_ids}
+    # Ids some country couldn't answer for: their miss proves nothing
+    unanswered = set()
+    for c in get_fallback_countries(country):
+        if not pending:
+            break
+        ids = list(pending)
+        chunks = [ids[i:i + ITUNES_BATCH_SIZE] for i in range(0, len(ids), ITUNES_BATCH_SIZE)]
+        for chunk, found in zip(chunks, await asyncio.gather(*(fetch_itunes_ids(chunk, c) for chunk in chunks))):
+            if found is None:
+                unanswered.update(chunk)
+                continue
+            for track_id, ios_data in found.items():
+                package_id = pending.pop(track_id, None)
+                if package_id is None:
+                    continue
+                cache_key = (package_id, country, lang)
+                details = itunes_to_app_details(ios_data)
+                app_details_cache.set(cache_key, details)
+                if settings.app_details_persistent_cache:
+                    await persist_app_details(cache_key, details)
+
+    # Only ids every country answered for without them really don't exist;
+    # the rest are left uncached and go through fetch_app_details again
+    for track_id, package_id in pending.items():
+        if track_id not in unanswered:
+            app_not_found_cache.set((package_id, country, lang), True)
+
+
+async def fetch_app_details_batch(package_ids: list, country: str = "us", lang: str = "en", concurrency: int = 8) -> dict:
+    """
+    Resolve many packages at once. Cache hits return immediately, App Store ids
+    are grouped into multi-id iTunes requests and the rest go through
+    fetch_app_details with at most `concurrency` lookups in flight.
+    """
+    package_ids = list(dict.fromkeys(package_ids))
+    country = country.lower()
+
+    ios_misses = [
+        package_id for package_id in package_ids
+        if is_app_store_id(package_id)
+        and (package_id, country, lang) not in app_details_cache
+        and (package_id, country, lang) not in app_not_found_cache
+    ]
+    if ios_misses:
+        await prefetch_app_store_ids(ios_misses, country, lang)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def resolve_one(package_id: str):
+        details = app_details_cache.get((package_id, country, lang))
+        if details is not None:
+            return package_id, details, None
+        async with semaphore:
+            try:
+                return package_id, await fetch_app_details(package_id, country, lang), None
+            except HTTPException as e:
+                return package_id, None, e
+
+    results = {}
+    not_found = []
+    errors = {}
+    for package_id, details, error in await asyncio.gather(*(resolve_one(p) for p in package_ids)):
+        if details is not None:
+            results[package_id] = details
+        elif error.status_code == 404:
+            not_found.append(package_id)
+        else:
+            errors[package_id] = error.detail
+
+    return {"results": results, "not_found": not_found, "errors": errors}
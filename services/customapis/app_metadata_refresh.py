@@ -0,0 +1,177 @@
+# services/customapis/app_metadata_refresh.py
+
+import asyncio
+import datetime
+import json
+import logging
+from database import Database
+from services.customapis.app_details_services import fetch_app_details_batch
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL_SECONDS = 24 * 60 * 60
+REFRESH_BATCH_SIZE = 200
+# Store lookups in flight per batch, and pause between batches, to stay under store limits
+REFRESH_CONCURRENCY = 4
+REFRESH_BATCH_PAUSE_SECONDS = 2
+
+# Keys the campaign wizard may have used for the package inside app_details
+PACKAGE_KEYS = ("package", "packageName", "packageId", "appPackageId", "package_id", "bundleId")
+# AppDetails fields refreshed in the stored snapshot
+REFRESHED_FIELDS = ("name", "icon", "description", "developer", "store_url", "os")
+
+
+def get_package_id(app_details: dict) -> str:
+    for key in PACKAGE_KEYS:
+        value = app_details.get(key)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    return None
+
+
+def changed_fields(app_details: dict, fresh: dict) -> dict:
+    return {
+        field: fresh[field]
+        for field in REFRESHED_FIELDS
+        if fresh.get(field) is not None and app_details.get(field) != fresh[field]
+    }
+
+
+async def apply_app_details_patches(conn, patches: dict) -> int:
+    """
+    One UPDATE for the whole batch. Patches are merged into the stored JSON,
+    so keys edited by users in the meantime are kept.
+    """
+    if not patches:
+        return 0
+    cases = " ".join(["WHEN %s THEN CAST(%s AS JSON)"] * len(patches))
+    placeholders = ", ".join(["%s"] * len(patches))
+    values = []
+    for campaign_id, patch in patches.items():
+        values.extend([campaign_id, json.dumps(patch)])
+    values.extend(patches.keys())
+    async with conn.cursor() as cur:
+        await cur.execute(f"""
+            UPDATE cronbid_campaigns
+            SET app_details = JSON_MERGE_PATCH(COALESCE(app_details, JSON_OBJECT()), CASE campaign_id {cases} END)
+            WHERE campaign_id IN ({placeholders})
+        """, values)
+        updated = cur.rowcount
+    await conn.commit()
+    return updated
+
+
+class AppMetadataRefresher:
+    """Scheduled re-resolution of the app_details snapshot of active campaigns."""
+    task: asyncio.Task = None
+    manual_task: asyncio.Task = None
+    lock = asyncio.Lock()
+    stats = {
+        "running": False,
+        "last_started_at": None,
+        "last_finished_at": None,
+        "campaigns_scanned": 0,
+        "packages_resolved": 0,
+        "packages_failed": 0,
+        "campaigns_updated": 0,
+        "last_error": None,
+    }
+
+    @classmethod
+    async def start(cls, interval: int = REFRESH_INTERVAL_SECONDS):
+        if cls.task is None:
+            cls.task = asyncio.create_task(cls._run(interval))
+
+    @classmethod
+    async def _run(cls, interval: int):
+        while True:
+            await asyncio.sleep(interval)
+            await cls.refresh_all()
+
+    @classmethod
+    def run_now(cls) -> bool:
+        """Start an out-of-schedule run in the background. False if one is already running."""
+        if cls.lock.locked():
+            return False
+        cls.manual_task = asyncio.create_task(cls.refresh_all())
+        return True
+
+    @classmethod
+    async def refresh_all(cls) -> dict:
+        if cls.lock.locked():
+            return cls.stats
+        async with cls.lock:
+            cls.stats.update({
+                "running": True,
+                "last_started_at": datetime.datetime.now(),
+                "campaigns_scanned": 0,
+                "packages_resolved": 0,
+                "packages_failed": 0,
+                "campaigns_updated": 0,
+                "last_error": None,
+            })
+            try:
+                pool = await Database.connect()
+                last_id = 0
+                while True:
+                    async with pool.acquire() as conn:
+                        async with conn.cursor() as cur:
+                            await cur.execute("""
+                                SELECT id, campaign_id, app_details FROM cronbid_campaigns
+                                WHERE status = 'active' AND id > %s
+                                ORDER BY id LIMIT %s
+                            """, (last_id, REFRESH_BATCH_SIZE))
+                            rows = await cur.fetchall()
+                    if not rows:
+                        break
+                    last_id = rows[-1][0]
+                    cls.stats["campaigns_scanned"] += len(rows)
+
+                    updated = await cls._refresh_batch(rows)
+                    cls.stats["campaigns_updated"] += updated
+                    await asyncio.sleep(REFRESH_BATCH_PAUSE_SECONDS)
+            except Exception as e:
+                logger.error(f"[APP METADATA REFRESH] Run failed: {e}")
+                cls.stats["last_error"] = str(e)
+            finally:
+                cls.stats["running"] = False
+                cls.stats["last_finished_at"] = datetime.datetime.now()
+            logger.info(f"[APP METADATA REFRESH] {cls.stats}")
+            return cls.stats
+
+    @classmethod
+    async def _refresh_batch(cls, rows) -> int:
+        snapshots = {}
+        for _, campaign_id, raw in rows:
+            try:
+                app_details = json.loads(raw) if raw else {}
+            except (TypeError, json.JSONDecodeError):
+                continue
+            if isinstance(app_details, dict) and get_package_id(app_details):
+                snapshots[campaign_id] = app_details
+        if not snapshots:
+            return 0
+
+        packages = {get_package_id(details) for details in snapshots.values()}
+        resolved = await fetch_app_details_batch(list(packages), concurrency=REFRESH_CONCURRENCY)
+        cls.stats["packages_resolved"] += len(resolved["results"])
+        cls.stats["packages_failed"] += len(resolved["not_found"]) + len(resolved["errors"])
+
+        patches = {}
+        for campaign_id, app_details in snapshots.items():
+            fresh = resolved["results"].get(get_package_id(app_details))
+            if fresh is None:
+                continue
+            patch = changed_fields(app_details, fresh.model_dump())
+            if patch:
+                patches[campaign_id] = patch
+
+        pool = await Database.connect()
+        async with pool.acquire() as conn:
+            return await apply_app_details_patches(conn, patches)
+
+    @classmethod
+    async def stop(cls):
+        if cls.task:
+            cls.task.cancel()
+            cls.task = None
@@ -0,0 +1,112 @@
+# services/fundapis/balance_snapshots.py
+
+import asyncio
+import datetime
+import logging
+from decimal import Decimal
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+# Transactions newer than this are left for the next run, so rows from
+# still-open transactions are not skipped by the id watermark.
+SNAPSHOT_SETTLE_DELAY = datetime.timedelta(minutes=5)
+SNAPSHOT_INTERVAL_SECONDS = 6 * 60 * 60
+
+LATEST_SNAPSHOT_SQL = """
+    SELECT s.user_id, s.balance, s.last_transaction_row_id
+    FROM cronbid_fund_balance_snapshots s
+    JOIN (
+        SELECT user_id, MAX(snapshot_at) AS snapshot_at
+        FROM cronbid_fund_balance_snapshots
+        GROUP BY user_id
+    ) latest ON latest.user_id = s.user_id AND latest.snapshot_at = s.snapshot_at
+"""
+
+
+async def take_balance_snapshots(conn) -> int:
+    """
+    Roll every user with new transactions forward from their latest snapshot.
+    Only the tail since the previous snapshot is summed, never the full ledger.
+    Returns the number of snapshots written.
+    """
+    snapshot_at = (datetime.datetime.now() - SNAPSHOT_SETTLE_DELAY).replace(microsecond=0)
+    async with conn.cursor() as cur:
+        await cur.execute(f"""
+            INSERT INTO cronbid_fund_balance_snapshots (
+                user_id, snapshot_at, balance, last_transaction_row_id
+            )
+            SELECT t.user_id, %s,
+                   COALESCE(s.balance, 0) + SUM(CASE WHEN t.type = 'debit' THEN -t.amount ELSE t.amount END),
+                   MAX(t.id)
+            FROM cronbid_fund_transactions t
+            LEFT JOIN ({LATEST_SNAPSHOT_SQL}) s ON s.user_id = t.user_id
+            WHERE t.id > COALESCE(s.last_transaction_row_id, 0)
+              AND t.created_at <= %s
+            GROUP BY t.user_id, s.balance
+            ON DUPLICATE KEY UPDATE
+                balance = VALUES(balance),
+                last_transaction_row_id = VALUES(last_transaction_row_id)
+        """, (snapshot_at, snapshot_at))
+        written = cur.rowcount
+    await conn.commit()
+    return written
+
+
+async def get_balance_as_of(conn, user_id: str, as_of: datetime.datetime) -> dict:
+    """Balance at as_of = nearest snapshot at or before as_of + transactions after it."""
+    async with conn.cursor() as cur:
+        await cur.execute("""
+            SELECT snapshot_at, balance, last_transaction_row_id
+            FROM cronbid_fund_balance_snapshots
+            WHERE user_id = %s AND snapshot_at <= %s
+            ORDER BY snapshot_at DESC
+            LIMIT 1
+        """, (user_id, as_of))
+        snapshot = await cur.fetchone()
+
+        snapshot_at, balance, last_row_id = snapshot if snapshot else (None, Decimal("0"), 0)
+
+        await cur.execute("""
+            SELECT COALESCE(SUM(CASE WHEN type = 'debit' THEN -amount ELSE amount END), 0),
+                   COUNT(*)
+            FROM cronbid_fund_transactions
+            WHERE user_id = %s AND id > %s AND created_at <= %s
+        """, (user_id, last_row_id, as_of))
+        tail_sum, tail_count = await cur.fetchone()
+
+    return {
+        "user_id": user_id,
+        "as_of": as_of,
+        "balance": str(Decimal(balance) + Decimal(tail_sum)),
+        "snapshot_at": snapshot_at,
+        "tail_transactions": tail_count
+    }
+
+
+class BalanceSnapshotter:
+    """Periodic snapshot job, started and stopped from the app lifespan."""
+    task: asyncio.Task = None
+
+    @classmethod
+    async def start(cls, interval: int = SNAPSHOT_INTERVAL_SECONDS):
+        if cls.task is None:
+            cls.task = asyncio.create_task(cls._run(interval))
+
+    @classmethod
+    async def _run(cls, interval: int):
+        while True:
+            try:
+                pool = await Database.connect()
+                async with pool.acquire() as conn:
+                    written = await take_balance_snapshots(conn)
+                logger.info(f"[FUND SNAPSHOTS] Wrote {written} balance snapshots")
+            except Exception as e:
+                logger.error(f"[FUND SNAPSHOTS] Snapshot run failed: {e}")
+            await asyncio.sleep(interval)
+
+    @classmethod
+    async def stop(cls):
+        if cls.task:
+            cls.task.cancel()
+            cls.task = None
@@ -0,0 +1,316 @@
+# services/mediaapis/creative_uploads.py
+
+import os
+import re
+import uuid
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+from database import Database
+from services.mediaapis.media_store import UPLOADS_DIR, ALLOWED_MIME_TYPES, UPLOAD_CHUNK_SIZE, adopt_file
+
+STAGING_DIR = os.path.join(UPLOADS_DIR, "staging")
+MAX_UPLOAD_BYTES = 500 * 1024 * 1024
+# Boundaries, part headers and the small form fields around the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+MAX_FORM_FIELD_BYTES = 16 * 1024
+SNIFF_BYTES = 64 * 1024
+# Staging directories are named after the user_id: no separators, no leading dot
+CSV_DELIMITERS = (b",", b";", b"\t", b"|")
+# A single-column list (device ids, emails) has no delimiter, only token characters
+CSV_SINGLE_COLUMN = re.compile(rb'"?[\w@.:+\-]+"?')
+USER_ID_PATTERN = re.compile(r"[A-Za-z0-9_@\-][A-Za-z0-9_@.\-]*")
+
+
+def generate_upload_id() -> str:
+    return f"UPL-{uuid.uuid4().hex}"
+
+
+def user_staging_dir(user_id: str) -> str:
+    """The user's staging directory; 400 for a user_id that isn't safe as a directory name."""
+    if not user_id or not USER_ID_PATTERN.fullmatch(user_id):
+        raise HTTPException(status_code=400, detail="Invalid user_id")
+    return os.path.join(STAGING_DIR, user_id)
+
+
+def sniff_mime_type(head: bytes) -> str:
+    """Detect the real type from the first bytes; the client-declared type is not trusted."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[4:8] == b"ftyp":
+        return "video/quicktime" if head[8:12] == b"qt  " else "video/mp4"
+    if head[4:8] in (b"moov", b"mdat", b"wide", b"free"):
+        return "video/quicktime"
+    # CSV: plain UTF-8 text without NUL bytes (cut at the last newline so a
+    # multi-byte character split by the chunk boundary doesn't fail decoding)
+    # whose first line looks like a CSV row
+    if head and b"\x00" not in head and looks_like_csv_row(head):
+        text = head[:head.rfind(b"\n") + 1] or head
+        try:
+            text.decode("utf-8")
+            return "text/csv"
+        except UnicodeDecodeError:
+            return None
+    return None
+
+
+def looks_like_csv_row(head: bytes) -> bool:
+    """
+    The first line has a delimiter or is a single plain field, and no markup
+    or code brackets, so HTML, SVG and scripts aren't taken for CSV.
+    """
+    line = head.split(b"\n", 1)[0].rstrip(b"\r")
+    if line.startswith(b"\xef\xbb\xbf"):
+        line = line[3:]
+    if not line.strip() or any(c in line for c in b"<>{}"):
+        return False
+    return any(d in line for d in CSV_DELIMITERS) or CSV_SINGLE_COLUMN.fullmatch(line.strip()) is not None
+
+
+class MultipartReceiver:
+    """
+    Callbacks for python_multipart's MultipartParser. They are synchronous, so
+    file bytes are only collected here and written by receive_multipart_upload
+    between reads; text fields are kept in memory, MAX_FORM_FIELD_BYTES each.
+    """
+
+    def __init__(self, file_field: str):
+        self.file_field = file_field
+        self.fields = {}
+        self.filename = None
+        self.file_data = []
+        self.file_ended = False
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._field_name = None
+        self._field_data = None
+
+    def on_part_begin(self):
+        self._disposition = b""
+        self._field_name = None
+        self._field_data = None
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        if b"filename" in options:
+            if name != self.file_field or self.filename is not None:
+                raise HTTPException(status_code=400, detail=f"Expected exactly one file in the '{self.file_field}' field")
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+        else:
+            self._field_name = name
+            self._field_data = bytearray()
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._field_data is None:
+            self.file_data.append(data[start:end])
+        elif len(self._field_data) + end - start > MAX_FORM_FIELD_BYTES:
+            raise HTTPException(status_code=413, detail=f"Form field '{self._field_name}' is too large")
+        else:
+            self._field_data.extend(data[start:end])
+
+    def on_part_end(self):
+        if self._field_data is None:
+            self.file_ended = True
+        else:
+            self.fields[self._field_name] = self._field_data.decode("utf-8", "replace")
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+
+async def receive_multipart_upload(request: Request, dest_dir: str, file_field: str = "file", expected_types=None) -> tuple:
+    """
+    Parse a multipart/form-data body from request.stream() as it arrives,
+    writing the file part to dest_dir with aiofiles. Nothing is spooled
+    first: an oversized Content-Length is refused before reading, and the
+    upload is cut off with 413 as soon as MAX_UPLOAD_BYTES is passed.
+    The type is sniffed from the first bytes; the file is removed on any failure.
+    Returns (text fields, {"path", "mime_type", "size", "filename"}).
+    """
+    max_body = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_body:
+        raise HTTPException(status_code=413, detail=f"File exceeds {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+
+    receiver = MultipartReceiver(file_field)
+    parser = MultipartParser(params[b"boundary"], receiver.callbacks())
+
+    await aiofiles.os.makedirs(dest_dir, exist_ok=True)
+    tmp_path = os.path.join(dest_dir, f".{uuid.uuid4().hex}.part")
+    received = 0
+    size = 0
+    head = b""
+    mime_type = None
+    try:
+        async with aiofiles.open(tmp_path, "wb") as f:
+            async def write_file_data(final: bool):
+                nonlocal head, mime_type, size
+                data = b"".join(receiver.file_data)
+                receiver.file_data.clear()
+                if mime_type is None:
+                    # Hold back the first bytes until there are enough to sniff
+                    head += data
+                    if len(head) < SNIFF_BYTES and not final:
+                        return
+                    data, head = head, b""
+                    mime_type = sniff_mime_type(data[:SNIFF_BYTES])
+                    if mime_type not in (expected_types or ALLOWED_MIME_TYPES):
+                        raise HTTPException(status_code=415, detail=f"Unsupported file type: {mime_type}")
+                size += len(data)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail=f"File exceeds {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+                await f.write(data)
+
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > max_body:
+                    raise HTTPException(status_code=413, detail=f"File exceeds {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+                parser.write(chunk)
+                if receiver.file_data:
+                    await write_file_data(final=receiver.file_ended)
+            parser.finalize()
+            if head or receiver.file_data:
+                await write_file_data(final=True)
+
+        if receiver.filename is None:
+            raise HTTPException(status_code=400, detail=f"Missing file in the '{file_field}' field")
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Empty file")
+
+        final_path = os.path.join(dest_dir, f"{uuid.uuid4().hex}{ALLOWED_MIME_TYPES[mime_type]}")
+        await aiofiles.os.replace(tmp_path, final_path)
+        return receiver.fields, {"path": final_path, "mime_type": mime_type, "size": size, "filename": receiver.filename}
+    except BaseException:
+        if await aiofiles.os.path.exists(tmp_path):
+            await aiofiles.os.remove(tmp_path)
+        raise
+
+
+async def register_upload(conn, upload_id: str, user_id: str, original_name: str, stored: dict):
+    async with conn.cursor() as cur:
+        await cur.execute("""
+            INSERT INTO cronbid_media_uploads (
+                upload_id, user_id, original_name, mime_type, size_bytes, storage_path
+            ) VALUES (%s, %s, %s, %s, %s, %s)
+        """, (upload_id, user_id, original_name, stored["mime_type"], stored["size"], stored["path"]))
+
+
+async def attach_uploads(conn, upload_refs: list, user_id: str, campaign_id: str) -> tuple:
+    """
+    Add staged uploads owned by user_id to the media store (a hard link, or
+    nothing to write when the content is stored already) and mark them
+    attached, in the caller's transaction on `conn`.
+    Returns (upload_id -> {"fileData", "filePath", "mimeType"}, staged paths);
+    the staged files are for remove_staged_files once the caller has committed.
+    """
+    upload_ids = list(dict.fromkeys(upload_refs))
+    if not upload_ids:
+        return {}, []
+
+    async with conn.cursor() as cur:
+        placeholders = ", ".join(["%s"] * len(upload_ids))
+        await cur.execute(f"""
+            SELECT upload_id, mime_type, storage_path FROM cronbid_media_uploads
+            WHERE upload_id IN ({placeholders}) AND user_id = %s AND status = 'staged'
+            FOR UPDATE
+        """, (*upload_ids, user_id))
+        rows = {row[0]: row for row in await cur.fetchall()}
+
+        missing = [u for u in upload_ids if u not in rows]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Unknown or already used uploads: {', '.join(missing)}")
+
+        attached = {}
+        for upload_id, (_, mime_type, staged_path) in rows.items():
+            blob = await adopt_file(conn, staged_path, mime_type)
+            attached[upload_id] = {k: v for k, v in blob.items() if k != "storagePath"}
+            await cur.execute("""
+                UPDATE cronbid_media_uploads
+                SET status = 'attached', campaign_id = %s, storage_path = %s, attached_at = NOW()
+                WHERE upload_id = %s
+            """, (campaign_id, blob["storagePath"], upload_id))
+
+    return attached, [staged_path for _, _, staged_path in rows.values()]
+
+
+async def remove_staged_files(staged_paths: list):
+    """Remove staged copies of attached uploads; only call after the attach committed."""
+    for staged_path in staged_paths:
+        try:
+            await aiofiles.os.remove(staged_path)
+        except OSError:
+            pass
+
+
+async def resolve_upload_references(conn, data: dict, user_id: str, campaign_id: str) -> tuple:
+    """
+    Replace {"uploadId": ...} entries in creatives.files and
+    targeting.audienceTargeting.uploadAudience with the stored file paths,
+    so the existing save_media_files logic treats them as already saved.
+    Runs in the caller's transaction. Returns (the file paths attached here,
+    whose store reference is already counted, staged paths to remove after commit).
+    """
+    attached_paths = set()
+    staged_paths = []
+    creatives = data.get("creatives") or {}
+    files = creatives.get("files") or []
+    creative_ids = [f["uploadId"] for f in files if isinstance(f, dict) and f.get("uploadId")]
+    if creative_ids:
+        attached, staged = await attach_uploads(conn, creative_ids, user_id, campaign_id)
+        staged_paths += staged
+        attached_paths.update(a["filePath"] for a in attached.values())
+        creatives["files"] = [
+            {**{k: v for k, v in f.items() if k != "uploadId"}, **attached[f["uploadId"]]}
+            if isinstance(f, dict) and f.get("uploadId") else f
+            for f in files
+        ]
+
+    audience = ((data.get("targeting") or {}).get("audienceTargeting") or {})
+    audiences = audience.get("uploadAudience") or []
+    audience_ids = [a["uploadId"] for a in audiences if isinstance(a, dict) and a.get("uploadId")]
+    if audience_ids:
+        attached, staged = await attach_uploads(conn, audience_ids, user_id, campaign_id)
+        staged_paths += staged
+        attached_paths.update(a["filePath"] for a in attached.values())
+        audience["uploadAudience"] = [
+            {
+                "filePath": attached[a["uploadId"]]["filePath"],
+                "event": a.get("event"),
+                "isEncrypted": a.get("isEncrypted", False),
+                "encryptionKey": a.get("encryptionKey")
+            }
+            if isinstance(a, dict) and a.get("uploadId") else a
+            for a in audiences
+        ]
+
+    return attached_paths, staged_paths
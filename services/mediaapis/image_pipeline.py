@@ -0,0 +1,131 @@
+# services/mediaapis/image_pipeline.py
+#
+# Processing of uploaded brand and source logos. The real type is sniffed
+# from the bytes (the declared MIME is ignored), the image is decoded and
+# re-encoded without its metadata, and small WebP/PNG variants are written
+# next to it so dashboards don't download the full image to draw an icon.
+#
+# Decoding and encoding are CPU bound and run on IMAGE_EXECUTOR. Pillow is
+# optional: without it logos are still type-checked and stored, but not
+# re-encoded, and no variants are generated.
+#
+# File names carry a digest of the stored image, so every URL is safe to
+# serve as immutable (see utils/static_files.py).
+
+import asyncio
+import hashlib
+import io
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import aiofiles
+import aiofiles.os
+from services.mediaapis.creative_uploads import sniff_mime_type
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - depends on the deployment
+    Image = None
+
+MAX_LOGO_BYTES = 10 * 1024 * 1024
+MAX_LOGO_PIXELS = 40_000_000
+# name -> longest side in pixels
+LOGO_VARIANTS = {"thumb": 64, "thumb_2x": 128}
+VARIANT_FORMATS = {"webp": "WEBP", "png": "PNG"}
+LOGO_EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png", "image/gif": ".gif", "image/webp": ".webp"}
+
+IMAGE_EXECUTOR = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1), thread_name_prefix="image")
+
+
+def sniff_image_type(head: bytes) -> str:
+    """Image MIME type from the first bytes, None for anything that isn't a supported image."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    mime_type = sniff_mime_type(head)
+    return mime_type if mime_type in LOGO_EXTENSIONS else None
+
+
+def _encode(image, fmt: str) -> bytes:
+    out = io.BytesIO()
+    if fmt == "JPEG":
+        image.save(out, "JPEG", quality=90, optimize=True)
+    elif fmt == "WEBP":
+        image.save(out, "WEBP", quality=85, method=4)
+    else:
+        image.save(out, "PNG", optimize=True)
+    return out.getvalue()
+
+
+def process_logo(data: bytes) -> dict:
+    """
+    Validate and re-encode a logo. Runs on IMAGE_EXECUTOR.
+    Returns {"extension", "original": bytes, "variants": {(name, ext): bytes}}
+    and raises ValueError for anything that is not a usable image.
+    """
+    if len(data) > MAX_LOGO_BYTES:
+        raise ValueError(f"Logo is larger than {MAX_LOGO_BYTES // (1024 * 1024)} MB")
+    mime_type = sniff_image_type(data[:64])
+    if not mime_type:
+        raise ValueError("Logo is not a JPEG, PNG, GIF or WebP image")
+    if Image is None:
+        return {"extension": LOGO_EXTENSIONS[mime_type], "original": data, "variants": {}}
+
+    try:
+        with Image.open(io.BytesIO(data)) as probe:
+            # Header only: refuse decompression bombs before decoding any pixels
+            if probe.width * probe.height > MAX_LOGO_PIXELS:
+                raise ValueError("Logo dimensions are too large")
+            probe.verify()
+        with Image.open(io.BytesIO(data)) as source:
+            # First frame of animations; orientation applied before EXIF is dropped
+            image = ImageOps.exif_transpose(source)
+            has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Logo could not be decoded: {e}")
+
+    # A fresh encode carries no EXIF/XMP/ICC text chunks from the upload
+    if mime_type == "image/jpeg" and not has_alpha:
+        extension, original = ".jpg", _encode(image, "JPEG")
+    else:
+        extension, original = ".png", _encode(image, "PNG")
+
+    variants = {}
+    for name, size in LOGO_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        for ext, fmt in VARIANT_FORMATS.items():
+            variants[(name, ext)] = _encode(resized, fmt)
+    return {"extension": extension, "original": original, "variants": variants}
+
+
+async def _write_file(full_path: str, content: bytes):
+    tmp_path = f"{full_path}.{uuid.uuid4().hex}.tmp"
+    async with aiofiles.open(tmp_path, "wb") as f:
+        await f.write(content)
+    await aiofiles.os.replace(tmp_path, full_path)
+
+
+async def store_logo(data: bytes, dest_dir: str, url_prefix: str, stem: str) -> dict:
+    """
+    Process a logo and write it and its variants to dest_dir.
+    Returns {"path": url, "variants": {"thumb": {"webp": url, "png": url}, ...}}.
+    """
+    processed = await asyncio.get_running_loop().run_in_executor(IMAGE_EXECUTOR, process_logo, data)
+    digest = hashlib.sha256(processed["original"]).hexdigest()[:16]
+    await aiofiles.os.makedirs(dest_dir, exist_ok=True)
+
+    files = {f"{stem}.{digest}{processed['extension']}": processed["original"]}
+    variants = {}
+    for (name, ext), content in processed["variants"].items():
+        filename = f"{stem}.{name}.{digest}.{ext}"
+        files[filename] = content
+        variants.setdefault(name, {})[ext] = f"{url_prefix}/{filename}"
+
+    await asyncio.gather(*(
+        _write_file(os.path.join(dest_dir, filename), content) for filename, content in files.items()
+    ))
+    original_name = next(iter(files))
+    return {"path": f"{url_prefix}/{original_name}", "variants": variants}
@@ -0,0 +1,290 @@
+# services/mediaapis/media_store.py
+#
+# Content-addressed store for campaign media. Files live once under
+# uploads/campaignsmedia/blobs/<aa>/<bb>/<sha256><ext> and campaigns reference
+# them by path; cronbid_media_blobs.ref_count tracks how many references exist.
+# Releasing a reference only decrements the count, the garbage collector
+# removes blobs that stayed unreferenced for GC_GRACE.
+# Reference changes run in the transaction that writes the campaign row, so
+# the counts only move if the campaign write commits. A file written for a
+# new blob whose transaction then rolled back has no row; the collector's
+# sweep of the blob directory removes those too.
+
+import asyncio
+import datetime
+import hashlib
+import logging
+import os
+import uuid
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+UPLOADS_DIR = "uploads/campaignsmedia"
+ALLOWED_MIME_TYPES = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "video/mp4": ".mp4",
+    "video/quicktime": ".mov",
+    "text/csv": ".csv"
+}
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+BLOBS_DIR = os.path.join(UPLOADS_DIR, "blobs")
+BLOB_URL_PREFIX = "/campaignsmedia/blobs/"
+GC_GRACE = datetime.timedelta(hours=1)
+GC_INTERVAL_SECONDS = 24 * 60 * 60
+GC_BATCH_SIZE = 1000
+
+BLOB_UPSERT_SQL = """
+    INSERT INTO cronbid_media_blobs (sha256, mime_type, size_bytes, ref_count)
+    VALUES (%s, %s, %s, 1)
+    ON DUPLICATE KEY UPDATE ref_count = ref_count + 1, released_at = NULL
+"""
+
+
+def blob_relative_path(sha256: str, mime_type: str) -> str:
+    return os.path.join("blobs", sha256[:2], sha256[2:4], f"{sha256}{ALLOWED_MIME_TYPES[mime_type]}")
+
+
+def blob_entry(sha256: str, mime_type: str) -> dict:
+    relative_path = blob_relative_path(sha256, mime_type)
+    return {
+        "fileData": relative_path,
+        "filePath": f"/campaignsmedia/{relative_path}",
+        "mimeType": mime_type,
+    }
+
+
+def is_blob_path(file_path) -> bool:
+    return isinstance(file_path, str) and file_path.startswith(BLOB_URL_PREFIX)
+
+
+def blob_sha256(file_path: str) -> str:
+    """sha256 from a /campaignsmedia/blobs/... path, None for anything else."""
+    if not is_blob_path(file_path):
+        return None
+    digest = os.path.splitext(os.path.basename(file_path))[0]
+    if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+        return None
+    return digest
+
+
+async def store_blob(conn, file_bytes: bytes, mime_type: str) -> dict:
+    """
+    Add a reference to the blob holding file_bytes, writing it only if it is
+    not stored yet. Runs in the caller's transaction on `conn`: the row lock
+    taken by the upsert is held until the caller commits, so the garbage
+    collector can't remove the file in between, and a rollback takes the
+    reference back.
+    """
+    sha256 = await asyncio.to_thread(lambda: hashlib.sha256(file_bytes).hexdigest())
+    full_path = os.path.join(UPLOADS_DIR, blob_relative_path(sha256, mime_type))
+
+    async with conn.cursor() as cur:
+        await cur.execute(BLOB_UPSERT_SQL, (sha256, mime_type, len(file_bytes)))
+    if not await aiofiles.os.path.exists(full_path):
+        await aiofiles.os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        tmp_path = f"{full_path}.{uuid.uuid4().hex}.tmp"
+        async with aiofiles.open(tmp_path, "wb") as f:
+            await f.write(file_bytes)
+        await aiofiles.os.replace(tmp_path, full_path)
+    return blob_entry(sha256, mime_type)
+
+
+async def adopt_file(conn, source_path: str, mime_type: str) -> dict:
+    """
+    Add a file already on disk (a staged upload) to the store as a hard link,
+    so nothing is copied. The source is left in place for the caller to remove
+    once its transaction is committed.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    async with aiofiles.open(source_path, "rb") as f:
+        while True:
+            chunk = await f.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+    sha256 = digest.hexdigest()
+    full_path = os.path.join(UPLOADS_DIR, blob_relative_path(sha256, mime_type))
+
+    async with conn.cursor() as cur:
+        await cur.execute(BLOB_UPSERT_SQL, (sha256, mime_type, size))
+    if not await aiofiles.os.path.exists(full_path):
+        await aiofiles.os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        await aiofiles.os.link(source_path, full_path)
+    return {**blob_entry(sha256, mime_type), "storagePath": full_path}
+
+
+async def retain_blob(conn, file_path: str):
+    """
+    Add a reference to an existing blob, e.g. a creative reused from another
+    campaign. Runs in the caller's transaction, like store_blob.
+    """
+    sha256 = blob_sha256(file_path)
+    if not sha256:
+        raise HTTPException(status_code=400, detail=f"Invalid media path: {file_path}")
+    async with conn.cursor() as cur:
+        await cur.execute(
+            "UPDATE cronbid_media_blobs SET ref_count = ref_count + 1, released_at = NULL WHERE sha256 = %s",
+            (sha256,)
+        )
+        if cur.rowcount == 0:
+            raise HTTPException(status_code=400, detail=f"Unknown media file: {file_path}")
+
+
+async def release_blob(conn, file_path: str):
+    """
+    Drop one reference in the caller's transaction, so it only takes effect
+    if the campaign write that stops using the blob commits. The file itself
+    is only removed by the garbage collector.
+    """
+    sha256 = blob_sha256(file_path)
+    if not sha256:
+        return
+    async with conn.cursor() as cur:
+        await cur.execute("""
+            UPDATE cronbid_media_blobs
+            SET ref_count = GREATEST(ref_count, 1) - 1, released_at = NOW()
+            WHERE sha256 = %s
+        """, (sha256,))
+
+
+async def collect_garbage(conn, grace: datetime.timedelta = GC_GRACE) -> int:
+    """Delete blobs unreferenced for longer than `grace`. Returns the number removed."""
+    async with conn.cursor() as cur:
+        await cur.execute("""
+            SELECT sha256 FROM cronbid_media_blobs
+            WHERE ref_count = 0 AND released_at < %s
+            LIMIT %s
+        """, (datetime.datetime.now() - grace, GC_BATCH_SIZE))
+        candidates = [row[0] for row in await cur.fetchall()]
+
+    removed = 0
+    for sha256 in candidates:
+        await conn.begin()
+        try:
+            async with conn.cursor() as cur:
+                # Re-check under lock: store_blob may have re-referenced it meanwhile
+                await cur.execute(
+                    "SELECT mime_type FROM cronbid_media_blobs WHERE sha256 = %s AND ref_count = 0 FOR UPDATE",
+                    (sha256,)
+                )
+                row = await cur.fetchone()
+                if row:
+                    full_path = os.path.join(UPLOADS_DIR, blob_relative_path(sha256, row[0]))
+                    if await aiofiles.os.path.exists(full_path):
+                        await aiofiles.os.remove(full_path)
+                    await cur.execute("DELETE FROM cronbid_media_blobs WHERE sha256 = %s", (sha256,))
+                    removed += 1
+            await conn.commit()
+        except Exception as e:
+            await conn.rollback()
+            logger.warning(f"[MEDIA GC] Could not remove blob {sha256}: {e}")
+    return removed
+
+
+def _old_blob_files(grace: datetime.timedelta) -> list:
+    """(sha256 or None for temp files, path) of blob files older than `grace`. Runs in a thread."""
+    cutoff = (datetime.datetime.now() - grace).timestamp()
+    found = []
+    for dirpath, _, filenames in os.walk(BLOBS_DIR):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+            except OSError:
+                continue
+            if filename.endswith(".tmp"):
+                found.append((None, path))
+            else:
+                sha256 = os.path.splitext(filename)[0]
+                if len(sha256) == 64:
+                    found.append((sha256, path))
+    return found
+
+
+async def sweep_orphan_files(conn, grace: datetime.timedelta = GC_GRACE) -> int:
+    """
+    Delete blob files with no cronbid_media_blobs row (written by a store_blob
+    or adopt_file whose transaction rolled back) and abandoned temp files.
+    Returns the number removed.
+    """
+    files = await asyncio.to_thread(_old_blob_files, grace)
+    orphans = [path for sha256, path in files if sha256 is None]
+    by_sha = {sha256: path for sha256, path in files if sha256 is not None}
+
+    candidates = list(by_sha)
+    for i in range(0, len(candidates), GC_BATCH_SIZE):
+        chunk = candidates[i:i + GC_BATCH_SIZE]
+        async with conn.cursor() as cur:
+            await cur.execute(
+                f"SELECT sha256 FROM cronbid_media_blobs WHERE sha256 IN ({', '.join(['%s'] * len(chunk))})",
+                chunk
+            )
+            known = {row[0] for row in await cur.fetchall()}
+        for sha256 in chunk:
+            if sha256 not in known:
+                orphans.append(by_sha[sha256])
+
+    removed = 0
+    for path in orphans:
+        sha256 = os.path.splitext(os.path.basename(path))[0]
+        await conn.begin()
+        try:
+            if not path.endswith(".tmp"):
+                async with conn.cursor() as cur:
+                    # The locking read waits for an uncommitted upsert of this
+                    # sha256 and blocks new ones until the file is gone;
+                    # store_blob checks for the file only after its upsert
+                    await cur.execute("SELECT 1 FROM cronbid_media_blobs WHERE sha256 = %s FOR UPDATE", (sha256,))
+                    if await cur.fetchone():
+                        await conn.commit()
+                        continue
+            try:
+                await aiofiles.os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            await conn.commit()
+        except Exception as e:
+            await conn.rollback()
+            logger.warning(f"[MEDIA GC] Could not remove orphan file {path}: {e}")
+    return removed
+
+
+class MediaGarbageCollector:
+    """Daily removal of unreferenced blobs, started from the app lifespan."""
+    task: asyncio.Task = None
+
+    @classmethod
+    async def start(cls, interval: int = GC_INTERVAL_SECONDS):
+        if cls.task is None:
+            cls.task = asyncio.create_task(cls._run(interval))
+
+    @classmethod
+    async def _run(cls, interval: int):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                pool = await Database.connect()
+                async with pool.acquire() as conn:
+                    removed = await collect_garbage(conn)
+                    orphans = await sweep_orphan_files(conn)
+                if removed or orphans:
+                    logger.info(f"[MEDIA GC] Removed {removed} unreferenced blobs and {orphans} orphan files")
+            except Exception as e:
+                logger.error(f"[MEDIA GC] Run failed: {e}")
+
+    @classmethod
+    async def stop(cls):
+        if cls.task:
+            cls.task.cancel()
+            cls.task = None
@@ -0,0 +1,273 @@
+# services/mediaapis/resumable_uploads.py
+
+import asyncio
+import datetime
+import json
+import logging
+import os
+import uuid
+import aiofiles
+import aiofiles.os
+import aiomysql
+from fastapi import HTTPException, Request
+from database import Database
+from services.mediaapis.creative_uploads import (
+    ALLOWED_MIME_TYPES, MAX_UPLOAD_BYTES, UPLOAD_CHUNK_SIZE,
+    attach_uploads, generate_upload_id, remove_staged_files, sniff_mime_type, user_staging_dir
+)
+from utils.logger import insert_log_entry
+
+logger = logging.getLogger(__name__)
+
+SESSION_TTL = datetime.timedelta(hours=24)
+# Staged uploads (finished but never attached to a campaign) are removed after this
+STAGED_TTL = datetime.timedelta(days=7)
+CLEANUP_INTERVAL_SECONDS = 60 * 60
+
+# upload_id -> lock; serialises PATCH requests for one session within this worker
+_session_locks = {}
+
+
+def session_lock(upload_id: str) -> asyncio.Lock:
+    return _session_locks.setdefault(upload_id, asyncio.Lock())
+
+
+async def create_session(conn, user_id: str, file_name: str, upload_length: int) -> dict:
+    if upload_length <= 0 or upload_length > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload-Length must be between 1 and {MAX_UPLOAD_BYTES} bytes")
+
+    upload_id = generate_upload_id()
+    user_dir = user_staging_dir(user_id)
+    await aiofiles.os.makedirs(user_dir, exist_ok=True)
+    part_path = os.path.join(user_dir, f"{uuid.uuid4().hex}.part")
+    # Create the empty file so offset 0 always has something to append to
+    async with aiofiles.open(part_path, "wb"):
+        pass
+
+    expires_at = datetime.datetime.now() + SESSION_TTL
+    async with conn.cursor() as cur:
+        await cur.execute("""
+            INSERT INTO cronbid_media_uploads (
+                upload_id, user_id, original_name, size_bytes, storage_path,
+                status, upload_length, upload_offset, expires_at
+            ) VALUES (%s, %s, %s, 0, %s, 'uploading', %s, 0, %s)
+        """, (upload_id, user_id, file_name, part_path, upload_length, expires_at))
+    await conn.commit()
+    return {"upload_id": upload_id, "upload_length": upload_length, "upload_offset": 0, "expires_at": expires_at}
+
+
+async def get_session(conn, upload_id: str) -> dict:
+    async with conn.cursor(aiomysql.DictCursor) as cur:
+        await cur.execute("""
+            SELECT upload_id, user_id, original_name, mime_type, storage_path, status,
+                   upload_length, upload_offset, expires_at
+            FROM cronbid_media_uploads WHERE upload_id = %s
+        """, (upload_id,))
+        session = await cur.fetchone()
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if session["status"] == "uploading" and session["expires_at"] < datetime.datetime.now():
+        raise HTTPException(status_code=410, detail="Upload session expired")
+    return session
+
+
+async def append_chunk(conn, upload_id: str, offset: int, request: Request) -> int:
+    """
+    Append the request body at `offset`, streaming it straight to the .part file.
+    Returns the new offset. A mismatched offset is a 409 so the client can HEAD and resume.
+    """
+    async with session_lock(upload_id):
+        session = await get_session(conn, upload_id)
+        if session["status"] != "uploading":
+            raise HTTPException(status_code=409, detail="Upload already finalized")
+
+        part_path = session["storage_path"]
+        # The .part file is the source of truth: a previous PATCH may have
+        # written bytes but died before saving the offset
+        current = (await aiofiles.os.stat(part_path)).st_size
+        if offset != current:
+            raise HTTPException(status_code=409, detail=f"Upload-Offset mismatch, expected {current}")
+
+        written = 0
+        try:
+            async with aiofiles.open(part_path, "r+b") as f:
+                await f.seek(offset)
+                await f.truncate()
+                async for chunk in request.stream():
+                    if not chunk:
+                        continue
+                    if offset == 0 and written == 0:
+                        mime_type = sniff_mime_type(chunk[:UPLOAD_CHUNK_SIZE])
+                        if mime_type not in ALLOWED_MIME_TYPES:
+                            raise HTTPException(status_code=415, detail=f"Unsupported file type: {mime_type}")
+                    if offset + written + len(chunk) > session["upload_length"]:
+                        raise HTTPException(status_code=413, detail="Chunk exceeds Upload-Length")
+                    await f.write(chunk)
+                    written += len(chunk)
+        finally:
+            # Keep whatever reached the disk; the client resumes from here
+            new_offset = offset + written
+            async with conn.cursor() as cur:
+                await cur.execute("""
+                    UPDATE cronbid_media_uploads SET upload_offset = %s, size_bytes = %s
+                    WHERE upload_id = %s AND status = 'uploading'
+                """, (new_offset, new_offset, upload_id))
+            await conn.commit()
+
+    return new_offset
+
+
+async def finalize_session(conn, upload_id: str) -> dict:
+    """Validate the assembled file and turn the session into a staged upload."""
+    async with session_lock(upload_id):
+        session = await get_session(conn, upload_id)
+        if session["status"] != "uploading":
+            raise HTTPException(status_code=409, detail="Upload already finalized")
+        part_path = session["storage_path"]
+        received = (await aiofiles.os.stat(part_path)).st_size
+        if received != session["upload_length"]:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload incomplete: {received} of {session['upload_length']} bytes received"
+            )
+
+        async with aiofiles.open(part_path, "rb") as f:
+            head = await f.read(UPLOAD_CHUNK_SIZE)
+        mime_type = sniff_mime_type(head)
+        if mime_type not in ALLOWED_MIME_TYPES:
+            raise HTTPException(status_code=415, detail=f"Unsupported file type: {mime_type}")
+
+        final_path = part_path[:-len(".part")] + ALLOWED_MIME_TYPES[mime_type]
+        await aiofiles.os.replace(part_path, final_path)
+
+        async with conn.cursor() as cur:
+            await cur.execute("""
+                UPDATE cronbid_media_uploads
+                SET status = 'staged', mime_type = %s, storage_path = %s,
+                    size_bytes = upload_length, expires_at = NULL
+                WHERE upload_id = %s
+            """, (mime_type, final_path, upload_id))
+        await conn.commit()
+
+    _session_locks.pop(upload_id, None)
+    return {"upload_id": upload_id, "mime_type": mime_type, "size": session["upload_length"], "user_id": session["user_id"]}
+
+
+async def attach_to_campaign(conn, upload_id: str, user_id: str, campaign_id: str, target: str, audience_meta: dict = None) -> dict:
+    """Move a staged upload into the media store and append it to creatives or uploadAudience."""
+    async with conn.cursor(aiomysql.DictCursor) as cur:
+        await cur.execute(
+            "SELECT creatives, targeting FROM cronbid_campaigns WHERE campaign_id = %s",
+            (campaign_id,)
+        )
+        campaign = await cur.fetchone()
+    if not campaign:
+        raise HTTPException(status_code=404, detail=f"Campaign {campaign_id} not found")
+
+    await conn.begin()
+    try:
+        # Same transaction as the campaign update: a failed update leaves the
+        # upload staged and the blob reference untouched
+        attached, staged_paths = await attach_uploads(conn, [upload_id], user_id, campaign_id)
+        attached = attached[upload_id]
+        async with conn.cursor(aiomysql.DictCursor) as cur:
+            # Re-read under lock so concurrent attaches don't overwrite each other
+            await cur.execute(
+                "SELECT creatives, targeting FROM cronbid_campaigns WHERE campaign_id = %s FOR UPDATE",
+                (campaign_id,)
+            )
+            campaign = await cur.fetchone()
+            if target == "creatives":
+                creatives = json.loads(campaign["creatives"] or "[]")
+                creatives.append(attached)
+                await cur.execute(
+                    "UPDATE cronbid_campaigns SET creatives = %s WHERE campaign_id = %s",
+                    (json.dumps(creatives), campaign_id)
+                )
+            else:
+                targeting = json.loads(campaign["targeting"] or "{}")
+                audience = targeting.setdefault("audienceTargeting", {}) or {}
+                targeting["audienceTargeting"] = audience
+                audience.setdefault("uploadAudience", []).append({
+                    "filePath": attached["filePath"],
+                    "event": (audience_meta or {}).get("event"),
+                    "isEncrypted": (audience_meta or {}).get("isEncrypted", False),
+                    "encryptionKey": (audience_meta or {}).get("encryptionKey")
+                })
+                await cur.execute(
+                    "UPDATE cronbid_campaigns SET targeting = %s WHERE campaign_id = %s",
+                    (json.dumps(targeting), campaign_id)
+                )
+            await insert_log_entry(
+                conn,
+                action="update",
+                table_name="cronbid_campaigns",
+                record_id=campaign_id,
+                user_id=user_id,
+                action_description=f"Attached upload {upload_id} to {target}",
+                sync=True
+            )
+        await conn.commit()
+    except Exception:
+        await conn.rollback()
+        raise
+    await remove_staged_files(staged_paths)
+    return attached
+
+
+async def cleanup_expired_uploads(conn) -> int:
+    """Delete expired upload sessions and staged uploads nobody attached, files first."""
+    now = datetime.datetime.now()
+    async with conn.cursor() as cur:
+        await cur.execute("""
+            SELECT upload_id, storage_path FROM cronbid_media_uploads
+            WHERE (status = 'uploading' AND expires_at < %s)
+               OR (status = 'staged' AND created_at < %s)
+        """, (now, now - STAGED_TTL))
+        rows = await cur.fetchall()
+
+        for upload_id, storage_path in rows:
+            try:
+                if await aiofiles.os.path.exists(storage_path):
+                    await aiofiles.os.remove(storage_path)
+            except OSError as e:
+                logger.warning(f"[UPLOAD CLEANUP] Could not delete {storage_path}: {e}")
+            _session_locks.pop(upload_id, None)
+
+        if rows:
+            placeholders = ", ".join(["%s"] * len(rows))
+            await cur.execute(
+                f"DELETE FROM cronbid_media_uploads WHERE upload_id IN ({placeholders}) AND status != 'attached'",
+                [row[0] for row in rows]
+            )
+    await conn.commit()
+    return len(rows)
+
+
+class UploadJanitor:
+    """Hourly cleanup of expired sessions, started from the app lifespan."""
+    task: asyncio.Task = None
+
+    @classmethod
+    async def start(cls, interval: int = CLEANUP_INTERVAL_SECONDS):
+        if cls.task is None:
+            cls.task = asyncio.create_task(cls._run(interval))
+
+    @classmethod
+    async def _run(cls, interval: int):
+        while True:
+            try:
+                pool = await Database.connect()
+                async with pool.acquire() as conn:
+                    removed = await cleanup_expired_uploads(conn)
+                if removed:
+                    logger.info(f"[UPLOAD CLEANUP] Removed {removed} expired uploads")
+            except Exception as e:
+                logger.error(f"[UPLOAD CLEANUP] Run failed: {e}")
+            await asyncio.sleep(interval)
+
+    @classmethod
+    async def stop(cls):
+        if cls.task:
+            cls.task.cancel()
+            cls.task = None
@@ -0,0 +1,213 @@
+# services/reportapis/report_rollups.py
+#
+# Hourly and daily rollups of postbacks by campaign x source x sub2 x country
+# x event. The rollup job folds new cronbid_postback_events rows (above an id
+# watermark) into cronbid_report_hourly/_daily with additive upserts, in the
+# same transaction that advances the watermark, so every event is counted
+# exactly once. Reports and the dashboard read only the rollup tables.
+
+import asyncio
+import datetime
+import logging
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+# Events received more recently than this are left for the next run, so rows
+# from still-open INSERTs are not skipped by the id watermark
+ROLLUP_SETTLE_DELAY = datetime.timedelta(seconds=10)
+ROLLUP_INTERVAL_SECONDS = 30
+ROLLUP_BATCH_SIZE = 50_000
+HOURLY_RETENTION = datetime.timedelta(days=90)
+PURGE_INTERVAL_SECONDS = 24 * 60 * 60
+ROLLUP_NAME = "postbacks"
+
+# Report dimension -> rollup column
+DIMENSIONS = {
+    "campaign": "campaign_id",
+    "source": "source_id",
+    "sub2": "sub2",
+    "country": "country",
+    "event": "event_id",
+}
+
+# Rollup table and bucket expression per granularity; "total" has no date column
+GRANULARITIES = {
+    "hour": ("cronbid_report_hourly", "bucket"),
+    "day": ("cronbid_report_daily", "bucket"),
+    "month": ("cronbid_report_daily", "DATE_FORMAT(bucket, '%%Y-%%m')"),
+    "total": ("cronbid_report_daily", None),
+}
+MAX_HOURLY_RANGE = datetime.timedelta(days=31)
+
+FOLD_SQL = """
+    INSERT INTO {table} (bucket, campaign_id, source_id, sub2, country, event_id, conversions, payout)
+    SELECT {bucket}, campaign_id, source_id, sub2, country, event_id, COUNT(*), COALESCE(SUM(payout), 0)
+    FROM cronbid_postback_events
+    WHERE id > %s AND id <= %s
+    GROUP BY 1, campaign_id, source_id, sub2, country, event_id
+    ON DUPLICATE KEY UPDATE
+        conversions = conversions + VALUES(conversions),
+        payout = payout + VALUES(payout)
+"""
+
+
+async def fold_postbacks(conn, batch_size: int = ROLLUP_BATCH_SIZE) -> int:
+    """
+    Fold up to batch_size new postbacks into both rollups. Returns the number
+    of events folded; 0 means the rollups are caught up.
+    """
+    settled_before = datetime.datetime.utcnow() - ROLLUP_SETTLE_DELAY
+    await conn.begin()
+    try:
+        async with conn.cursor() as cur:
+            # The row lock serialises runs from several workers
+            await cur.execute(
+                "SELECT last_row_id FROM cronbid_report_rollup_state WHERE name = %s FOR UPDATE",
+                (ROLLUP_NAME,)
+            )
+            row = await cur.fetchone()
+            if row is None:
+                await cur.execute(
+                    "INSERT IGNORE INTO cronbid_report_rollup_state (name, last_row_id) VALUES (%s, 0)",
+                    (ROLLUP_NAME,)
+                )
+                watermark = 0
+            else:
+                watermark = row[0]
+
+            await cur.execute("""
+                SELECT COUNT(*), MAX(id) FROM (
+                    SELECT id FROM cronbid_postback_events
+                    WHERE id > %s AND received_at <= %s
+                    ORDER BY id
+                    LIMIT %s
+                ) batch
+            """, (watermark, settled_before, batch_size))
+            folded, upper = await cur.fetchone()
+            if not folded:
+                await conn.commit()
+                return 0
+
+            await cur.execute(
+                FOLD_SQL.format(table="cronbid_report_hourly", bucket="DATE_FORMAT(event_time, '%%Y-%%m-%%d %%H:00:00')"),
+                (watermark, upper)
+            )
+            await cur.execute(
+                FOLD_SQL.format(table="cronbid_report_daily", bucket="DATE(event_time)"),
+                (watermark, upper)
+            )
+            await cur.execute(
+                "UPDATE cronbid_report_rollup_state SET last_row_id = %s WHERE name = %s",
+                (upper, ROLLUP_NAME)
+            )
+        await conn.commit()
+    except Exception:
+        await conn.rollback()
+        raise
+    return folded
+
+
+async def run_rollups(conn) -> int:
+    """Fold batches until caught up. Returns the total number of events folded."""
+    total = 0
+    while True:
+        folded = await fold_postbacks(conn)
+        total += folded
+        if folded < ROLLUP_BATCH_SIZE:
+            return total
+
+
+async def purge_hourly(conn, retention: datetime.timedelta = HOURLY_RETENTION) -> int:
+    """Hourly rows older than the retention are covered by the daily rollup."""
+    async with conn.cursor() as cur:
+        await cur.execute(
+            "DELETE FROM cronbid_report_hourly WHERE bucket < %s",
+            (datetime.datetime.utcnow() - retention,)
+        )
+        return cur.rowcount
+
+
+def build_report_query(
+    granularity: str,
+    date_from: datetime.date,
+    date_to: datetime.date,
+    group_by: list,
+    filters: dict,
+    limit: int
+):
+    """SQL and values for one report over the rollup matching `granularity`."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity}")
+    unknown = [d for d in group_by if d not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown dimensions: {', '.join(unknown)}")
+    if date_to < date_from:
+        raise ValueError("date_to is before date_from")
+    if granularity == "hour" and date_to - date_from >= MAX_HOURLY_RANGE:
+        raise ValueError(f"Hourly reports are limited to {MAX_HOURLY_RANGE.days} days")
+
+    table, bucket = GRANULARITIES[granularity]
+    select = []
+    group = []
+    if bucket:
+        select.append(f"{bucket} AS period")
+        group.append("period")
+    for dimension in group_by:
+        select.append(f"{DIMENSIONS[dimension]} AS {dimension}")
+        group.append(dimension)
+
+    # Date range first: it is the leading column of the rollup primary keys
+    where = ["bucket >= %s", "bucket < %s"]
+    values = [date_from, date_to + datetime.timedelta(days=1)]
+    for dimension, value in filters.items():
+        if value is not None:
+            where.append(f"{DIMENSIONS[dimension]} = %s")
+            values.append(value)
+
+    query = f"""
+        SELECT {', '.join(select + ['SUM(conversions) AS conversions', 'SUM(payout) AS payout'])}
+        FROM {table}
+        WHERE {' AND '.join(where)}
+    """
+    if group:
+        query += f" GROUP BY {', '.join(group)}"
+    query += " ORDER BY " + ("period, conversions DESC" if bucket else "conversions DESC")
+    query += " LIMIT %s"
+    values.append(limit)
+    return query, values
+
+
+class ReportRollup:
+    """Periodic rollup job, started and stopped from the app lifespan."""
+    task: asyncio.Task = None
+
+    @classmethod
+    async def start(cls, interval: int = ROLLUP_INTERVAL_SECONDS):
+        if cls.task is None:
+            cls.task = asyncio.create_task(cls._run(interval))
+
+    @classmethod
+    async def _run(cls, interval: int):
+        loop = asyncio.get_running_loop()
+        next_purge = loop.time() + PURGE_INTERVAL_SECONDS
+        while True:
+            try:
+                pool = await Database.connect()
+                async with pool.acquire() as conn:
+                    folded = await run_rollups(conn)
+                    if folded:
+                        logger.info(f"[REPORT ROLLUP] Folded {folded} postbacks")
+                    if loop.time() >= next_purge:
+                        next_purge = loop.time() + PURGE_INTERVAL_SECONDS
+                        purged = await purge_hourly(conn)
+                        logger.info(f"[REPORT ROLLUP] Purged {purged} hourly rows")
+            except Exception as e:
+                logger.error(f"[REPORT ROLLUP] Run failed: {e}")
+            await asyncio.sleep(interval)
+
+    @classmethod
+    async def stop(cls):
+        if cls.task:
+            cls.task.cancel()
+            cls.task = None
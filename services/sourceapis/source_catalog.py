@@ -0,0 +1,59 @@
+# services/sourceapis/source_catalog.py
+#
+# In-process cache of cronbid_sources. The source list changes rarely but is
+# fetched on every dashboard load, so reads are served from memory and
+# add_sources clears the cache once its insert is committed. Other workers
+# pick up a new source after at most SOURCE_CACHE_TTL_SECONDS.
+#
+# Each cached result carries an ETag computed once per load, so clients that
+# revalidate with If-None-Match get a 304 without the body being rebuilt.
+
+import hashlib
+import json
+import aiomysql
+from database import Database
+from utils.ttl_cache import TTLCache
+
+SOURCE_CACHE_TTL_SECONDS = 600
+SOURCE_FILTER_COLUMNS = ("source_id", "name", "category", "type")
+
+source_cache = TTLCache(maxsize=256, ttl=SOURCE_CACHE_TTL_SECONDS)
+
+
+def invalidate_source_catalog():
+    source_cache.clear()
+
+
+def catalog_etag(rows) -> str:
+    body = json.dumps(rows, default=str, sort_keys=True, separators=(",", ":"))
+    return f'W/"{hashlib.sha1(body.encode()).hexdigest()}"'
+
+
+async def _query_sources(filters: dict) -> dict:
+    conditions = []
+    values = []
+    for column in SOURCE_FILTER_COLUMNS:
+        if filters.get(column):
+            conditions.append(f"{column} = %s")
+            values.append(filters[column])
+
+    query = "SELECT * FROM cronbid_sources"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+
+    pool = await Database.connect()
+    async with pool.acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cur:
+            await cur.execute(query, values)
+            rows = await cur.fetchall()
+    for row in rows:
+        # Variant URLs by size and format; None for logos saved before the image pipeline
+        if row.get("logo_variants"):
+            row["logo_variants"] = json.loads(row["logo_variants"])
+    return {"sources": rows, "etag": catalog_etag(rows)}
+
+
+async def read_sources(filters: dict) -> dict:
+    """{"sources": rows, "etag": ...} for the given column filters, cached."""
+    key = tuple(filters.get(column) or None for column in SOURCE_FILTER_COLUMNS)
+    return await source_cache.get_or_load(key, lambda: _query_sources(filters))
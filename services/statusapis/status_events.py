@@ -0,0 +1,160 @@
+# services/statusapis/status_events.py
+#
+# Push of partner/sub2 status changes to subscribed trackers. The status
+# POST handlers publish an event after their commit; each subscriber gets
+# the events matching its filters on its own bounded queue.
+#
+# Every event has a sequence number. The broker keeps the most recent
+# REPLAY_BUFFER_SIZE events so a client that reconnects with its last
+# sequence number receives what it missed; if that is no longer buffered
+# (or from before a restart) it gets a "reset" event and should re-read the
+# tables with the delta GETs (?since=) before following the stream again.
+#
+# LocalStatusBroker only reaches subscribers of this process. A multi-node
+# broker implements the same publish/subscribe/close interface, e.g. by
+# publishing to a shared channel and feeding received events to a local
+# broker, and is installed with StatusEvents.use().
+
+import abc
+import asyncio
+import collections
+import datetime
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+REPLAY_BUFFER_SIZE = 10_000
+SUBSCRIBER_QUEUE_SIZE = 1_000
+
+
+class Subscription:
+    def __init__(self, filters: dict):
+        # Only filters that were given; values compared as strings
+        self.filters = {k: str(v) for k, v in filters.items() if v is not None}
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.closed = False
+
+    def matches(self, event: dict) -> bool:
+        for field, value in self.filters.items():
+            if str(event.get(field)) != value:
+                return False
+        return True
+
+    def deliver(self, event) -> bool:
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def next_event(self, timeout: float):
+        """Next event, or None after `timeout` seconds without one."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class StatusBroker(abc.ABC):
+    """Interface for status event fan-out; incomplete implementations can't be instantiated."""
+
+    @abc.abstractmethod
+    def publish(self, event_type: str, payload: dict) -> dict:
+        """Assign the next seq, buffer the event for replay and fan it out."""
+
+    @abc.abstractmethod
+    def subscribe(self, filters: dict, last_seq: int = None) -> Subscription:
+        """New subscription, first replaying buffered events after last_seq."""
+
+    @abc.abstractmethod
+    def unsubscribe(self, subscription: Subscription):
+        """Stop delivering to the subscription."""
+
+    @abc.abstractmethod
+    async def close(self):
+        """Close every subscription."""
+
+
+class LocalStatusBroker(StatusBroker):
+    def __init__(self, buffer_size: int = REPLAY_BUFFER_SIZE):
+        # Millisecond boot time as the base keeps numbers increasing across
+        # restarts, so ids from a previous run are recognisably too old
+        self.first_seq = int(time.time() * 1000) * 1000
+        self.seq = self.first_seq
+        self.buffer = collections.deque(maxlen=buffer_size)
+        self.subscribers = set()
+        self.stats = {"published": 0, "delivered": 0, "dropped_subscribers": 0}
+
+    def publish(self, event_type: str, payload: dict) -> dict:
+        self.seq += 1
+        event = {"seq": self.seq, "type": event_type, "at": datetime.datetime.utcnow().isoformat(), **payload}
+        self.buffer.append(event)
+        self.stats["published"] += 1
+        for subscription in list(self.subscribers):
+            if not subscription.matches(event):
+                continue
+            if subscription.deliver(event):
+                self.stats["delivered"] += 1
+            else:
+                # Too slow to keep up: cut it off, the client resumes from its last seq
+                self.stats["dropped_subscribers"] += 1
+                logger.warning(f"[STATUS EVENTS] Dropping lagging subscriber {subscription.filters}")
+                self._close_subscription(subscription)
+        return event
+
+    def subscribe(self, filters: dict, last_seq: int = None) -> Subscription:
+        subscription = Subscription(filters)
+        if last_seq is not None and last_seq > self.seq:
+            # Issued by another worker (or a later boot): nothing here lines up with it
+            subscription.deliver({"seq": self.seq, "type": "reset", "reason": "unknown event id"})
+        elif last_seq is not None and last_seq < self.seq:
+            oldest = self.buffer[0]["seq"] if self.buffer else self.seq + 1
+            if last_seq < oldest - 1:
+                subscription.deliver({"seq": self.seq, "type": "reset", "reason": "history no longer available"})
+            else:
+                for event in self.buffer:
+                    if event["seq"] > last_seq and subscription.matches(event):
+                        if not subscription.deliver(event):
+                            # Backlog bigger than the queue: make the client resync instead
+                            subscription.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+                            subscription.deliver({"seq": self.seq, "type": "reset", "reason": "too many missed events"})
+                            break
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+
+    def _close_subscription(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+        subscription.closed = True
+        # Make room for the end-of-stream marker
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+    async def close(self):
+        for subscription in list(self.subscribers):
+            self._close_subscription(subscription)
+
+
+class StatusEvents:
+    """Process-wide broker used by the status handlers and the stream endpoint."""
+    broker: StatusBroker = LocalStatusBroker()
+
+    @classmethod
+    def use(cls, broker: StatusBroker):
+        cls.broker = broker
+
+    @classmethod
+    def publish(cls, event_type: str, payload: dict):
+        # Never fail a write because of the push side
+        try:
+            cls.broker.publish(event_type, payload)
+        except Exception as e:
+            logger.error(f"[STATUS EVENTS] Publish failed: {e}")
+
+    @classmethod
+    async def stop(cls):
+        await cls.broker.close()
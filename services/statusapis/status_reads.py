@@ -0,0 +1,106 @@
+# services/statusapis/status_reads.py
+#
+# Cached, filtered and paginated reads of partner_status / sub2_status.
+# Trackers poll these tables constantly; polls are answered from an
+# in-process read-through cache (concurrent misses share one query) and the
+# status POST handlers clear it after every write. Other workers' writes
+# show up after at most STATUS_CACHE_TTL_SECONDS.
+#
+# Rows are returned in (updated_at, id) order so a poller can page through a
+# delta with the keyset cursor and start the next poll from next_since.
+# `since` is inclusive and rounded down to STATUS_SINCE_BUCKET_SECONDS, so
+# delta polls from different trackers share cache entries (and the cursor
+# pages after them). The price is that rows changed shortly before `since`
+# come again, which is harmless since each row is the full current status
+# of its key.
+
+import datetime
+import aiomysql
+from database import Database
+from utils.pagination import keyset_filter, split_page
+from utils.ttl_cache import TTLCache
+
+STATUS_CACHE_TTL_SECONDS = 15
+STATUS_CACHE_MAX_ENTRIES = 2048
+# Must divide 60
+STATUS_SINCE_BUCKET_SECONDS = 30
+
+# Filterable columns per table
+STATUS_TABLES = {
+    "partner_status": ("campaign_id", "source_id", "status"),
+    "sub2_status": ("campaign_id", "source_id", "sub2", "status"),
+}
+
+status_caches = {
+    table: TTLCache(maxsize=STATUS_CACHE_MAX_ENTRIES, ttl=STATUS_CACHE_TTL_SECONDS)
+    for table in STATUS_TABLES
+}
+
+
+def bucket_since(since: datetime.datetime) -> datetime.datetime:
+    """Round since down to the start of its STATUS_SINCE_BUCKET_SECONDS bucket."""
+    if since is None:
+        return None
+    return since - datetime.timedelta(
+        seconds=since.second % STATUS_SINCE_BUCKET_SECONDS, microseconds=since.microsecond
+    )
+
+
+def invalidate_status_cache(table: str):
+    """Called by the write handlers once their change is committed."""
+    status_caches[table].clear()
+
+
+async def _query_statuses(table: str, filters: dict, since: datetime.datetime, cursor: str, limit: int) -> dict:
+    conditions = []
+    values = []
+    for column in STATUS_TABLES[table]:
+        if filters.get(column) is not None:
+            conditions.append(f"{column} = %s")
+            values.append(filters[column])
+    if since:
+        conditions.append("updated_at >= %s")
+        values.append(since)
+    if cursor:
+        clause, cursor_values = keyset_filter(cursor, "updated_at", "id", descending=False)
+        conditions.append(clause)
+        values.extend(cursor_values)
+
+    query = f"SELECT * FROM {table}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY updated_at, id LIMIT %s"
+    values.append(limit + 1)
+
+    pool = await Database.connect()
+    async with pool.acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cur:
+            await cur.execute(query, values)
+            rows = await cur.fetchall()
+
+    rows, next_cursor = split_page(rows, limit, time_field="updated_at")
+    if next_cursor is None:
+        # Last page: the next poll starts where this one ended
+        next_since = rows[-1]["updated_at"] if rows else since
+    else:
+        next_since = None
+    return {"rows": rows, "next_cursor": next_cursor, "next_since": next_since}
+
+
+async def read_statuses(table: str, filters: dict, since: datetime.datetime = None, cursor: str = None, limit: int = 500) -> dict:
+    since = bucket_since(since)
+    key = (tuple(filters.get(column) for column in STATUS_TABLES[table]), since, cursor, limit)
+    return await status_caches[table].get_or_load(
+        key, lambda: _query_statuses(table, filters, since, cursor, limit)
+    )
+
+
+async def read_all_statuses(table: str) -> list:
+    """The unfiltered table, as the original parameterless GET returned it."""
+    async def load():
+        pool = await Database.connect()
+        async with pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute(f"SELECT * FROM {table}")
+                return await cur.fetchall()
+    return await status_caches[table].get_or_load("all", load)
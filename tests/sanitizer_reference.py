@@ -0,0 +1,72 @@
+# tests/sanitizer_reference.py
+#
+# Reference behaviour for the shared payload sanitizer: the per-module
+# campaign sanitizer it replaced, kept verbatim, and a wizard-shaped payload.
+# The tests check against these and the sanitizer benchmark times them, so
+# they live here rather than in the benchmark script.
+
+import base64
+import os
+import re
+
+
+def legacy_is_malicious_input(value: str) -> bool:
+    regex = re.compile(
+        r"(['\";]|--|\b(drop|alter|insert|delete|update|select|union|exec|sleep|waitfor|shutdown)\b)|(<script>)",
+        re.IGNORECASE
+    )
+    return bool(regex.search(value))
+
+
+def legacy_find_malicious_value(data: dict):
+    def recursive_check(data_node, path=""):
+        if isinstance(data_node, dict):
+            for key, value in data_node.items():
+                current_path = f"{path}.{key}" if path else key
+                if key in {'fileData', 'description'}:
+                    continue
+                if isinstance(value, str):
+                    if legacy_is_malicious_input(value):
+                        return current_path
+                elif isinstance(value, (dict, list)):
+                    found = recursive_check(value, current_path)
+                    if found:
+                        return found
+        elif isinstance(data_node, list):
+            for idx, item in enumerate(data_node):
+                found = recursive_check(item, f"{path}[{idx}]")
+                if found:
+                    return found
+        return None
+    return recursive_check(data)
+
+
+def campaign_payload(creatives: int = 20, countries: int = 60, file_kb: int = 256) -> dict:
+    """Roughly the shape the campaign wizard posts."""
+    file_data = "data:image/png;base64," + base64.b64encode(os.urandom(file_kb * 1024)).decode()
+    return {
+        "user_id": "USR-1029",
+        "user_name": "Acme Ads",
+        "general": {"brandId": "BRD-1a2b3c4d", "brandName": "Acme"},
+        "appDetails": {
+            "name": "Acme Puzzle", "package": "com.acme.puzzle", "os": "android",
+            "description": "Match tiles; beat levels -- and it's free! " * 40,
+            "icon": "https://play-lh.googleusercontent.com/icon.png",
+        },
+        "campaignDetails": {"campaignTitle": "Q4 UA push", "kpi": "D7 ROAS", "objective": "installs"},
+        "creatives": {"files": [
+            {"fileName": f"banner_{i}.png", "fileData": file_data, "size": f"{file_kb}KB"}
+            for i in range(creatives)
+        ]},
+        "conversionFlow": {"events": [{"name": f"level_{i}", "payout": 0.5 + i} for i in range(15)]},
+        "budget": {"daily": 500, "total": 15000, "currency": "USD"},
+        "targeting": {
+            "countrySelections": [
+                {"country": f"C{i}", "includedStates": [f"S{i}-{j}" for j in range(25)], "excludedCities": []}
+                for i in range(countries)
+            ],
+            "formData": {"devices": ["phone", "tablet"], "osVersions": ["10", "11", "12", "13", "14"]},
+            "audienceTargeting": {"uploadAudience": [], "createAudience": [], "cronAudience": "Disabled"},
+        },
+        "source": {"sources": [{"id": f"SRC-{i}", "enabled": True} for i in range(30)]},
+    }
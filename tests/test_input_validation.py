@@ -0,0 +1,77 @@
+# tests/test_input_validation.py
+#
+# The shared sanitizer must accept and reject exactly what the per-route
+# campaign sanitizer it replaced did. Run from the repository root:
+#   python -m pytest -q tests
+
+import copy
+import pytest
+from fastapi import HTTPException
+from tests.sanitizer_reference import campaign_payload, legacy_find_malicious_value
+from utils.input_validation import CAMPAIGN_SKIP_SCHEMA, find_malicious_value, sanitize_payload
+
+
+def wizard_payload() -> dict:
+    """A campaign payload with free text in every place the wizard sends a description."""
+    payload = campaign_payload(creatives=2, countries=3, file_kb=1)
+    payload["description"] = "It's great; the best -- really"
+    payload["creatives"]["description"] = "Banners for the \"summer\" push"
+    payload["conversionFlow"]["events"][0]["description"] = "Player's first level; select a hero"
+    payload["targeting"]["audienceTargeting"]["createAudience"] = [
+        {"name": "lapsed", "description": "Users who didn't update in 30 days"}
+    ]
+    payload["targeting"]["audienceTargeting"]["uploadAudience"] = [
+        {"name": "list.csv", "fileData": "data:text/csv;base64,aWQ7bmFtZQ=="}
+    ]
+    return payload
+
+
+def set_path(payload: dict, path: tuple, value):
+    node = payload
+    for key in path[:-1]:
+        node = node[key]
+    node[path[-1]] = value
+
+
+MALICIOUS_PATHS = [
+    ("user_name",),
+    ("campaignDetails", "campaignTitle"),
+    ("appDetails", "name"),
+    ("conversionFlow", "events", 3, "name"),
+    ("creatives", "files", 1, "fileName"),
+    ("targeting", "countrySelections", 2, "country"),
+    ("targeting", "audienceTargeting", "createAudience", 0, "name"),
+]
+
+
+@pytest.mark.parametrize("payload", [
+    {"description": "it's great"},
+    {"general": {"description": "a; b"}},
+    wizard_payload(),
+])
+def test_clean_payloads_match_legacy(payload):
+    assert legacy_find_malicious_value(payload) is None
+    assert find_malicious_value(payload, skip=CAMPAIGN_SKIP_SCHEMA) is None
+
+
+@pytest.mark.parametrize("path", MALICIOUS_PATHS)
+def test_rejected_fields_match_legacy(path):
+    payload = copy.deepcopy(wizard_payload())
+    set_path(payload, path, "x'; DROP TABLE cronbid_campaigns --")
+    expected = legacy_find_malicious_value(payload)
+    assert expected is not None
+    assert find_malicious_value(payload, skip=CAMPAIGN_SKIP_SCHEMA) == expected
+
+
+def test_bare_strings_in_lists_are_not_checked():
+    payload = {"targeting": {"countrySelections": [{"includedStates": ["x'; drop"]}]}}
+    assert legacy_find_malicious_value(payload) is None
+    assert find_malicious_value(payload, skip=CAMPAIGN_SKIP_SCHEMA) is None
+
+
+def test_key_named_like_the_any_depth_marker_is_checked_normally():
+    assert sanitize_payload({"**": {"x": "ok"}}) is True
+    with pytest.raises(HTTPException) as exc:
+        sanitize_payload({"**": {"x": "a'; drop table users"}})
+    assert exc.value.status_code == 400
+    assert "**.x" in exc.value.detail
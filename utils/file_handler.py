@@ -1,29 +1,21 @@
-import os
-from pathlib import Path
 import base64
+import binascii
 from datetime import datetime
+from services.mediaapis.image_pipeline import store_logo
 
-def save_brand_logo(brand_id: str, base64_image: str) -> str:
+BRAND_LOGO_DIR = "uploads/brand_logos"
+
+async def save_brand_logo(brand_id: str, base64_image: str) -> dict:
     """
-    Save brand logo to filesystem and return the file path
+    Save a base64 data-URL brand logo through the image pipeline and return
+    {"path", "variants"}. The type comes from the decoded bytes, not the
+    data-URL header; raises ValueError for anything that isn't an image.
     """
-    # Create uploads directory if it doesn't exist
-    upload_dir = Path("uploads/brand_logos")
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Extract file extension from base64 header
-    file_ext = base64_image.split(';')[0].split('/')[1]
-    
+    try:
+        image_data = base64.b64decode(base64_image.split(',', 1)[1], validate=True)
+    except (IndexError, binascii.Error):
+        raise ValueError("Invalid base64 image data")
+
     # Generate filename using brand_id and timestamp
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{brand_id}_{timestamp}.{file_ext}"
-    
-    # Full path for the file
-    file_path = upload_dir / filename
-    
-    # Decode and save the image
-    image_data = base64.b64decode(base64_image.split(',')[1])
-    with open(file_path, 'wb') as f:
-        f.write(image_data)
-    
-    return str(file_path)
\ No newline at end of file
+    return await store_logo(image_data, BRAND_LOGO_DIR, BRAND_LOGO_DIR, f"{brand_id}_{timestamp}")
@@ -8,3 +8,10 @@ def generate_custom_id(prefix: str) -> str:
     timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")[:-3]  # e.g., 20250429152030123
     random_part = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
     return f"{prefix.upper()}_{timestamp}_{random_part}"
+
+
+def generate_clean_id(prefix: str, suffix_length: int = 4) -> str:
+    """Fund and transaction ids: txn-<yymmddHHMMSS><random suffix>."""
+    timestamp = datetime.now().strftime("%y%m%d%H%M%S")
+    rand_suffix = ''.join(random.choices(string.ascii_lowercase + string.digits, k=suffix_length))
+    return f"{prefix}-{timestamp}{rand_suffix}"
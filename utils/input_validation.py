@@ -0,0 +1,123 @@
+# utils/input_validation.py
+#
+# Shared malicious-input checks for request payloads. Patterns are compiled
+# once at import, the walk stops at the first offending value, and the field
+# path is only built for that value.
+# Binary/free-text fields are skipped through a skip schema: by their
+# position in the payload, or by key name at any depth ("**.key").
+
+import re
+from fastapi import HTTPException
+
+# Matched against the lower-cased value: a case-sensitive search is much
+# cheaper than re.IGNORECASE and gives the same result for these ASCII patterns
+CAMPAIGN_PATTERN = re.compile(
+    r"['\";]|--|<script>|\b(?:drop|alter|insert|delete|update|select|union|exec|sleep|waitfor|shutdown)\b"
+)
+BRAND_PATTERN = re.compile(r"['\";]|--|\b(?:drop|alter|insert|delete|update|select)\b")
+USER_PATTERN = re.compile(
+    r"['\";]|--|#|/\*|\*/|"  # SQL comment markers and string terminators
+    r"\b(?:drop|alter|insert|delete|update|select|union|create|"  # SQL commands
+    r"exec|execute|declare|set|waitfor|cast|convert)\b|"  # More SQL keywords
+    r"xp_|sp_|syscolumns|syslogins|sysusers|sysobjects"  # SQL stored procedures and system tables
+)
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+SKIP = True
+
+
+def build_skip_schema(*paths: str) -> tuple:
+    """
+    Turn dotted paths into (lookup tree, any-depth key names). "[]" after a
+    key means "every list item", "*" matches any key:
+    "creatives.files[].fileData", "*.description". "**.key" skips `key` at
+    every depth; those names are returned apart from the tree, so no payload
+    key can reach them.
+    """
+    schema = {}
+    any_depth = set()
+    for path in paths:
+        if path.startswith("**."):
+            any_depth.add(path[3:])
+            continue
+        node = schema
+        parts = path.replace("[]", ".[]").split(".")
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = SKIP
+    return schema, frozenset(any_depth)
+
+
+# Base64 data URLs (files) and free-text descriptions in campaign payloads.
+# Both are skipped wherever they appear, as the per-route sanitizers did:
+# descriptions sit at the top level, in appDetails, conversionFlow events,
+# creatives and audiences.
+CAMPAIGN_SKIP_SCHEMA = build_skip_schema("**.fileData", "**.description")
+BRAND_SKIP_SCHEMA = build_skip_schema("brand_logo")
+
+
+def is_malicious_input(value: str, pattern: re.Pattern = CAMPAIGN_PATTERN) -> bool:
+    return pattern.search(value.lower()) is not None
+
+
+def validate_email(email: str) -> bool:
+    return EMAIL_PATTERN.match(email) is not None
+
+
+def format_path(keys: list) -> str:
+    """keys come innermost-first, as collected while unwinding a match."""
+    return "".join(f"[{key}]" if isinstance(key, int) else f".{key}" for key in reversed(keys)).lstrip(".")
+
+
+def _find(node, search, schema, skip_keys=frozenset()):
+    # Returns the keys leading to the first match, innermost first, or None.
+    # Clean values allocate nothing, so paths cost only on the error path.
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key in skip_keys:
+                continue
+            child_schema = None
+            if schema is not None:
+                child_schema = schema.get(key) or schema.get("*")
+                if child_schema is SKIP:
+                    continue
+            value_type = type(value)
+            if value_type is str:
+                if search(value.lower()):
+                    return [key]
+            elif value_type is dict or value_type is list:
+                found = _find(value, search, child_schema, skip_keys)
+                if found is not None:
+                    found.append(key)
+                    return found
+    else:
+        item_schema = schema.get("[]") if schema is not None else None
+        if item_schema is SKIP:
+            return None
+        # Bare strings in lists (country/state names and the like) were never
+        # checked by the per-module sanitizers and still aren't
+        for idx, value in enumerate(node):
+            value_type = type(value)
+            if value_type is dict or value_type is list:
+                found = _find(value, search, item_schema, skip_keys)
+                if found is not None:
+                    found.append(idx)
+                    return found
+    return None
+
+
+def find_malicious_value(data, pattern: re.Pattern = CAMPAIGN_PATTERN, skip: tuple = None) -> str:
+    """Return the path of the first string matching `pattern`, or None. `skip` comes from build_skip_schema."""
+    if not isinstance(data, (dict, list)):
+        return None
+    schema, skip_keys = skip if skip else (None, frozenset())
+    found = _find(data, pattern.search, schema, skip_keys)
+    return format_path(found) if found is not None else None
+
+
+def sanitize_payload(data, pattern: re.Pattern = CAMPAIGN_PATTERN, skip: tuple = CAMPAIGN_SKIP_SCHEMA) -> bool:
+    """Raise a 400 naming the first field with malicious input."""
+    field = find_malicious_value(data, pattern, skip)
+    if field is not None:
+        raise HTTPException(status_code=400, detail=f"Invalid input detected in field: {field}")
+    return True
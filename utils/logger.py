@@ -1,13 +1,138 @@
 # app/utils/logger.py
 
+import asyncio
+import logging
 import uuid
 from fastapi import HTTPException
 from database import Database
 from datetime import datetime
 
+audit_logger = logging.getLogger(__name__)
+
+LOG_INSERT_SQL = """
+    INSERT INTO cronbid_logs (
+        log_id, action, table_name, record_id,
+        user_id, username, action_description, created_at
+    ) VALUES (
+        %s, %s, %s, %s,
+        %s, %s, %s, %s
+    )
+"""
+
 def generate_log_id():
     return f"LOG-{uuid.uuid4().hex[:10]}"
 
+
+class AuditLogWriter:
+    """
+    Buffers cronbid_logs rows in a bounded queue and writes them with
+    multi-row INSERTs. A full queue makes callers wait (back-pressure)
+    up to enqueue_timeout before they fall back to a direct insert.
+    """
+    queue: asyncio.Queue = None
+    task: asyncio.Task = None
+    batch_size: int = 500
+    flush_interval: float = 1.0
+    enqueue_timeout: float = 2.0
+    retry_delay: float = 1.0
+
+    @classmethod
+    async def start(cls, maxsize: int = 10000, batch_size: int = 500, flush_interval: float = 1.0):
+        if cls.task is None:
+            cls.queue = asyncio.Queue(maxsize=maxsize)
+            cls.batch_size = batch_size
+            cls.flush_interval = flush_interval
+            cls.task = asyncio.create_task(cls._run())
+
+    @classmethod
+    def is_running(cls) -> bool:
+        return cls.task is not None and not cls.task.done()
+
+    @classmethod
+    async def enqueue(cls, row: tuple) -> bool:
+        try:
+            await asyncio.wait_for(cls.queue.put(row), timeout=cls.enqueue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            audit_logger.warning(f"[AUDIT LOG] Buffer full, writing {row[0]} synchronously")
+            return False
+
+    @classmethod
+    async def _run(cls):
+        loop = asyncio.get_running_loop()
+        while True:
+            row = await cls.queue.get()
+            if row is None:
+                return
+            batch = [row]
+            deadline = loop.time() + cls.flush_interval
+            stopping = False
+            while len(batch) < cls.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(cls.queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+            await cls._flush(batch)
+            if stopping:
+                return
+
+    @classmethod
+    async def _flush(cls, batch: list):
+        for attempt in (1, 2):
+            try:
+                pool = await Database.connect()
+                async with pool.acquire() as conn:
+                    async with conn.cursor() as cursor:
+                        # executemany rewrites this into one multi-row INSERT
+                        await cursor.executemany(LOG_INSERT_SQL, batch)
+                return
+            except Exception as e:
+                audit_logger.error(f"[AUDIT LOG] Flush of {len(batch)} rows failed (attempt {attempt}): {e}")
+                await asyncio.sleep(cls.retry_delay)
+        audit_logger.error(f"[AUDIT LOG] Dropped log ids: {[row[0] for row in batch]}")
+
+    @classmethod
+    async def stop(cls, timeout: float = 30):
+        """Flush everything still buffered; called from the app lifespan on shutdown."""
+        if cls.task is None:
+            return
+        try:
+            # Never block on a full queue: the writer may have died
+            cls.queue.put_nowait(None)
+            stopping = not cls.task.done()
+        except asyncio.QueueFull:
+            stopping = False
+        if stopping:
+            try:
+                await asyncio.wait_for(cls.task, timeout=timeout)
+            except asyncio.TimeoutError:
+                audit_logger.error(f"[AUDIT LOG] Shutdown flush timed out, writing {cls.queue.qsize()} rows directly")
+            except Exception as e:
+                audit_logger.error(f"[AUDIT LOG] Writer failed during shutdown ({e}), writing {cls.queue.qsize()} rows directly")
+        else:
+            audit_logger.error(f"[AUDIT LOG] Writer is not draining, writing {cls.queue.qsize()} rows directly")
+        if not cls.task.done():
+            cls.task.cancel()
+            await asyncio.gather(cls.task, return_exceptions=True)
+        # Rows the writer didn't get to, and rows enqueued after the sentinel
+        remaining = []
+        while not cls.queue.empty():
+            row = cls.queue.get_nowait()
+            if row is not None:
+                remaining.append(row)
+        if remaining:
+            await cls._flush(remaining)
+        cls.task = None
+        cls.queue = None
+
+
 async def insert_log_entry(
     conn,
     action: str,
@@ -16,30 +141,34 @@ async def insert_log_entry(
     user_id: str,
     username: str = None,
     action_description: str = None,
-    log_id: str = None
+    log_id: str = None,
+    sync: bool = False
 ) -> str:
+    """
+    Record an audit log entry. By default the row is buffered and written in
+    the background; pass sync=True to insert it on `conn` right away, e.g.
+    when it must be part of the caller's transaction.
+    """
     if not log_id:
         log_id = generate_log_id()
 
+    row = (
+        log_id,
+        action,
+        table_name,
+        record_id,
+        user_id,
+        username,
+        action_description,
+        datetime.now()
+    )
+
+    if not sync and AuditLogWriter.is_running() and await AuditLogWriter.enqueue(row):
+        return log_id
+
     try:
         async with conn.cursor() as cursor:
-            await cursor.execute("""
-                INSERT INTO cronbid_logs (
-                    log_id, action, table_name, record_id,
-                    user_id, username, action_description
-                ) VALUES (
-                    %s, %s, %s, %s,
-                    %s, %s, %s
-                )
-            """, (
-                log_id,
-                action,
-                table_name,
-                record_id,
-                user_id,
-                username,
-                action_description
-            ))
+            await cursor.execute(LOG_INSERT_SQL, row)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Log insertion failed: {e}")
 
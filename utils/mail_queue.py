@@ -0,0 +1,61 @@
+# utils/mail_queue.py
+
+import asyncio
+import logging
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class MailQueue:
+    """
+    Background queue for notification emails.
+    The senders use blocking smtplib, so every job runs in a worker thread
+    and request handlers only pay for a put_nowait().
+    """
+    queue: asyncio.Queue = None
+    worker: asyncio.Task = None
+
+    @classmethod
+    async def start(cls, maxsize: int = 10000):
+        if cls.worker is None:
+            cls.queue = asyncio.Queue(maxsize=maxsize)
+            cls.worker = asyncio.create_task(cls._run())
+        return cls.queue
+
+    @classmethod
+    def enqueue(cls, func: Callable, *args, **kwargs) -> bool:
+        """Schedule func(*args, **kwargs) for sending. Returns False if the job was dropped."""
+        if cls.queue is None:
+            # Queue not started (e.g. scripts without the app lifespan): still keep SMTP off the loop
+            asyncio.get_running_loop().run_in_executor(None, lambda: func(*args, **kwargs))
+            return True
+        try:
+            cls.queue.put_nowait((func, args, kwargs))
+            return True
+        except asyncio.QueueFull:
+            logger.error(f"[MAIL QUEUE] Queue full, dropping {getattr(func, '__name__', func)}")
+            return False
+
+    @classmethod
+    async def _run(cls):
+        while True:
+            func, args, kwargs = await cls.queue.get()
+            try:
+                await asyncio.to_thread(func, *args, **kwargs)
+            except Exception as e:
+                logger.error(f"[MAIL QUEUE] {getattr(func, '__name__', func)} failed: {e}")
+            finally:
+                cls.queue.task_done()
+
+    @classmethod
+    async def stop(cls, timeout: float = 30):
+        if cls.worker is None:
+            return
+        try:
+            await asyncio.wait_for(cls.queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"[MAIL QUEUE] Shutdown with {cls.queue.qsize()} unsent emails")
+        cls.worker.cancel()
+        cls.worker = None
+        cls.queue = None
@@ -0,0 +1,31 @@
+# utils/pagination.py
+
+import datetime
+from fastapi import HTTPException
+
+# Keyset ("seek") pagination over (created_at, id), newest first by default.
+# The cursor is '<created_at ISO>|<id>' of the last row on the previous page.
+
+def encode_cursor(row: dict, time_field: str = "created_at", id_field: str = "id") -> str:
+    return f"{row[time_field].isoformat()}|{row[id_field]}"
+
+def parse_cursor(cursor: str):
+    try:
+        created_at, row_id = cursor.rsplit("|", 1)
+        return datetime.datetime.fromisoformat(created_at), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_filter(cursor: str, time_field: str = "created_at", id_field: str = "id", descending: bool = True):
+    """WHERE fragment and values selecting rows strictly after the cursor in the given order."""
+    created_at, row_id = parse_cursor(cursor)
+    op = "<" if descending else ">"
+    clause = f"({time_field} {op} %s OR ({time_field} = %s AND {id_field} {op} %s))"
+    return clause, [created_at, created_at, row_id]
+
+def split_page(rows: list, limit: int, time_field: str = "created_at", id_field: str = "id"):
+    """Rows are fetched with LIMIT limit + 1; the extra row only signals another page."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1], time_field, id_field)
+    return rows, None
@@ -1,6 +1,7 @@
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from typing import List
 
 APP_PASSWORD = "dcfl kybe tokq ydyv"
 SENDER_EMAIL = "admin@cronbid.com"
@@ -104,3 +105,89 @@ def send_sub2_status_notification(status: str, campaign_id: int, source_id: int,
     </html>
     """
     send_email(ADMIN_EMAIL, subject, html_content)
+
+def send_partner_status_digest(changes: list):
+    """One email for a batch of partner status changes (dicts with the request fields)."""
+    subject = f"{APP_NAME} - {len(changes)} Partner Status Update{'s' if len(changes) != 1 else ''}"
+    rows = "".join(
+        f"<tr><td>{c['status']}</td><td>{c['source_id']} {c['source_name']}</td><td>{c['campaign_id']} {c['campaign_name']}</td></tr>"
+        for c in changes
+    )
+    html_content = f"""
+    <html>
+    <body style="background: linear-gradient(to bottom, #142c54, #1d179b); color: white; font-family: Arial, sans-serif; padding: 40px;">
+        <div style="max-width: 600px; margin: auto; text-align: center;">
+            <img src="{LOGO_URL}" alt="CRONBID Logo" style="width: 150px; margin-bottom: 30px;" />
+            <h2>Partner Status Updates</h2>
+            <p>{len(changes)} partner status{'es have' if len(changes) != 1 else ' has'} been set.</p>
+            <table style="margin: auto; text-align: left; border-spacing: 12px 4px;">
+                <tr><th>Status</th><th>Source</th><th>Campaign</th></tr>
+                {rows}
+            </table>
+            <br />
+            <p>Regards,<br /><strong>{APP_NAME} Team</strong></p>
+        </div>
+    </body>
+    </html>
+    """
+    send_email(ADMIN_EMAIL, subject, html_content)
+
+def send_sub2_status_digest(changes: list):
+    """One email for a batch of sub2 status changes (dicts with the request fields)."""
+    subject = f"{APP_NAME} - {len(changes)} Sub2 Status Update{'s' if len(changes) != 1 else ''}"
+    rows = "".join(
+        f"<tr><td>{c['status']}</td><td>{c['sub2']}</td><td>{c['source_id']} {c['source_name']}</td><td>{c['campaign_id']} {c['campaign_name']}</td></tr>"
+        for c in changes
+    )
+    html_content = f"""
+    <html>
+    <body style="background: linear-gradient(to bottom, #142c54, #1d179b); color: white; font-family: Arial, sans-serif; padding: 40px;">
+        <div style="max-width: 600px; margin: auto; text-align: center;">
+            <img src="{LOGO_URL}" alt="CRONBID Logo" style="width: 150px; margin-bottom: 30px;" />
+            <h2>Sub2 Status Updates</h2>
+            <p>{len(changes)} sub2 status{'es have' if len(changes) != 1 else ' has'} been set.</p>
+            <table style="margin: auto; text-align: left; border-spacing: 12px 4px;">
+                <tr><th>Status</th><th>Sub2</th><th>Source</th><th>Campaign</th></tr>
+                {rows}
+            </table>
+            <br />
+            <p>Regards,<br /><strong>{APP_NAME} Team</strong></p>
+        </div>
+    </body>
+    </html>
+    """
+    send_email(ADMIN_EMAIL, subject, html_content)
+
+STATUS_TEXT = {
+    "active": "activated ✅",
+    "inactive": "deactivated ❌",
+    "paused": "paused ⏸",
+    "ended": "ended",
+}
+
+
+def send_campaign_status_digest(to_email: str, new_status: str, campaign_names: List[str]):
+    """One email listing every campaign of an owner changed by a bulk update."""
+    status_text = STATUS_TEXT[new_status]
+    is_active = new_status == "active"
+    bg_color = "#d4edda" if is_active else "#f8d7da"
+    text_color = "#155724" if is_active else "#721c24"
+
+    subject = f"{APP_NAME}: {len(campaign_names)} Campaign{'s' if len(campaign_names) != 1 else ''} {status_text.capitalize()}"
+    campaign_items = "".join(f"<li>{name}</li>" for name in campaign_names)
+
+    html_content = f"""
+    <html>
+        <body style="font-family: Arial, sans-serif; padding: 20px; background-color: {bg_color}; color: {text_color};">
+            <div style="text-align: center;">
+                <img src="{LOGO_URL}" alt="{APP_NAME} Logo" width="150" style="margin-bottom: 20px;">
+                <h2>Your campaigns have been {status_text}</h2>
+                <p>Dear User,</p>
+                <p>The following campaigns on <strong>{APP_NAME}</strong> have been <strong>{status_text}</strong>:</p>
+                <ul style="display: inline-block; text-align: left;">{campaign_items}</ul>
+                <p>{'You can login now at <a href="https://ads.cronbid.com/">ads.cronbid.com</a>' if is_active else f'Please contact support: <a href="mailto:{ADMIN_EMAIL}">{ADMIN_EMAIL}</a>'}</p>
+            </div>
+        </body>
+    </html>
+    """
+    send_email(to_email, subject, html_content)
@@ -0,0 +1,31 @@
+# utils/static_files.py
+
+import os
+import re
+from starlette.staticfiles import StaticFiles
+
+# <sha256>.<ext> media blobs and <name>.<16+ hex digest>.<ext> logos: the name
+# changes whenever the content does, so the file can be cached forever
+HASHED_FILENAME = re.compile(r"(?:^[0-9a-f]{64}|\.[0-9a-f]{16,64})\.[A-Za-z0-9]+$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+
+def is_content_hashed(path) -> bool:
+    return bool(HASHED_FILENAME.search(os.path.basename(str(path))))
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles with Cache-Control headers: content-hashed files are marked
+    immutable, everything else must be revalidated with the ETag and
+    Last-Modified headers StaticFiles already sends (answered with a 304).
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["Cache-Control"] = (
+            IMMUTABLE_CACHE_CONTROL if is_content_hashed(full_path) else REVALIDATE_CACHE_CONTROL
+        )
+        return response